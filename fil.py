@@ -1,15 +1,20 @@
-import pandas as pd
 import argparse
 
+from utils.format import filter_states
+from utils.states import parse_states
+
 if __name__ == "__main__":
     # Set up argument parser
     parser = argparse.ArgumentParser(description="Filter specific states from the 'State' column of a CSV file.")
     parser.add_argument("-f", "--file", help="Path to the input CSV file", required=True)
     parser.add_argument("-o", "--output", help="Path to the output CSV file", required=True)
+    parser.add_argument("-s", "--states", type=parse_states, default="default",
+                        help="States to keep: 'default', 'all', 'none' (keep every row, only normalizing state names) "
+                             "or a comma-separated list of names or codes")
 
     # Parse the arguments
     args = parser.parse_args()
 
     # Call the function with the provided file name and output file name
-    filter_states(args.file, args.output)
+    filter_states(args.file, args.output, args.states)
 
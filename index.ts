@@ -1,14 +1,25 @@
 import puppeteer, { Browser, Page } from "puppeteer";
-import { readdir, readFile, writeFile, mkdir, access } from "fs/promises";
+import type { Subprocess } from "bun";
+import { readdir, readFile, writeFile, mkdir, access, unlink } from "fs/promises";
 import Papa from "papaparse";
 import fs from "fs";
 import path from "path";
-import { URL } from "url";
 
 // Configuration constants
 const CONFIG = {
   OUTPUT: "out" + ".csv",
+  // Contacts from every run, keyed on phone (query with utils/contacts.py)
+  CONTACT_INDEX: "contacts.db",
+  // Extension of the files handed from split.py to format.py: ".csv", or
+  // ".parquet"/".arrow" to keep typed columns between stages (needs pyarrow)
+  INTERMEDIATE_EXTENSION: ".csv",
   SEARCH_LIMIT: 50, // Maximum number of CSV links to process
+  // Download and normalize in one streaming pass (utils/pipeline.py) instead
+  // of download.py, split.py and format.py; OUTPUT then covers every link
+  // in LINKS_FILE, with unchanged ones normalized again from their last copy
+  PIPELINE: false,
+  // Files mentioning any of these (ignoring case) are skipped
+  FORBIDDEN_TERMS: ["agent", "broker", "realtor"],
   ALLOWED_COLUMN_KEYWORDS: [
     "name",
     "phone",
@@ -19,14 +30,140 @@ const CONFIG = {
   ],
   DIRECTORIES: {
     CSV_SAVE: "./csv_files_95",
+    // Raw downloads kept by the pipeline, with their own fetch cache
+    PIPELINE_SAVE: "./csv_downloads",
     LINKS_FILE: "./links.txt",
   },
   TIMEOUTS: {
     PAGE_LOAD: 10000,
     NEXT_PAGE_DELAY: 4000,
   },
+  DOWNLOAD: {
+    CONCURRENCY: 16,
+    PER_HOST: 4,
+    // Seconds a download may stall without data; there is no limit on total time
+    READ_TIMEOUT_SECONDS: 60,
+    CACHE_DIR: "./.fetch_cache",
+    PIPELINE_CACHE_DIR: "./.fetch_cache_pipeline",
+  },
 };
 
+interface DownloadResult {
+  url: string;
+  path: string;
+  ok: boolean;
+  unchanged: boolean;
+  skipped: boolean;
+  reason?: string;
+  status: number | null;
+  bytes: number;
+  attempts: number;
+  error: string | null;
+  // Validators of a new body, recorded once the file has been processed
+  sha256?: string;
+  etag?: string | null;
+  last_modified?: string | null;
+}
+
+// Yield a byte stream line by line
+async function* readLines(
+  stream: ReadableStream<Uint8Array>,
+): AsyncGenerator<string> {
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  for await (const chunk of stream) {
+    buffer += decoder.decode(chunk, { stream: true });
+    let newline = buffer.indexOf("\n");
+    while (newline >= 0) {
+      yield buffer.slice(0, newline);
+      buffer = buffer.slice(newline + 1);
+      newline = buffer.indexOf("\n");
+    }
+  }
+
+  buffer += decoder.decode();
+  if (buffer) yield buffer;
+}
+
+interface SplitResult {
+  id: number;
+  ok: boolean;
+  rows?: number;
+  error?: string;
+}
+
+// Long-lived `utils/split.py --serve` process, so pandas is imported once
+// per run instead of once per downloaded file
+class SplitWorker {
+  private proc: Subprocess<"pipe", "pipe", "inherit"> | null = null;
+  private lines: AsyncGenerator<string> | null = null;
+  private nextId = 0;
+
+  private start(): void {
+    this.proc = Bun.spawn({
+      cmd: ["python3", "utils/split.py", "--serve"],
+      stdin: "pipe",
+      stdout: "pipe",
+      stderr: "inherit",
+    });
+    this.lines = readLines(this.proc.stdout);
+  }
+
+  private async readLine(): Promise<string> {
+    const { value, done } = await this.lines!.next();
+    if (done) {
+      this.proc = null;
+      throw new Error("split worker exited unexpectedly");
+    }
+    return value;
+  }
+
+  async process(input: string, output: string): Promise<SplitResult> {
+    if (!this.proc) this.start();
+
+    const id = this.nextId++;
+    this.proc!.stdin.write(JSON.stringify({ id, input, output }) + "\n");
+    this.proc!.stdin.flush();
+    return JSON.parse(await this.readLine());
+  }
+
+  async close(): Promise<void> {
+    if (!this.proc) return;
+    this.proc.stdin.end();
+    await this.proc.exited;
+    this.proc = null;
+  }
+}
+
+// Long-lived `utils/fetchcache.py --confirm -` process recording each link
+// in the fetch cache once its file has been split, so a run that fails or
+// is interrupted before then downloads the link again next time
+class CacheConfirmer {
+  private proc: Subprocess<"pipe", "inherit", "inherit"> | null = null;
+
+  confirm(download: DownloadResult, artifact: string): void {
+    if (!download.sha256) return;
+    if (!this.proc) {
+      this.proc = Bun.spawn({
+        cmd: ["python3", "utils/fetchcache.py", CONFIG.DOWNLOAD.CACHE_DIR, "--confirm", "-"],
+        stdin: "pipe",
+        stdout: "inherit",
+        stderr: "inherit",
+      });
+    }
+    this.proc.stdin.write(JSON.stringify({ ...download, artifact }) + "\n");
+    this.proc.stdin.flush();
+  }
+
+  async close(): Promise<void> {
+    if (!this.proc) return;
+    this.proc.stdin.end();
+    await this.proc.exited;
+    this.proc = null;
+  }
+}
+
 interface ScraperOptions {
   headless?: boolean;
   maxLinks?: number;
@@ -137,86 +274,163 @@ class CSVScraper {
   }
 
   private async downloadAndProcessCsvs(): Promise<void> {
+    if (CONFIG.PIPELINE) {
+      await this.runPipeline();
+      return;
+    }
+
     await this.ensureDirectory(CONFIG.DIRECTORIES.CSV_SAVE);
+    const splitWorker = new SplitWorker();
+    const confirmer = new CacheConfirmer();
 
-    for (const link of this.allLinks) {
+    try {
+      await this.downloadLinks(splitWorker, confirmer);
+    } finally {
+      await splitWorker.close();
+      await confirmer.close();
+    }
+  }
+
+  private async runPipeline(): Promise<void> {
+    // The output is rewritten from scratch, so it is built from every known
+    // link; the fetch cache keeps unchanged ones from being downloaded again
+    const links = [
+      ...new Set(
+        [...this.allLinks, ...this.oldLinks.split("\n")]
+          .map((link) => link.trim())
+          .filter(Boolean),
+      ),
+    ];
+    const pipeline = Bun.spawn({
+      cmd: [
+        "python3",
+        "utils/pipeline.py",
+        "-",
+        CONFIG.DIRECTORIES.PIPELINE_SAVE,
+        CONFIG.OUTPUT,
+        "--concurrency",
+        String(CONFIG.DOWNLOAD.CONCURRENCY),
+        "--per-host",
+        String(CONFIG.DOWNLOAD.PER_HOST),
+        "--timeout",
+        String(CONFIG.DOWNLOAD.READ_TIMEOUT_SECONDS),
+        "--cache",
+        CONFIG.DOWNLOAD.PIPELINE_CACHE_DIR,
+        "--index",
+        CONFIG.CONTACT_INDEX,
+        "--forbidden-terms",
+        CONFIG.FORBIDDEN_TERMS.join(","),
+        "--column-keywords",
+        CONFIG.ALLOWED_COLUMN_KEYWORDS.join(","),
+      ],
+      stdin: "pipe",
+      stdout: "inherit",
+      stderr: "inherit",
+    });
+    pipeline.stdin.write(links.join("\n") + "\n");
+    pipeline.stdin.end();
+
+    const code = await pipeline.exited;
+    if (code !== 0) {
+      console.error(`Pipeline exited with code ${code}`);
+    }
+  }
+
+  private async downloadLinks(
+    splitWorker: SplitWorker,
+    confirmer: CacheConfirmer,
+  ): Promise<void> {
+    // Links are fetched concurrently by utils/download.py, which reports each
+    // finished download as a JSON line; files are processed as they arrive
+    const downloader = Bun.spawn({
+      cmd: [
+        "python3",
+        "utils/download.py",
+        "-",
+        CONFIG.DIRECTORIES.CSV_SAVE,
+        "--concurrency",
+        String(CONFIG.DOWNLOAD.CONCURRENCY),
+        "--per-host",
+        String(CONFIG.DOWNLOAD.PER_HOST),
+        "--timeout",
+        String(CONFIG.DOWNLOAD.READ_TIMEOUT_SECONDS),
+        "--cache",
+        CONFIG.DOWNLOAD.CACHE_DIR,
+        "--defer-confirm",
+        "--probe",
+      ],
+      stdin: "pipe",
+      stdout: "pipe",
+      stderr: "inherit",
+    });
+    downloader.stdin.write(this.allLinks.join("\n") + "\n");
+    downloader.stdin.end();
+
+    for await (const line of readLines(downloader.stdout)) {
+      const download: DownloadResult = JSON.parse(line);
       try {
-        console.log(`Processing CSV link: ${link}`);
-        const response = await fetch(link);
+        console.log(`Processing CSV link: ${download.url}`);
 
-        if (!response.ok) {
-          console.error(`Failed to download CSV: ${link}`);
+        if (!download.ok) {
+          console.error(
+            `Failed to download CSV: ${download.url} (${download.error})`,
+          );
           continue;
         }
 
-        const csvContent = await response.text();
-        const fileName = this.extractFileName(link);
-        const filePath = path.join(
-          CONFIG.DIRECTORIES.CSV_SAVE,
-          fileName.replaceAll(" ", "-").replaceAll("%20", "-"),
-        );
-        await this.processCsvContent(csvContent, filePath);
-        const proc = Bun.spawn({
-          cmd: ["python3", "utils/split.py", filePath, filePath],
-          stdout: "pipe",
-          stderr: "pipe",
-        });
-
-        const { stdout, stderr } = await proc;
-
-        // Function to read a ReadableStream to a string
-        async function streamToString(stream) {
-          const reader = stream.getReader();
-          let decoder = new TextDecoder();
-          let result = "";
-          let done = false;
-
-          while (!done) {
-            const { value, done: readerDone } = await reader.read();
-            result += decoder.decode(value, { stream: true });
-            done = readerDone;
-          }
-
-          result += decoder.decode(); // Finalize decoding
-          return result;
+        // Same content as the last run, which was already processed
+        if (download.unchanged) {
+          console.log(`Unchanged since last download, skipping: ${download.url}`);
+          continue;
         }
 
-        if (stderr) {
-          const errorOutput = await streamToString(stderr);
-          console.error("Error output:", errorOutput);
+        // Header has no usable phone column; the download was cut short
+        if (download.skipped) {
+          console.log(`No contact columns (${download.reason}), skipping: ${download.url}`);
+          continue;
         }
 
-        if (stdout) {
-          const output = await streamToString(stdout);
-          console.log("Python script output:", output);
+        const filePath = download.path;
+        const csvContent = await readFile(filePath, "utf-8");
+        if (!(await this.processCsvContent(csvContent, filePath))) {
+          await unlink(filePath);
+          continue;
+        }
+
+        const outputPath = filePath.replace(
+          /\.csv$/i,
+          CONFIG.INTERMEDIATE_EXTENSION,
+        );
+        const result = await splitWorker.process(filePath, outputPath);
+
+        if (result.ok) {
+          console.log(
+            `Python script output: Successfully processed ${filePath} and saved to ${outputPath}, rows in output: ${result.rows}`,
+          );
+          if (outputPath !== filePath) await unlink(filePath);
+          confirmer.confirm(download, outputPath);
+        } else {
+          console.error("Error output:", result.error);
         }
       } catch (error) {
-        console.error(`Error processing ${link}:`, error);
+        console.error(`Error processing ${download.url}:`, error);
       }
     }
-  }
 
-  private extractFileName(link: string): string {
-    try {
-      const parsedUrl = new URL(link);
-      return path.basename(parsedUrl.pathname) || `download_${Date.now()}.csv`;
-    } catch {
-      return `download_${Date.now()}.csv`;
-    }
+    await downloader.exited;
   }
 
   private async processCsvContent(
     csvContent: string,
     filePath: string,
-  ): Promise<void> {
+  ): Promise<boolean> {
     try {
       // Check for forbidden terms in the CSV content
-      const forbiddenTerms = ["agent", "broker", "realtor"];
       const contentLowerCase = csvContent.toLowerCase();
 
-      if (forbiddenTerms.some((term) => contentLowerCase.includes(term))) {
+      if (CONFIG.FORBIDDEN_TERMS.some((term) => contentLowerCase.includes(term))) {
         console.log(`Skipping CSV as it mentions forbidden terms: ${filePath}`);
-        return;
+        return false;
       }
 
       // Parse the CSV with columns
@@ -236,7 +450,7 @@ class CSVScraper {
         // If no columns match the allowed keywords, skip the file
         if (filteredColumns.length === 0) {
           console.log(`No allowed columns found in: ${filePath}. Skipping.`);
-          return;
+          return false;
         }
 
         // Find phone columns
@@ -247,7 +461,7 @@ class CSVScraper {
         // If no phone columns, skip the file
         if (phoneColumns.length === 0) {
           console.log(`Skipping CSV without phone header: ${filePath}`);
-          return;
+          return false;
         }
 
         // Clean and filter the data
@@ -281,7 +495,7 @@ class CSVScraper {
         // If no rows remain after filtering, skip saving
         if (cleanedData.length === 0) {
           console.log(`No valid phone numbers found in: ${filePath}`);
-          return;
+          return false;
         }
 
         // Convert cleaned data back to CSV
@@ -292,10 +506,12 @@ class CSVScraper {
         console.log(`Processed and saved cleaned CSV: ${filePath}`);
         console.log(`Columns retained: ${filteredColumns.join(", ")}`);
         console.log(`Rows after cleaning: ${cleanedData.length}`);
+        return true;
       }
     } catch (error) {
       console.error(`CSV processing error for ${filePath}:`, error);
     }
+    return false;
   }
 
   private async saveLinks(): Promise<void> {
@@ -338,12 +554,17 @@ async function main() {
   const searchTerm = args.join(" ");
   const scraper = new CSVScraper();
   await scraper.scrape(searchTerm);
+  // The pipeline has already written OUTPUT and updated the index
+  if (CONFIG.PIPELINE) return;
+
   const proc = Bun.spawn({
     cmd: [
       "python3",
       "utils/format.py",
       CONFIG.DIRECTORIES.CSV_SAVE,
       CONFIG.OUTPUT,
+      "--index",
+      CONFIG.CONTACT_INDEX,
     ],
     stdout: "pipe",
     stderr: "pipe",
@@ -1,40 +1,23 @@
-import pandas as pd
 import sys
 
-def remove_columns(input_file, output_file=None):
-    # Columns to remove
-    columns_to_remove = [
-         "Award Title", "Agency", "Branch", "Phase", "Program", 
-        "Agency Tracking Number", "Contract", "Proposal Award Date", 
-        "Contract End Date", "Solicitation Number", "Solicitation Year", 
-        "Solicitation Close Date", "Proposal Receipt Date", "Date of Notification", 
-        "Topic Code", "Award Year", "Award Amount", "Duns", "HUBZone Owned", 
-        "Socially and Economically Disadvantaged", "Women Owned", "Number Employees", 
-        "Company Website", "Address1", "Address2", "City",  "Abstract", 
-        "Contact Name", "Contact Title",
-        "PI Name", "PI Title",
-        "RI Name", "RI POC Name", "RI POC Phone"
-    ]
+from utils.csvtool import DROP_PRESETS, drop_columns
+from utils.tableio import read_header
 
+def remove_columns(input_file, output_file=None):
     try:
-        # Read the CSV file
-        df = pd.read_csv(input_file)
-        
-        # Remove specified columns
-        columns_to_keep = [col for col in df.columns if col not in columns_to_remove]
-        df_filtered = df[columns_to_keep]
+        original_columns = read_header(input_file)
         
         # Determine output file name
         if output_file is None:
             output_file = input_file.replace('.csv', '_filtered.csv')
         
-        # Save the filtered DataFrame
-        df_filtered.to_csv(output_file, index=False)
+        # Copy the columns to keep chunk by chunk, as text
+        result = drop_columns(input_file, output_file, DROP_PRESETS['main'])
         
         print(f"Filtered CSV saved to {output_file}")
-        print(f"Original columns: {len(df.columns)}")
-        print(f"Remaining columns: {len(df_filtered.columns)}")
-        print("Remaining columns:", list(df_filtered.columns))
+        print(f"Original columns: {len(original_columns)}")
+        print(f"Remaining columns: {len(result['columns'])}")
+        print("Remaining columns:", result['columns'])
     
     except FileNotFoundError:
         print(f"Error: File {input_file} not found.")
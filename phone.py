@@ -1,23 +1,16 @@
-import pandas as pd
 import argparse
+import sys
+
+from utils.csvtool import filter_non_empty
 
 def filter_rows_with_phone(file_name):
     try:
-        # Load the CSV file into a DataFrame
-        df = pd.read_csv(file_name)
-
-        # Ensure the 'Phone' column exists
-        if "Phone" not in df.columns:
-            print(f"Error: The column 'Phone' does not exist in {file_name}.")
-            return
-
-        # Filter rows where 'Phone' is not empty
-        filtered_df = df[df["Phone"].notna() & (df["Phone"] != "")]
-
-        # Print the filtered DataFrame
+        # Stream the rows where 'Phone' is not empty to stdout as CSV
         print("\nRows with a value in the 'Phone' column:")
-        print(filtered_df)
+        filter_non_empty(file_name, sys.stdout, "Phone")
 
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
     except FileNotFoundError:
         print(f"Error: The file '{file_name}' does not exist.")
     except Exception as e:
@@ -1,20 +1,15 @@
-import pandas as pd
 import argparse
 
+from utils.csvtool import count_non_empty
+
 def count_rows_with_phone(file_name):
     try:
-        # Load the CSV file into a DataFrame
-        df = pd.read_csv(file_name)
-
-        # Ensure the 'Phone' column exists
-        if "Phone" not in df.columns:
-            print(f"Error: The column 'Phone' does not exist in {file_name}.")
-            return
-
-        # Count rows where 'Phone' is not empty
-        count = df[df["Phone"].notna() & (df["Phone"] != "")].shape[0]
+        # Stream only the 'Phone' column
+        count = count_non_empty(file_name, "Phone")
 
         print(f"Number of rows with a value in the 'Phone' column: {count}")
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
     except FileNotFoundError:
         print(f"Error: The file '{file_name}' does not exist.")
     except Exception as e:
@@ -30,4 +25,3 @@ if __name__ == "__main__":
 
     # Call the function with the provided file name
     count_rows_with_phone(args.file)
-
@@ -1,23 +1,15 @@
-import pandas as pd
 import argparse
 
+from utils.csvtool import DROP_PRESETS, drop_columns
+
 def remove_columns_from_csv(file_name, output_file):
-    # List of columns to remove
-    columns_to_remove = [
-"Other ZIP Code"]
     try:
-        # Load the CSV file
-        df = pd.read_csv(file_name)
-
-        # Drop specified columns
-        df = df.drop(columns=[col for col in columns_to_remove if col in df.columns], errors='ignore')
-
-        # Save the result to a new CSV file
-        df.to_csv(output_file, index=False)
+        # Copy the file chunk by chunk without the specified columns
+        result = drop_columns(file_name, output_file, DROP_PRESETS['rm'])
 
         print(f"Updated CSV file saved to {output_file}")
         print("\nPreview of the updated file:")
-        print(df.head())
+        print(result['preview'])
     except FileNotFoundError:
         print(f"Error: The file '{file_name}' does not exist.")
     except Exception as e:
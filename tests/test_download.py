@@ -0,0 +1,147 @@
+import asyncio
+import http.server
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from utils import download
+
+pytest.importorskip('aiohttp')
+
+BODY = b'Name,Phone\n' + b'Ann Lee,3055550100\n' * 1000
+
+
+class _SlowHandler(http.server.BaseHTTPRequestHandler):
+    """Sends BODY in pieces with server.pause seconds between them, after server.stall seconds of silence."""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        time.sleep(self.server.stall)
+        for start in range(0, len(BODY), 1024):
+            self.wfile.write(BODY[start:start + 1024])
+            self.wfile.flush()
+            time.sleep(self.server.pause)
+
+    def log_message(self, *args):
+        pass
+
+
+class _FlakyHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers each request with the next step of server.plan: an HTTP status
+    to fail with, 'reset' to drop the connection halfway through the body,
+    or 'ok'. Request times are appended to server.requests.
+    """
+
+    def do_GET(self):
+        self.server.requests.append(time.perf_counter())
+        step = self.server.plan.pop(0) if self.server.plan else 'ok'
+        if isinstance(step, int):
+            self.send_error(step)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        if step == 'reset':
+            self.wfile.write(BODY[:len(BODY) // 2])
+            self.wfile.flush()
+            # Abortive close: the client sees a reset, not a clean end of stream
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            self.connection.close()
+            return
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def flaky():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _FlakyHandler)
+    server.plan, server.requests = [], []
+    # The handler closes reset connections itself
+    server.handle_error = lambda *args: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _SlowHandler)
+    server.stall, server.pause = 0, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def _download(server, tmp_path, timeout):
+    url = f'http://127.0.0.1:{server.server_address[1]}/slow.csv'
+    return asyncio.run(download.download_all([url], str(tmp_path), retries=0, timeout=timeout))[0]
+
+
+def test_slow_body_outlasting_timeout_completes(server, tmp_path):
+    server.pause = 0.05
+    start = time.perf_counter()
+    result = _download(server, tmp_path, timeout=0.3)
+    
+    assert time.perf_counter() - start > 0.6
+    assert result['ok'], result
+    assert (tmp_path / 'slow.csv').read_bytes() == BODY
+
+
+def test_stalled_connection_times_out(server, tmp_path):
+    server.stall = 1.5
+    result = _download(server, tmp_path, timeout=0.3)
+    
+    assert not result['ok']
+    assert 'Timeout' in result['error']
+
+
+def _download_flaky(server, tmp_path, retries, backoff=0.2):
+    url = f'http://127.0.0.1:{server.server_address[1]}/flaky.csv'
+    return asyncio.run(download.download_all([url], str(tmp_path), retries=retries, backoff=backoff))[0]
+
+
+def test_retryable_status_is_retried_after_backoff(flaky, tmp_path):
+    flaky.plan = [503, 503]
+    result = _download_flaky(flaky, tmp_path, retries=3)
+
+    assert result['ok'] and result['status'] == 200 and result['attempts'] == 3
+    assert (tmp_path / 'flaky.csv').read_bytes() == BODY
+    first, second, third = flaky.requests
+    # Exponential: backoff, then twice backoff
+    assert 0.2 <= second - first < 0.4
+    assert 0.4 <= third - second < 1
+
+
+def test_client_error_is_not_retried(flaky, tmp_path):
+    flaky.plan = [404]
+    result = _download_flaky(flaky, tmp_path, retries=3)
+
+    assert not result['ok']
+    assert (result['status'], result['attempts'], result['error']) == (404, 1, 'HTTP 404')
+    assert len(flaky.requests) == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_reset_mid_body_leaves_no_files(flaky, tmp_path):
+    flaky.plan = ['reset']
+    result = _download_flaky(flaky, tmp_path, retries=0)
+
+    assert not result['ok'] and result['error']
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_reset_mid_body_is_retried(flaky, tmp_path):
+    flaky.plan = ['reset']
+    result = _download_flaky(flaky, tmp_path, retries=1, backoff=0)
+
+    assert result['ok'] and result['attempts'] == 2
+    assert [path.name for path in tmp_path.iterdir()] == ['flaky.csv']
+    assert (tmp_path / 'flaky.csv').read_bytes() == BODY
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from utils import format as fmt
+from utils import split
+
+# Golden outputs below were produced by the iterrows implementations in the
+# baseline split.py and format.py on these same frames.
+
+CONTACTS = {
+    'Name': ['Ann Lee', 'Bob Ray', 'Cy Dunn', 'Di Park', 'Ed Moss'],
+    'Phone': ['3055550100.0', '(212) 555-1234, 212-555-1234', np.nan, '', '7865550199'],
+    'Cell Phone': ['3055550100.0', np.nan, np.nan, '4045550123,1-404-555-0124', '7865550199'],
+    'State': ['FL', 'NY', 'GA', 'TX', 'FL'],
+}
+
+NORMALIZED = {
+    'first_name': ['Ann', 'Bob', 'Cy', 'Di', 'Ed'],
+    'phone': ['3055550100.0', '(212) 555-1234, 212-555-1234, 12125551234', np.nan, '',
+              '786-555-0199,555-0199,7865550199'],
+}
+
+
+def _rows(df):
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+
+def test_split_expand_phone_rows_matches_baseline():
+    out = split.expand_phone_rows(pd.DataFrame(CONTACTS, dtype=object))
+    assert list(out.columns) == ['Name', 'State', 'Phone']
+    assert _rows(out) == [
+        ['Ann Lee', 'FL', '3055550100'],
+        ['Ann Lee', 'FL', '3055550100'],
+        ['Bob Ray', 'NY', '(212) 555-1234, 212-555-1234'],
+        ['Cy Dunn', 'GA', ''],
+        ['Di Park', 'TX', '4045550123,1-404-555-0124'],
+        ['Ed Moss', 'FL', '7865550199'],
+        ['Ed Moss', 'FL', '7865550199'],
+    ]
+
+
+def test_format_expand_phone_rows_matches_baseline():
+    out = fmt.expand_phone_rows(pd.DataFrame(CONTACTS, dtype=object))
+    assert list(out.columns) == ['Name', 'Phone', 'Cell Phone', 'State']
+    assert out.index.tolist() == [0, 0, 1, 2, 3, 4, 4]
+    assert _rows(out) == [
+        ['Ann Lee', '3055550100.0', '', 'FL'],
+        ['Ann Lee', '', '3055550100.0', 'FL'],
+        ['Bob Ray', '(212) 555-1234, 212-555-1234', '', 'NY'],
+        ['Cy Dunn', None, None, 'GA'],
+        ['Di Park', '', '4045550123,1-404-555-0124', 'TX'],
+        ['Ed Moss', '7865550199', '', 'FL'],
+        ['Ed Moss', '', '7865550199', 'FL'],
+    ]
+
+
+def test_expand_phone_numbers_matches_baseline():
+    out = fmt.expand_phone_numbers(pd.DataFrame(NORMALIZED, dtype=object))
+    assert list(out.columns) == ['first_name', 'phone']
+    assert _rows(out) == [
+        # The baseline dropped '3055550100.0'; clean_phone now reads it as a float
+        ['Ann', '3055550100'],
+        ['Bob', '2125551234'],
+        ['Cy', ''],
+        ['Di', ''],
+        ['Ed', '7865550199'],
+    ]
+
+
+def test_expand_without_phone_columns_returns_input():
+    df = pd.DataFrame({'Name': ['Ann'], 'State': ['FL']})
+    assert split.expand_phone_rows(df) is df
+    assert fmt.expand_phone_rows(df) is df
@@ -0,0 +1,77 @@
+import asyncio
+import http.server
+import io
+import json
+import threading
+
+import pytest
+
+from utils import download
+from utils.fetchcache import FetchCache, confirm
+
+pytest.importorskip('aiohttp')
+
+BODY = b'Name,Phone\nAnn Lee,3055550100\n'
+
+
+class _ETagHandler(http.server.BaseHTTPRequestHandler):
+    """Serves BODY with a fixed ETag, answering 304 to a matching If-None-Match."""
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/contacts.csv'
+    server.shutdown()
+
+
+def _download(url, dest_dir, cache, confirm=True):
+    return asyncio.run(download.download_all([url], str(dest_dir), retries=0, cache=cache, confirm=confirm))[0]
+
+
+def test_missing_artifact_is_downloaded_again(url, tmp_path):
+    cache = FetchCache(str(tmp_path / 'cache'))
+    first = _download(url, tmp_path / 'out', cache)
+    assert first['ok'] and not first['unchanged']
+    assert _download(url, tmp_path / 'out', cache)['unchanged']
+
+    # The file the entry points at is gone, so it is fetched and written again
+    (tmp_path / 'out' / 'contacts.csv').unlink()
+    third = _download(url, tmp_path / 'out', cache)
+    assert third['ok'] and not third['unchanged']
+    assert (tmp_path / 'out' / 'contacts.csv').read_bytes() == BODY
+    assert cache.stats() == {'misses': 2, 'not_modified': 1, 'entries': 1}
+    cache.close()
+
+
+def test_deferred_downloads_count_once_confirmed(url, tmp_path):
+    cache = FetchCache(str(tmp_path / 'cache'))
+    first = _download(url, tmp_path / 'out', cache, confirm=False)
+    assert cache.get(url) is None
+
+    # Not processed yet: the next run downloads it again
+    second = _download(url, tmp_path / 'out', cache, confirm=False)
+    assert not second['unchanged']
+
+    artifact = tmp_path / 'out' / 'contacts.parquet'
+    artifact.write_bytes(b'')
+    assert confirm(cache, io.StringIO(json.dumps({**second, 'artifact': str(artifact)}) + '\n')) == 1
+    assert cache.get(url)['sha256'] == first['sha256']
+    assert _download(url, tmp_path / 'out', cache, confirm=False)['unchanged']
+    cache.close()
+
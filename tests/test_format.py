@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from utils import format as fmt
+from utils import synth
+from utils.contacts import ContactIndex
+
+CONTACTS = (
+    'Name,Phone,Cell Phone,State\n'
+    'Ann Lee,2125551234,3035550001,FL\n'
+    'Bob Ray,2125551235,3035550002,FL\n'
+    'Cy Dunn,,3035550003,FL\n'
+    'Di Park,2125551236,,FL\n'
+)
+
+
+def _contacts_dir(tmp_path, text=CONTACTS):
+    input_dir = tmp_path / 'in'
+    input_dir.mkdir()
+    (input_dir / 'contacts.csv').write_text(text)
+    return input_dir
+
+
+def _read(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def test_chunked_output_matches_whole_file(tmp_path):
+    input_dir = _contacts_dir(tmp_path)
+    fmt.process_directory(str(input_dir), str(tmp_path / 'whole.csv'))
+    fmt.process_directory(str(input_dir), str(tmp_path / 'chunked.csv'), chunksize=2)
+    
+    whole = _read(tmp_path / 'whole.csv')
+    assert whole['phone'].tolist() == ['2125551234', '2125551235', '2125551236']
+    pd.testing.assert_frame_equal(_read(tmp_path / 'chunked.csv'), whole)
+
+
+def test_text_float_phones_are_kept(tmp_path):
+    input_dir = _contacts_dir(tmp_path, 'Name,Phone,State\nAnn Lee,3055550100.0,FL\nBob Ray,2125551235,FL\n')
+    fmt.process_directory(str(input_dir), str(tmp_path / 'out.csv'))
+    assert _read(tmp_path / 'out.csv')['phone'].tolist() == ['3055550100', '2125551235']
+
+
+@pytest.mark.parametrize('chunksize', [None, 2])
+def test_index_records_each_run(tmp_path, chunksize):
+    input_dir = _contacts_dir(tmp_path)
+    index_path = str(tmp_path / 'contacts.db')
+    for _ in range(2):
+        fmt.process_directory(str(input_dir), str(tmp_path / 'out.csv'), chunksize=chunksize, index_path=index_path)
+    
+    index = ContactIndex(index_path)
+    try:
+        assert [(run_id, rows) for run_id, _, _, rows in index.runs()] == [(1, 3), (2, 3)]
+        assert len(index) == 3
+    finally:
+        index.close()
+
+
+def test_workers_output_is_byte_identical(tmp_path, capsys):
+    input_dir = tmp_path / 'in'
+    synth.generate_directory(str(input_dir), [4096, 8192, 2048, 16384, 4096, 8192, 2048])
+    (input_dir / 'broken.parquet').write_bytes(b'not a parquet file')
+    
+    errors = {}
+    for workers in (1, 3):
+        capsys.readouterr()
+        fmt.process_directory(str(input_dir), str(tmp_path / f'out_{workers}.csv'), workers=workers)
+        errors[workers] = [line for line in capsys.readouterr().out.splitlines() if line.startswith('Error')]
+    
+    assert len(_read(tmp_path / 'out_1.csv')) > 100
+    assert (tmp_path / 'out_1.csv').read_bytes() == (tmp_path / 'out_3.csv').read_bytes()
+    assert len(errors[1]) == 1 and errors[1][0].startswith('Error processing broken.parquet: ')
+    assert errors[3] == errors[1]
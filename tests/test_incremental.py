@@ -0,0 +1,116 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from utils import format as fmt
+from utils.incremental import CACHE_FORMAT, MANIFEST_NAME, NormalizeCache
+from utils.mapping import get_column_mapping_regex
+
+FLORIDA = 'Name,Phone,State\nAnn Lee,3055550100,FL\nBob Ray,3055550101,FL\n'
+GEORGIA = 'Name,Phone,State\nCy Dunn,4045550100,GA\n'
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    input_dir = tmp_path / 'in'
+    input_dir.mkdir()
+    (input_dir / 'florida.csv').write_text(FLORIDA)
+    (input_dir / 'georgia.csv').write_text(GEORGIA)
+    return input_dir
+
+
+def _run(input_dir, tmp_path, capsys, **options):
+    """Normalize input_dir with the cache; returns the output phones and the cache summary line."""
+    capsys.readouterr()
+    fmt.process_directory(str(input_dir), str(tmp_path / 'out.csv'), cache_dir=str(tmp_path / 'cache'), **options)
+    summary = [line for line in capsys.readouterr().out.splitlines() if line.startswith('Reused')]
+    phones = sorted(pd.read_csv(tmp_path / 'out.csv', dtype=str)['phone'])
+    return phones, summary[0]
+
+
+def _bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_lookup_checks_size_mtime_and_hash(tmp_path):
+    path = tmp_path / 'florida.csv'
+    path.write_text(FLORIDA)
+    cache = NormalizeCache(str(tmp_path / 'cache'), 'v1')
+    frame = pd.DataFrame({'phone': ['3055550100']})
+    cache.store(str(path), frame, {'rows': 1})
+
+    df, stats = cache.lookup(str(path))
+    pd.testing.assert_frame_equal(df, frame)
+    assert stats == {'rows': 1}
+
+    # Touched but identical: hashed, still a hit
+    _bump_mtime(path)
+    assert cache.lookup(str(path)) is not None
+
+    # Same size, different contents: the hash tells
+    path.write_text(FLORIDA.replace('0100', '0199'))
+    _bump_mtime(path)
+    assert cache.lookup(str(path)) is None
+
+    path.write_text(FLORIDA + 'Di Park,3055550102,FL\n')
+    assert cache.lookup(str(path)) is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_settings_key_and_format_are_part_of_the_entry(tmp_path):
+    path = tmp_path / 'florida.csv'
+    path.write_text(FLORIDA)
+    cache = NormalizeCache(str(tmp_path / 'cache'), 'v1')
+    cache.store(str(path), pd.DataFrame({'phone': ['3055550100']}), {})
+    cache.save()
+
+    reloaded = NormalizeCache(str(tmp_path / 'cache'), 'v1')
+    reloaded.load()
+    assert reloaded.lookup(str(path)) is not None
+
+    other = NormalizeCache(str(tmp_path / 'cache'), 'v2')
+    other.load()
+    assert other.lookup(str(path)) is None
+
+    with open(tmp_path / 'cache' / MANIFEST_NAME) as f:
+        entry = next(iter(json.load(f)['files'].values()))
+    assert entry['settings'] == f'{CACHE_FORMAT}:v1'
+
+
+def test_unchanged_files_are_served_from_cache(input_dir, tmp_path, capsys):
+    first, summary = _run(input_dir, tmp_path, capsys)
+    assert summary == 'Reused 0 cached files, normalized 2'
+    assert _run(input_dir, tmp_path, capsys) == (first, 'Reused 2 cached files, normalized 0')
+
+    (input_dir / 'georgia.csv').write_text(GEORGIA + 'Di Park,4045550101,GA\n')
+    phones, summary = _run(input_dir, tmp_path, capsys)
+    assert summary == 'Reused 1 cached files, normalized 1'
+    assert phones == first + ['4045550101']
+
+
+def test_mapping_change_or_full_rebuilds(input_dir, tmp_path, capsys, monkeypatch):
+    first, _ = _run(input_dir, tmp_path, capsys)
+    assert _run(input_dir, tmp_path, capsys, full=True) == (first, 'Reused 0 cached files, normalized 2')
+
+    mapping = {**get_column_mapping_regex(), r'(?i)(mobile)': 'phone'}
+    monkeypatch.setattr(fmt, 'get_column_mapping_regex', lambda: mapping)
+    assert _run(input_dir, tmp_path, capsys) == (first, 'Reused 0 cached files, normalized 2')
+    assert _run(input_dir, tmp_path, capsys) == (first, 'Reused 2 cached files, normalized 0')
+
+
+def test_deleted_inputs_are_pruned(input_dir, tmp_path, capsys):
+    _run(input_dir, tmp_path, capsys)
+    cache_dir = tmp_path / 'cache'
+    assert len(list(cache_dir.glob('*.pkl'))) == 2
+
+    (input_dir / 'georgia.csv').unlink()
+    phones, summary = _run(input_dir, tmp_path, capsys)
+    assert summary == 'Reused 1 cached files, normalized 0'
+    assert phones == ['3055550100', '3055550101']
+
+    with open(cache_dir / MANIFEST_NAME) as f:
+        assert list(json.load(f)['files']) == [str(input_dir / 'florida.csv')]
+    assert len(list(cache_dir.glob('*.pkl'))) == 1
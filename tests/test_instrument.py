@@ -0,0 +1,31 @@
+import tracemalloc
+
+from utils.instrument import RunReport, StageRecorder
+
+
+def test_keep_hottest_profiles_only_prunes_this_run(tmp_path):
+    for name in ('slow.csv.prof', 'fast.csv.prof', 'earlier_run.csv.prof', 'notes.prof'):
+        (tmp_path / name).write_bytes(b'')
+    report = RunReport('format', profile_dir=str(tmp_path), profile_top=1)
+    report.add_file('slow.csv', [{'stage': 'read', 'seconds': 2.0}])
+    report.add_file('fast.csv', [{'stage': 'read', 'seconds': 1.0}])
+    
+    report.keep_hottest_profiles()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['earlier_run.csv.prof', 'notes.prof', 'slow.csv.prof']
+
+
+def test_traced_peak_is_the_stage_own():
+    recorder = StageRecorder()
+    tracemalloc.start()
+    try:
+        with recorder.stage('allocate'):
+            held = bytearray(32 * 1024 * 1024)
+        with recorder.stage('reuse'):
+            len(held)
+    finally:
+        tracemalloc.stop()
+    
+    allocate, reuse = recorder.stages
+    assert allocate['traced_peak_mb'] >= 31
+    assert reuse['traced_peak_mb'] < 1
+    assert reuse['process_peak_rss_mb'] >= allocate['process_peak_rss_mb']
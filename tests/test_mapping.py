@@ -0,0 +1,65 @@
+import re
+
+import pytest
+
+from utils import mapping
+from utils.synth import HEADER_SPELLINGS, NOISE_COLUMNS
+
+
+def _match_one_by_one(column, column_mapping):
+    """The per-pattern loop the combined matcher replaced."""
+    for pattern, target in column_mapping.items():
+        if re.match(pattern, column):
+            return target
+    return None
+
+
+def _spellings():
+    names = [name for names in HEADER_SPELLINGS.values() for name in names] + NOISE_COLUMNS
+    extra = ['Phone Number', 'Contact Phone Ext', 'StateCode', 'Zip4', ' Phone', 'E-mail', 'Business name ',
+             'Full_Name', 'first-name', 'Fax', 'Statement', 'emails', 'Zip Code', '', 'PHONE 2', 'ZIP+4']
+    return sorted({respelled for name in names + extra
+                   for respelled in (name, name.upper(), name.lower(), name.replace(' ', ''))})
+
+
+@pytest.fixture
+def header_cache(monkeypatch):
+    monkeypatch.setattr(mapping, '_header_cache', {})
+
+
+@pytest.mark.parametrize('column', _spellings())
+def test_combined_matcher_matches_pattern_loop(column):
+    column_mapping = mapping.get_column_mapping_regex()
+    assert mapping.match_column_with_regex(column, column_mapping) == _match_one_by_one(column, column_mapping)
+
+
+def test_inline_flags_stay_with_their_pattern():
+    column_mapping = {r'(Phone)': 'exact', r'(?i)(phone)': 'any_case', r'(?i)fax|(?i:tel)': 'fax'}
+    for column in ['Phone', 'phone', 'PHONE', 'Fax', 'TEL', 'other']:
+        assert mapping.match_column_with_regex(column, column_mapping) == _match_one_by_one(column, column_mapping)
+
+
+def test_header_cache_round_trip(tmp_path, header_cache):
+    column_mapping = mapping.get_column_mapping_regex()
+    header = ['Contact Name', 'Cell Phone', 'Notes']
+    assert mapping.resolve_header(header, column_mapping) == [['first_name', 'last_name'], 'phone', None]
+    mapping.save_header_cache(str(tmp_path / 'headers.json'), column_mapping)
+
+    mapping._header_cache.clear()
+    assert mapping.load_header_cache(str(tmp_path / 'headers.json'), column_mapping) == 1
+    assert mapping.cached_headers(column_mapping) == {tuple(header): [['first_name', 'last_name'], 'phone', None]}
+
+
+def test_mapping_change_discards_saved_headers(tmp_path, header_cache):
+    column_mapping = mapping.get_column_mapping_regex()
+    header = ['Notes', 'Phone']
+    mapping.resolve_header(header, column_mapping)
+    # Stand-in for mappings resolved under the old table that are now wrong
+    mapping.cached_headers(column_mapping)[tuple(header)] = ['stale', 'stale']
+    mapping.save_header_cache(str(tmp_path / 'headers.json'), column_mapping)
+
+    changed = {**column_mapping, r'(?i)(notes)': 'notes'}
+    assert mapping.column_mapping_version(changed) != mapping.column_mapping_version(column_mapping)
+    mapping._header_cache.clear()
+    assert mapping.load_header_cache(str(tmp_path / 'headers.json'), changed) == 0
+    assert mapping.resolve_header(header, changed) == ['notes', 'phone']
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import normalize
+
+PHONES = ['3055550100.0', ' 13055550100.00 ', '(212) 555-1234', '1-212-555-1234', '555-0100', '',
+          '2125551234.5', 'n/a', np.nan]
+
+
+@pytest.mark.parametrize('dtype', [object, str])
+def test_clean_phone_series_matches_clean_phone(dtype):
+    phones = pd.Series(PHONES, dtype=dtype)
+    assert normalize.clean_phone_series(phones).tolist() == [normalize.clean_phone(phone) for phone in PHONES]
+    assert normalize.is_valid_phone_series(phones).tolist() == [normalize.is_valid_phone(phone) for phone in phones]
+
+
+def test_clean_phone_series_reads_float_text_as_numbers():
+    phones = pd.Series(PHONES, dtype=str)
+    assert normalize.clean_phone_series(phones).tolist() == [
+        '3055550100', '3055550100', '2125551234', '2125551234', '', '', '', '', '',
+    ]
+
+
+def test_clean_phone_series_float_column():
+    phones = pd.Series([3055550100.0, 13055550100.0, 2125551234.5, 5550100.0, np.nan])
+    assert normalize.clean_phone_series(phones).tolist() == ['3055550100', '3055550100', '', '', '']
+    assert normalize.clean_phone_series(phones).tolist() == [normalize.clean_phone(phone) for phone in phones]
+
+
+@pytest.mark.parametrize('zips', [
+    pd.Series(['32608-5277', '02134', '6.0', '', 'FL 33101', '3055550100', np.nan], dtype=object),
+    pd.Series([32608.0, 2134.0, np.nan, 3055550100.0]),
+])
+def test_clean_zip_series_matches_clean_zip(zips):
+    assert normalize.clean_zip_series(zips).tolist() == [normalize.clean_zip(zip_code) for zip_code in zips]
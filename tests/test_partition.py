@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from utils.partition import first_record_end, last_record_end, partition_csv, read_csv_range
+from utils.sniff import read_options, sniff_file
+
+HEADER = b'Name,Notes,Phone\n'
+
+RECORDS = [
+    b'Ann Lee,plain,3055550100\n',
+    b'"Bob ""Bobby"" Ray","line one\nline two",3055550101\n',
+    b'Cy Dunn,"comma, and ""quote""",3055550102\n',
+    b'"Di\nPark","""\n""",3055550103\n',
+    b'Ed Cole,,3055550104\n',
+    b'"Flo ""\nJones""","a\r\nb\n\nc",3055550105\n',
+    b'Gus Hill,"""",3055550106\n',
+    b'"","x""\n""y",3055550107\n',
+] * 3
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'quoted.csv'
+    path.write_bytes(HEADER + b''.join(RECORDS))
+    return path
+
+
+def _record_ends():
+    """Offsets, within the data after the header, just past each record."""
+    ends, offset = [], 0
+    for record in RECORDS:
+        offset += len(record)
+        ends.append(offset)
+    return ends
+
+
+def test_ranges_reassemble_the_whole_file(csv_path):
+    expected = pd.read_csv(csv_path, dtype=str, **read_options(sniff_file(str(csv_path))))
+    assert len(expected) == len(RECORDS)
+    boundaries = {len(HEADER) + end for end in _record_ends()}
+
+    for range_bytes in list(range(1, 80)) + [100, 250, 1000, 10 ** 6]:
+        header, ranges = partition_csv(str(csv_path), range_bytes)
+        assert header == HEADER
+        assert ranges[0][0] == len(HEADER) and ranges[-1][1] == csv_path.stat().st_size
+        assert all(end in boundaries and end == next_start
+                   for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+
+        parts = [read_csv_range(str(csv_path), start, end, header) for start, end in ranges]
+        pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True), expected)
+
+
+def test_record_ends_in_partial_buffers():
+    data = b''.join(RECORDS)
+    ends = _record_ends()
+    starts = [0] + ends[:-1]
+    for start in starts:
+        following = [end for end in ends if end > start]
+        for cut in range(start, len(data) + 1):
+            buffer = data[start:cut]
+            complete = [end for end in following if end <= cut]
+            assert last_record_end(buffer) == (complete[-1] - start if complete else 0)
+            assert first_record_end(buffer) == (complete[0] - start if complete else 0)
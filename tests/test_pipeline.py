@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import http.server
+import threading
+
+import pandas as pd
+import pytest
+
+from utils import format as fmt
+from utils import synth
+from utils.contacts import ContactIndex
+from utils.fetchcache import FetchCache
+from utils.mapping import get_column_mapping_regex
+from utils.pipeline import Pipeline, scrape_filter_frame
+
+pytest.importorskip('aiohttp')
+
+GOOD = b'Name,Phone,State\n' + b''.join(b'Person %d,30555501%02d,FL\n' % (i, i) for i in range(60))
+
+# Promises more bytes than it sends, so the download fails after some batches
+BROKEN = b'Name,Phone,State\n' + b''.join(b'Other %d,21255501%02d,FL\n' % (i, i) for i in range(60))
+
+
+class _FilesHandler(http.server.BaseHTTPRequestHandler):
+    """Serves server.files by name with an ETag; 'broken' files are cut off midway."""
+
+    def do_GET(self):
+        name = self.path.lstrip('/')
+        body = self.server.files.get(name)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body) + (100 if name.startswith('broken') else 0)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _FilesHandler)
+    server.files = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def _run(server, tmp_path, names, output='out.csv', cache=None, **options):
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    pipeline = Pipeline(str(tmp_path / output), get_column_mapping_regex(), batch_bytes=256, **options)
+    results = asyncio.run(pipeline.run([f'{base}/{name}' for name in names], str(tmp_path / 'dl'), cache=cache,
+                                       retries=0, probe=True))
+    return pipeline, results
+
+
+def _rows(path):
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+def test_pipeline_matches_format(server, tmp_path):
+    manifest = synth.generate_directory(str(tmp_path / 'src'), [4096, 8192, 4096, 16384, 4096, 4096])
+    for entry in manifest['files']:
+        server.files[entry['file']] = (tmp_path / 'src' / entry['file']).read_bytes()
+    _run(server, tmp_path, list(server.files))
+
+    fmt.process_directory(str(tmp_path / 'dl'), str(tmp_path / 'expected.csv'))
+    pd.testing.assert_frame_equal(_rows(tmp_path / 'out.csv'), _rows(tmp_path / 'expected.csv'))
+
+
+def test_failed_download_adds_no_rows(server, tmp_path):
+    server.files.update({'good.csv': GOOD, 'broken.csv': BROKEN})
+    pipeline, results = _run(server, tmp_path, ['good.csv', 'broken.csv'], index_path=str(tmp_path / 'contacts.db'))
+
+    assert [result['ok'] for result in results] == [True, False]
+    out = _rows(tmp_path / 'out.csv')
+    assert len(out) == pipeline.rows == 60
+    assert out['phone'].str.startswith('305').all()
+    index = ContactIndex(str(tmp_path / 'contacts.db'))
+    try:
+        assert len(index) == 60
+    finally:
+        index.close()
+
+
+def test_cache_records_only_committed_files(server, tmp_path):
+    server.files.update({'good.csv': GOOD, 'broken.csv': BROKEN})
+    cache = FetchCache(str(tmp_path / 'cache'))
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    _run(server, tmp_path, ['good.csv', 'broken.csv'], cache=cache)
+    assert cache.get(f'{base}/good.csv') is not None
+    assert cache.get(f'{base}/broken.csv') is None
+
+    # Unchanged: normalized again from the local copy
+    pipeline, results = _run(server, tmp_path, ['good.csv'], output='again.csv', cache=cache)
+    assert results[0]['unchanged'] and pipeline.rows == 60
+    pd.testing.assert_frame_equal(_rows(tmp_path / 'again.csv'), _rows(tmp_path / 'out.csv'))
+    cache.close()
+
+
+def test_scrape_filter_frame():
+    df = pd.DataFrame({
+        'Contact Name': ['Ann Lee', 'Bob Ray', 'Cy Dunn'],
+        'Phone': ['(305) 555-0100', 'n/a', '212.555.1234'],
+        'Cell Phone': [None, '555-0100', '4045550123'],
+        'Company': ['Lee Dental', 'Ray Plumbing', 'Dunn Co'],
+        'State': ['FL', 'FL', 'GA'],
+    }, dtype=object)
+    out = scrape_filter_frame(df, ['name', 'phone', 'zip', 'contact', 'email', 'state'])
+    assert list(out.columns) == ['Contact Name', 'State', 'Phone']
+    assert out.values.tolist() == [
+        ['Ann Lee', 'FL', '3055550100'],
+        ['Cy Dunn', 'GA', '2125551234'],
+        ['Cy Dunn', 'GA', '4045550123'],
+    ]
+
+
+def test_scrape_filters(server, tmp_path):
+    server.files.update({
+        'agents.csv': b'Name,Phone,State\nAnn Lee,3055550100,FL\nReal estate AGENT,3055550101,FL\n',
+        'contacts.csv': (b'Contact Name,Phone,Cell Phone,Company Name,State\n'
+                         b'Ann Lee,(305) 555-0100,,Lee Dental,FL\n'
+                         b'Bob Ray,n/a,555-0100,Ray Plumbing,FL\n'
+                         b'Cy Dunn,212.555.1234,404-555-0123,Dunn Co,GA\n'),
+    })
+    pipeline, _ = _run(server, tmp_path, ['agents.csv', 'contacts.csv'], forbidden_terms=['agent', 'broker'],
+                       column_keywords=['name', 'phone', 'zip', 'contact', 'email', 'state'])
+
+    out = pd.read_csv(tmp_path / 'out.csv', dtype=str, keep_default_na=False)
+    assert out[['first_name', 'last_name', 'business_name', 'phone', 'state']].values.tolist() == [
+        ['Ann', 'Lee', 'Lee Dental', '3055550100', 'FL'],
+        ['Cy', 'Dunn', 'Dunn Co', '2125551234', 'GA'],
+        ['Cy', 'Dunn', 'Dunn Co', '4045550123', 'GA'],
+    ]
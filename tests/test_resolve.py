@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from utils import format as fmt
+from utils.resolve import KEY_FIELDS, resolve_file, resolve_frame
+
+CONTACTS = pd.DataFrame({
+    'first_name': ['Ann', 'Ann', '', 'Bob'],
+    'last_name': ['Lee', 'Lee', '', 'Ray'],
+    'business_name': ['Lee Dental LLC', 'Lee Dental', 'Lee Dental Inc', 'Ray Plumbing'],
+    'phone': ['3055550100', '3055550199', '3055550100', '2125551234'],
+    'zip': ['33101', '33101', '', '10001'],
+    'email': ['ann@leedental.com', 'office@leedental.com', '', 'bob@gmail.com'],
+})
+
+
+def test_resolve_frame_links_same_business():
+    clusters, stats = resolve_frame(CONTACTS, 'business')
+    assert clusters.tolist() == [0, 0, 0, 1]
+    assert stats['rows'] == 4 and stats['clusters'] == 2
+
+
+@pytest.mark.parametrize('entity', ['contact', 'business'])
+def test_resolve_frame_without_rows(entity):
+    clusters, stats = resolve_frame(CONTACTS.iloc[:0], entity)
+    assert len(clusters) == 0
+    assert stats['rows'] == stats['candidate_pairs'] == stats['clusters'] == 0
+
+
+def test_resolve_file_header_only(tmp_path):
+    path = tmp_path / 'out.csv'
+    path.write_text(','.join(KEY_FIELDS + ['state']) + '\n')
+    assert resolve_file(str(path), str(path), 'business')['clusters'] == 0
+    assert path.read_text() == ','.join(KEY_FIELDS + ['state', 'cluster_id']) + '\n'
+
+
+def test_format_resolve_after_state_filter_removes_every_row(tmp_path):
+    input_dir = tmp_path / 'in'
+    input_dir.mkdir()
+    (input_dir / 'contacts.csv').write_text('Name,Phone,State\nAnn Lee,3055550100,CA\n')
+    output = tmp_path / 'out.csv'
+    fmt.process_directory(str(input_dir), str(output), resolve='business')
+    
+    out = pd.read_csv(output, dtype=str)
+    assert len(out) == 0 and out.columns[-1] == 'cluster_id'
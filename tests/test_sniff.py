@@ -0,0 +1,68 @@
+import pytest
+
+from utils import sniff
+from utils.tableio import read_text_csv
+
+TEXT = (
+    'Contact Name,Phone,State\n'
+    'José Müller,3055550100,FL\n'
+    'Ann Lee,3055550101,FL\n'
+    'Zoë Ray,4045550102,GA\n'
+)
+
+NAMES = ['José Müller', 'Ann Lee', 'Zoë Ray']
+
+FILES = {
+    'utf8.csv': (TEXT.encode('utf-8'), 'utf-8', ',', 0),
+    'utf8_bom.csv': (TEXT.encode('utf-8-sig'), 'utf-8-sig', ',', 0),
+    'cp1252.csv': (TEXT.encode('cp1252'), 'cp1252', ',', 0),
+    'utf16.csv': (TEXT.encode('utf-16'), 'utf-16', ',', 0),
+    'utf16le.csv': (TEXT.encode('utf-16-le'), 'utf-16-le', ',', 0),
+    'semicolon.csv': (TEXT.replace(',', ';').encode('utf-8'), 'utf-8', ';', 0),
+    'tab.csv': (TEXT.replace(',', '\t').encode('utf-8'), 'utf-8', '\t', 0),
+    'title_rows.csv': (('Contractor export\nGenerated 2024-01-01\n' + TEXT).encode('utf-8'), 'utf-8', ',', 2),
+}
+
+
+@pytest.mark.parametrize('name', FILES)
+def test_sniffed_files_parse(name, tmp_path):
+    data, encoding, delimiter, header_row = FILES[name]
+    path = tmp_path / name
+    path.write_bytes(data)
+
+    dialect = sniff.sniff_file(str(path))
+    assert dialect == {'encoding': encoding, 'delimiter': delimiter, 'quotechar': '"', 'header_row': header_row}
+    assert sniff.is_default(dialect) == (name == 'utf8.csv')
+
+    df = read_text_csv(str(path))
+    assert list(df.columns) == ['Contact Name', 'Phone', 'State']
+    assert df['Contact Name'].tolist() == NAMES
+    assert df['Phone'].tolist() == ['3055550100', '3055550101', '4045550102']
+
+
+def test_truncated_prefix_is_still_utf8():
+    data = TEXT.encode('utf-8')
+    cut = data.index('é'.encode('utf-8')) + 1
+    assert sniff.detect_encoding(data[:cut]) == 'utf-8'
+    assert sniff.detect_encoding(data[:cut], complete=True) == 'cp1252'
+
+
+def test_cp1252_past_the_sniffed_prefix_falls_back(tmp_path):
+    # UTF-8 for the sniffed prefix, then a cp1252 row further into the file
+    filler = ''.join(f'Ann Lee,30555{i:05d},FL\n' for i in range(sniff.SNIFF_BYTES // 20))
+    path = tmp_path / 'mixed.csv'
+    path.write_bytes(TEXT.encode('utf-8') + filler.encode('utf-8') + 'Zoë Ray,4045559999,GA\n'.encode('cp1252'))
+    assert sniff.sniff_file(str(path))['encoding'] == 'utf-8'
+
+    before = sniff.fallback_decodes
+    df = read_text_csv(str(path))
+    assert sniff.fallback_decodes > before
+    assert len(df) == 3 + filler.count('\n') + 1
+    assert df['Contact Name'].iloc[-1] == 'Zoë Ray'
+
+
+def test_malformed_lines_cost_only_their_rows(tmp_path):
+    path = tmp_path / 'extra_fields.csv'
+    path.write_text(TEXT + 'a,b,c,d,e,f,g\n' + TEXT.split('\n', 1)[1], encoding='utf-8')
+    df = read_text_csv(str(path))
+    assert df['Contact Name'].tolist() == NAMES * 2
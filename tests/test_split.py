@@ -0,0 +1,46 @@
+import io
+import json
+
+from utils import split
+from utils import synth
+from utils.tableio import read_table
+
+
+def _serve(requests):
+    stdout = io.StringIO()
+    split.serve(io.StringIO(''.join(json.dumps(request) + '\n' for request in requests)), stdout)
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+def test_serve_records_stages_for_generated_files(tmp_path):
+    manifest = synth.generate_directory(str(tmp_path / 'in'), [2048] * 4)
+    requests = [
+        {'id': entry['file'], 'input': str(tmp_path / 'in' / entry['file']), 'output': str(tmp_path / entry['file'])}
+        for entry in manifest['files']
+    ]
+    responses = _serve(requests)
+    
+    assert [response['id'] for response in responses] == [request['id'] for request in requests]
+    for request, response in zip(requests, responses):
+        assert response['ok'], response
+        assert response['rows'] == len(read_table(request['output']))
+        
+        stages = {stage['stage']: stage for stage in response['stages']}
+        assert list(stages) == ['read', 'expand_phone_rows', 'write']
+        assert all(stage['seconds'] >= 0 for stage in stages.values())
+        assert stages['read']['bytes_read'] == (tmp_path / 'in' / request['id']).stat().st_size
+        assert stages['read']['rows_out'] == stages['expand_phone_rows']['rows_in']
+        assert stages['expand_phone_rows']['rows_out'] == response['rows'] == stages['write']['rows_in']
+        assert stages['write']['bytes_written'] == (tmp_path / request['id']).stat().st_size
+
+
+def test_serve_reports_failures_and_keeps_going(tmp_path):
+    source = tmp_path / 'a.csv'
+    source.write_text('Name,Phone\nAnn,3055550100\n')
+    responses = _serve([
+        {'id': 1, 'input': str(tmp_path / 'missing.csv')},
+        {'id': 2, 'input': str(source), 'output': str(tmp_path / 'b.csv')},
+    ])
+    
+    assert responses[0]['id'] == 1 and not responses[0]['ok'] and responses[0]['error']
+    assert responses[1]['id'] == 2 and responses[1]['ok'] and responses[1]['rows'] == 1
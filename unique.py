@@ -1,24 +1,19 @@
-import pandas as pd
 import argparse
 
+from utils.csvtool import unique_values
+
 def print_unique_states(file_name="louisiana.csv"):
     try:
-        # Load the CSV file into a DataFrame
-        df = pd.read_csv(file_name)
-
-        # Ensure the 'State' column exists
-        if "State" not in df.columns:
-            print(f"Error: The column 'State' does not exist in {file_name}.")
-            return
-
-        # Get unique values in the 'State' column
-        unique_states = df["State"].dropna().unique()
+        # Stream only the 'State' column, keeping each value once
+        unique_states = unique_values(file_name, "State")
 
         # Print unique states
         print("Unique values in the 'State' column:")
         for state in unique_states:
             print(state)
 
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
     except FileNotFoundError:
         print(f"Error: The file '{file_name}' does not exist.")
     except Exception as e:
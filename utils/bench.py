@@ -0,0 +1,681 @@
+import argparse
+import asyncio
+import contextlib
+import filecmp
+import http.server
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import download
+from utils import format as fmt
+from utils import normalize
+from utils import pipeline
+from utils import resolve
+from utils import schema
+from utils import sniff
+from utils import synth
+from utils import split
+from utils import tableio
+from utils.instrument import peak_rss_mb
+
+
+def synthetic_contacts(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Build a scrape-like frame with two phone columns and comma-joined numbers."""
+    rng = np.random.default_rng(seed)
+    numbers = rng.integers(2000000000, 9999999999, size=rows).astype(str)
+    phones = np.where(rng.random(rows) < 0.2, np.char.add(np.char.add(numbers, ', 1'), numbers), numbers)
+    phones = np.where(rng.random(rows) < 0.1, '', phones)
+    cells = np.where(rng.random(rows) < 0.5, '', rng.integers(2000000000, 9999999999, size=rows).astype(str))
+    return pd.DataFrame({
+        'Contact Name': np.char.add('Name', np.arange(rows).astype(str)),
+        'Phone': phones,
+        'Cell Phone': cells,
+        'State': rng.choice(['FL', 'GA', 'TX', 'CA'], size=rows),
+        'Zip': rng.integers(10000, 99999, size=rows).astype(float),
+    })
+
+
+def timed(label: str, func, rows: int, repeat: int):
+    """Run func repeat times and print the best rows per second."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<36} {rows:>10} rows  {best:8.3f}s  {rows / best:>12,.0f} rows/s  -> {len(result)} rows")
+    return result
+
+
+def bench_expand(args):
+    df = synthetic_contacts(args.rows)
+    phone_df = df.rename(columns={'Phone': 'phone'}).drop(columns=['Cell Phone'])
+    timed('split.expand_phone_rows', lambda: split.expand_phone_rows(df), args.rows, args.repeat)
+    timed('format.expand_phone_rows', lambda: fmt.expand_phone_rows(df), args.rows, args.repeat)
+    timed('format.expand_phone_numbers', lambda: fmt.expand_phone_numbers(phone_df), args.rows, args.repeat)
+
+
+def bench_normalizers(args):
+    """
+    Scalar .apply normalizers against their Series versions on synthetic
+    columns, in object and Arrow string dtypes; both must give the same values.
+    """
+    rng = np.random.default_rng(0)
+    numbers = rng.integers(1000000000, 19999999999, size=args.rows).astype('float64')
+    numbers[rng.random(args.rows) < 0.05] = np.nan
+    zips = rng.integers(0, 99999, size=args.rows).astype('float64')
+    zips[rng.random(args.rows) < 0.05] = np.nan
+    phone_text = rng.choice(['(212) 555-1234', '1-303-555-0000', '3055550100.0', '555-0100', ''], size=args.rows)
+    zip_text = rng.choice(['32608-5277', '02134', '6.0', ''], size=args.rows)
+
+    phone = (normalize.clean_phone, normalize.clean_phone_series)
+    zip_code = (normalize.clean_zip, normalize.clean_zip_series)
+    columns = {
+        'phone object': (pd.Series(phone_text, dtype=object), *phone),
+        'phone str': (pd.Series(phone_text, dtype=str), *phone),
+        'phone float': (pd.Series(numbers), *phone),
+        'zip object': (pd.Series(zip_text, dtype=object), *zip_code),
+        'zip str': (pd.Series(zip_text, dtype=str), *zip_code),
+        'zip float': (pd.Series(zips), *zip_code),
+        'phone valid': (pd.Series(phone_text, dtype=str), normalize.is_valid_phone, normalize.is_valid_phone_series),
+    }
+    for name, (values, scalar, vectorized) in columns.items():
+        expected = timed(f'{scalar.__name__} {name}', lambda: values.apply(scalar), args.rows, args.repeat)
+        result = timed(f'{vectorized.__name__} {name}', lambda: vectorized(values), args.rows, args.repeat)
+        if result.tolist() != expected.tolist():
+            raise RuntimeError(f"{vectorized.__name__} differs from {scalar.__name__} on {name} values")
+
+
+def bench_formats(args):
+    """Wall time and bytes written for the split -> normalize -> export stages per intermediate format."""
+    extensions = ['.csv'] + (['.parquet', '.arrow'] if tableio.HAS_PYARROW else [])
+    column_mapping = fmt.get_column_mapping_regex()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, 'source.csv')
+        synthetic_contacts(args.rows).to_csv(source, index=False)
+
+        for ext in extensions:
+            intermediate = os.path.join(workdir, f'intermediate{ext}')
+            normalized = os.path.join(workdir, f'normalized{ext}')
+            export = os.path.join(workdir, f'export_{ext[1:]}.csv')
+
+            start = time.perf_counter()
+            split.split_file(source, intermediate)
+            final_df, _ = fmt.normalize_file(intermediate, column_mapping)
+            tableio.write_table(fmt.export_frame(final_df), normalized)
+            if ext != '.csv':
+                tableio.write_table(tableio.read_table(normalized), export)
+            seconds = time.perf_counter() - start
+
+            written = sum(os.path.getsize(p) for p in (intermediate, normalized, export) if os.path.exists(p))
+            print(f"{ext[1:]:<10} {args.rows:>10} rows  {seconds:8.3f}s  {written / 1e6:10.1f} MB written")
+
+
+def bench_schema(args):
+    """Memory of the normalized frame as text columns against the compact schema."""
+    column_mapping = fmt.get_column_mapping_regex()
+    compact, _ = fmt.prepare_frame(synthetic_contacts(args.rows), column_mapping)
+    start = time.perf_counter()
+    text = schema.export_frame(compact)
+    export_seconds = time.perf_counter() - start
+
+    before = schema.frame_memory(text)
+    after = schema.frame_memory(compact)
+    print(f"{len(compact)} normalized rows, export to text {export_seconds:.3f}s")
+    print(f"{'column':<16} {'dtype':<28} {'text MB':>10} {'compact MB':>11} {'ratio':>7}")
+    for col in schema.NORMALIZED_COLUMNS:
+        print(f"{col:<16} {str(compact[col].dtype):<28} {before[col] / 1e6:>10.1f} {after[col] / 1e6:>11.1f} "
+              f"{before[col] / max(after[col], 1):>6.1f}x")
+    total_before, total_after = sum(before.values()), sum(after.values())
+    print(f"{'total':<16} {'':<28} {total_before / 1e6:>10.1f} {total_after / 1e6:>11.1f} "
+          f"{total_before / max(total_after, 1):>6.1f}x")
+
+
+def _heterogeneous_csvs(workdir: str, rows: int) -> dict:
+    """Write the same contacts in the encodings and dialects scraped files arrive in."""
+    df = synthetic_contacts(rows).drop(columns=['Cell Phone'])
+    df['Contact Name'] = np.where(np.arange(rows) % 3 == 0, 'José Müller', df['Contact Name'])
+    text = df.to_csv(index=False)
+    semicolons = df.to_csv(index=False, sep=';')
+    files = {
+        'utf8.csv': text.encode('utf-8'),
+        'utf8_bom.csv': text.encode('utf-8-sig'),
+        'cp1252.csv': text.encode('cp1252'),
+        'utf16.csv': text.encode('utf-16'),
+        'semicolon.csv': semicolons.encode('utf-8'),
+        'tab.csv': df.to_csv(index=False, sep='\t').encode('utf-8'),
+        'title_rows.csv': ('Contractor export\nGenerated 2024-01-01\n' + text).encode('utf-8'),
+        # UTF-8 that switches to cp1252 halfway, past any sniffed prefix
+        'mixed.csv': text[:len(text) // 2].encode('utf-8') + text[len(text) // 2:].encode('cp1252'),
+        'extra_fields.csv': (text + 'a,b,c,d,e,f,g\n' + text.split('\n', 1)[1]).encode('utf-8'),
+    }
+    for name, data in files.items():
+        with open(os.path.join(workdir, name), 'wb') as f:
+            f.write(data)
+    return files
+
+
+def bench_sniff(args):
+    """Contact rows read from heterogeneous files by plain pd.read_csv against the sniffing reader."""
+    with tempfile.TemporaryDirectory() as workdir:
+        files = _heterogeneous_csvs(workdir, args.rows)
+        totals = [0, 0]
+        print(f"{'file':<18} {'detected':<32} {'plain read_csv':>15} {'sniffed':>10}")
+        for name in files:
+            path = os.path.join(workdir, name)
+            counts = []
+            for reader in (lambda: pd.read_csv(path, dtype=str), lambda: tableio.read_text_csv(path)):
+                try:
+                    df = reader()
+                    # Rows only count when the columns were split correctly
+                    counts.append(len(df) if 'Phone' in df.columns else 0)
+                except Exception:
+                    counts.append(0)
+            totals = [total + count for total, count in zip(totals, counts)]
+            detected = sniff.describe(sniff.sniff_file(path)) or 'utf-8, comma-separated'
+            print(f"{name:<18} {detected:<32} {counts[0]:>15} {counts[1]:>10}")
+        print(f"{'total':<18} {'':<32} {totals[0]:>15} {totals[1]:>10}  ({totals[1] - totals[0]} rows recovered)")
+
+
+def synthetic_entities(entities: int, seed: int = 0) -> tuple:
+    """
+    Normalized rows for businesses each scraped one to four times with
+    differently written names, some phones and emails missing. Returns the
+    frame and the true entity of each row.
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array(['Crescent', 'Healthcare', 'Blue', 'Ridge', 'Dental', 'Family', 'Medicine', 'Sunrise',
+                      'Pediatrics', 'Law', 'Group', 'Partners', 'Auto', 'Repair', 'Plumbing', 'Realty'])
+    letters = rng.integers(ord('a'), ord('z') + 1, size=(entities, 7), dtype=np.uint32).view('U7').ravel()
+    names = np.char.add(np.char.add(rng.choice(words, entities), ' '), np.char.capitalize(letters))
+    copies = rng.integers(1, 5, size=entities)
+    entity = np.repeat(np.arange(entities), copies)
+    rows = len(entity)
+
+    base = names[entity]
+    styles = rng.integers(0, 4, size=rows)
+    variants = np.where(styles == 0, np.char.upper(np.char.add(base, ' INC')),
+               np.where(styles == 1, np.char.add(base, ', Inc.'),
+               np.where(styles == 2, np.char.add(base, ' LLC'), base)))
+    phones = (2000000000 + entity * 7).astype(str)
+    domains = np.char.add(np.char.add('biz', entity.astype(str)), '.com')
+    df = pd.DataFrame({
+        'first_name': '', 'last_name': '', 'business_name': variants,
+        'phone': np.where(rng.random(rows) < 0.3, '', phones),
+        'state': 'FL', 'zip': (10000 + entity % 5000).astype(str),
+        'email': np.where(rng.random(rows) < 0.5, '', np.char.add('info@', domains)),
+    })
+    return df, entity
+
+
+def bench_resolve(args):
+    """Blocked entity resolution: pairs scored against all pairs, and agreement with the true entities."""
+    df, entity = synthetic_entities(args.entities)
+    start = time.perf_counter()
+    clusters, stats = resolve.resolve_frame(df, 'business', args.window)
+    seconds = time.perf_counter() - start
+
+    # Rows of one true entity should share a cluster, and clusters should not span entities
+    pairs = pd.DataFrame({'entity': entity, 'cluster': clusters})
+    same_cluster = pairs.groupby(['entity', 'cluster']).size()
+    true_pairs = (pairs.groupby('entity').size() ** 2).sum()
+    found_pairs = (pairs.groupby('cluster').size() ** 2).sum()
+    agreeing = (same_cluster ** 2).sum()
+    print(f"{stats['rows']} rows of {args.entities} entities in {stats['clusters']} clusters, {seconds:.3f}s")
+    print(f"candidate pairs {stats['candidate_pairs']:>12,}  of {stats['naive_pairs']:,} "
+          f"({stats['naive_pairs'] / max(stats['candidate_pairs'], 1):,.0f}x fewer)")
+    print(f"pair precision  {agreeing / found_pairs:>12.4f}")
+    print(f"pair recall     {agreeing / true_pairs:>12.4f}")
+
+
+def bench_partition(args):
+    """Normalize one large CSV as parallel byte ranges across worker counts, against a single worker."""
+    column_mapping = fmt.get_column_mapping_regex()
+    split_bytes = args.range_mb * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as workdir:
+        synthetic_contacts(args.rows).to_csv(os.path.join(workdir, 'large.csv'), index=False)
+        size = os.path.getsize(os.path.join(workdir, 'large.csv'))
+        print(f"{args.rows} rows, {size / 1e6:.1f} MB, {args.range_mb} MB ranges, {os.cpu_count()} cores")
+
+        baseline = None
+        reference = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            results = list(fmt.iter_normalized_files(workdir, ['large.csv'], column_mapping, workers=workers,
+                                                     states=None, split_bytes=split_bytes))
+            seconds = time.perf_counter() - start
+            _, df, _, error = results[0]
+            if error is not None:
+                raise RuntimeError(error)
+
+            baseline = baseline or seconds
+            # Range output depends only on the range boundaries, not on how many workers ran them
+            if workers > 1:
+                if reference is None:
+                    reference = df
+                elif not df.equals(reference):
+                    raise RuntimeError(f"Output with {workers} workers differs")
+            print(f"workers={workers:<3} {seconds:8.3f}s  {args.rows / seconds:>12,.0f} rows/s  "
+                  f"{baseline / seconds:5.2f}x  -> {len(df)} rows")
+
+
+class _StandInHandler(http.server.BaseHTTPRequestHandler):
+    """Local stand-in for scraped hosts: /fast, /slow (delayed), /flaky (503 once) and /missing (404)."""
+    failures: dict = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        kind = self.path.strip('/').split('/')[0]
+        if kind == 'missing':
+            self.send_error(404)
+            return
+        if kind == 'slow':
+            time.sleep(self.server.delay)
+        if kind == 'flaky':
+            with self.lock:
+                first = self.path not in self.failures
+                self.failures[self.path] = True
+            if first:
+                self.send_error(503)
+                return
+
+        body = synthetic_contacts(200).to_csv(index=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_download(args):
+    """Serial against concurrent downloads from a local server with slow, flaky and missing links."""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+    server.delay = args.delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    kinds = ['fast', 'slow', 'flaky', 'missing']
+    urls = [f'{base}/{kinds[i % len(kinds)]}/file_{i}.csv' for i in range(args.links)]
+
+    try:
+        for label, concurrency in (('serial', 1), ('concurrent', args.concurrency)):
+            _StandInHandler.failures = {}
+            with tempfile.TemporaryDirectory() as workdir:
+                start = time.perf_counter()
+                results = asyncio.run(download.download_all(
+                    urls, workdir, concurrency=concurrency, per_host=concurrency, retries=2, backoff=0.05,
+                ))
+                seconds = time.perf_counter() - start
+            ok = sum(result['ok'] for result in results)
+            print(f"{label:<12} {len(urls):>5} links  {seconds:8.3f}s  {ok} downloaded, {len(urls) - ok} failed")
+    finally:
+        server.shutdown()
+
+
+def bench_serve(args):
+    """Feed batches of files to one split.py --serve worker and compare with a process per file."""
+    split_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'split.py')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        inputs = []
+        for i in range(args.files):
+            path = os.path.join(workdir, f'input_{i}.csv')
+            synthetic_contacts(args.rows, seed=i).to_csv(path, index=False)
+            inputs.append(path)
+
+        start = time.perf_counter()
+        for path in inputs:
+            subprocess.run([sys.executable, split_script, path, path + '.spawn.csv'], check=True, capture_output=True)
+        spawn_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        worker = subprocess.Popen([sys.executable, split_script, '--serve'],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for offset in range(0, len(inputs), args.batch):
+            batch = inputs[offset:offset + args.batch]
+            for path in batch:
+                worker.stdin.write(json.dumps({"id": path, "input": path, "output": path + '.serve.csv'}) + "\n")
+            worker.stdin.flush()
+            for path in batch:
+                response = json.loads(worker.stdout.readline())
+                if not response["ok"] or response["id"] != path:
+                    raise RuntimeError(f"Unexpected worker response: {response}")
+        worker.stdin.close()
+        worker.wait()
+        serve_seconds = time.perf_counter() - start
+
+        for path in inputs:
+            if not filecmp.cmp(path + '.spawn.csv', path + '.serve.csv', shallow=False):
+                raise RuntimeError(f"Worker output differs from spawned output for {path}")
+
+    print(f"process per file  {args.files:>6} files  {spawn_seconds:8.3f}s")
+    print(f"--serve worker    {args.files:>6} files  {serve_seconds:8.3f}s  ({spawn_seconds / serve_seconds:.1f}x)")
+
+
+class _ThrottledHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the files of server.directory at about server.rate bytes per second per connection."""
+
+    def do_GET(self):
+        path = os.path.join(self.server.directory, os.path.basename(self.path))
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(64 * 1024)
+                if not block:
+                    break
+                try:
+                    self.wfile.write(block)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Probes hang up after the first block
+                    return
+                time.sleep(len(block) / self.server.rate)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_pipeline(args):
+    """
+    Download-then-normalize against the streaming pipeline, on a generated
+    scale served by a local server throttled per connection.
+    """
+    data_dir, manifest = _suite_data(args.data_dir, args.scale, args.seed)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ThrottledHandler)
+    server.directory = data_dir
+    server.rate = args.mbps * 1e6 / 8
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    urls = [f"{base}/{entry['file']}" for entry in manifest['files']]
+    column_mapping = fmt.get_column_mapping_regex()
+    print(f"{len(urls)} files, {manifest['bytes'] / 1e6:.1f} MB, {args.mbps} Mbit/s per connection, "
+          f"{args.concurrency} connections")
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            asyncio.run(download.download_all(urls, os.path.join(workdir, 'sequential'), concurrency=args.concurrency,
+                                              probe=True))
+            network = time.perf_counter() - start
+            sequential_output = os.path.join(workdir, 'sequential.csv')
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                fmt.process_directory(os.path.join(workdir, 'sequential'), sequential_output)
+                cpu = time.perf_counter() - start
+
+            streamed_output = os.path.join(workdir, 'pipeline.csv')
+            run = pipeline.Pipeline(streamed_output, column_mapping, batch_bytes=int(args.batch_mb * 1024 * 1024),
+                                    normalizers=args.normalizers)
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                asyncio.run(run.run(urls, os.path.join(workdir, 'pipeline'), concurrency=args.concurrency, probe=True))
+
+            # Same rows, in arrival order rather than directory order
+            expected = pd.read_csv(sequential_output, dtype=str, keep_default_na=False)
+            streamed = pd.read_csv(streamed_output, dtype=str, keep_default_na=False)
+            columns = list(expected.columns)
+            if not expected.sort_values(columns, ignore_index=True).equals(streamed.sort_values(columns, ignore_index=True)):
+                raise RuntimeError("Pipeline output differs from download-then-normalize output")
+    finally:
+        server.shutdown()
+
+    print(f"{'download then normalize':<26} {network + cpu:8.2f}s  (network {network:.2f}s + normalize {cpu:.2f}s), "
+          f"first rows after {network + cpu:.2f}s")
+    print(f"{'pipeline':<26} {run.seconds:8.2f}s  ({(network + cpu) / run.seconds:.2f}x, "
+          f"max(network, normalize) {max(network, cpu):.2f}s), first rows after {run.first_rows:.2f}s")
+    print(f"{len(streamed)} rows in both outputs")
+
+
+# Functions timed by the suite, in run order; filter_states reads process_directory's output
+SUITE_CASES = ['process_directory', 'expand_phone_rows', 'filter_states']
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _suite_case(case: str, data_dir: str, workdir: str) -> dict:
+    """
+    Run one suite case in this process, which the suite starts fresh per
+    case so its peak memory is the case's own. Reading inputs is not timed.
+    """
+    normalized = os.path.join(workdir, 'normalized.csv')
+    files = sorted(f for f in os.listdir(data_dir) if f.endswith('.csv'))
+    base_rss = peak_rss_mb()
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if case == 'process_directory':
+            start = time.perf_counter()
+            fmt.process_directory(data_dir, normalized, states=None)
+            seconds = time.perf_counter() - start
+            rows_out = _csv_rows(normalized)
+        elif case == 'expand_phone_rows':
+            seconds, rows_out = 0.0, 0
+            for name in files:
+                df = tableio.read_text_csv(os.path.join(data_dir, name))
+                start = time.perf_counter()
+                rows_out += len(fmt.expand_phone_rows(df))
+                seconds += time.perf_counter() - start
+                del df
+        else:
+            output = os.path.join(workdir, 'filtered.csv')
+            start = time.perf_counter()
+            fmt.filter_states(normalized, output)
+            seconds = time.perf_counter() - start
+            rows_out = _csv_rows(output)
+
+    return {'seconds': seconds, 'rows_out': rows_out, 'base_rss_mb': base_rss, 'peak_rss_mb': peak_rss_mb()}
+
+def _csv_rows(path: str) -> int:
+    return len(pd.read_csv(path, dtype=str, usecols=[0], keep_default_na=False))
+
+def _git_commit() -> dict:
+    def git(*command):
+        return subprocess.run(['git', *command], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    try:
+        return {'commit': git('rev-parse', 'HEAD') or 'unknown',
+                'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+    except OSError:
+        return {'commit': 'unknown', 'dirty': False}
+
+def _suite_environment() -> dict:
+    versions = {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+                'pyarrow': None, 'platform': platform.platform(), 'cpus': os.cpu_count()}
+    if tableio.HAS_PYARROW:
+        import pyarrow
+        versions['pyarrow'] = pyarrow.__version__
+    return versions
+
+def _suite_data(data_dir: str, scale: str, seed: int) -> tuple:
+    """The generated directory of a scale, written on first use and reused after."""
+    sizes = synth.scale_sizes(*synth.SCALES[scale])
+    scale_dir = os.path.join(data_dir, f'{scale}-{seed}')
+    manifest = synth.load_manifest(scale_dir, sizes, seed)
+    if manifest is None:
+        print(f"Generating {scale} data in {scale_dir}...")
+        manifest = synth.generate_directory(scale_dir, sizes, seed)
+    return scale_dir, manifest
+
+def _previous_results(results_dir: str, current: dict, exclude: str) -> str:
+    """The newest other result file in results_dir with a scale and case in common with current."""
+    keys = {(r['scale'], r['case']) for r in current['results']}
+    for name in sorted(os.listdir(results_dir), reverse=True):
+        path = os.path.join(results_dir, name)
+        if not name.endswith('.json') or path == exclude:
+            continue
+        try:
+            with open(path) as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if keys & {(r['scale'], r['case']) for r in previous.get('results', [])}:
+            return path
+    return None
+
+def compare_results(previous: dict, current: dict):
+    """Print each case's time and peak memory next to the same case in an earlier result file."""
+    before = {(r['scale'], r['case']): r for r in previous['results']}
+    print(f"Compared with {previous['commit'][:10]} ({previous['created']}):")
+    print(f"{'scale':<8} {'case':<20} {'seconds':>9} {'before':>9} {'change':>8} {'peak MB':>9} {'before':>9}")
+    for result in current['results']:
+        old = before.get((result['scale'], result['case']))
+        if old is None:
+            continue
+        change = (result['seconds'] - old['seconds']) / old['seconds'] * 100 if old['seconds'] else 0.0
+        print(f"{result['scale']:<8} {result['case']:<20} {result['seconds']:>9.3f} {old['seconds']:>9.3f} "
+              f"{change:>+7.1f}% {result['peak_rss_mb'] or 0:>9.0f} {old['peak_rss_mb'] or 0:>9.0f}")
+
+
+def bench_suite(args):
+    """
+    Time process_directory, expand_phone_rows and filter_states on generated
+    scrape directories at several scales, each case in a fresh process, and
+    store throughput and peak memory as JSON for comparison across commits.
+    """
+    if 'filter_states' in args.cases and 'process_directory' not in args.cases:
+        print("Error: filter_states reads the output of process_directory; run both cases.")
+        sys.exit(1)
+    args.cases = [case for case in SUITE_CASES if case in args.cases]
+
+    report = {**_git_commit(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': _suite_environment(),
+              'results': []}
+    context = multiprocessing.get_context('spawn')
+
+    print(f"{'scale':<8} {'case':<20} {'files':>6} {'MB':>9} {'rows in':>11} {'rows out':>11} {'seconds':>9} "
+          f"{'rows/s':>11} {'MB/s':>8} {'peak MB':>8}")
+    for scale in args.scales:
+        data_dir, manifest = _suite_data(args.data_dir, scale, args.seed)
+        with tempfile.TemporaryDirectory() as workdir:
+            for case in args.cases:
+                runs = []
+                for _ in range(args.repeat):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        runs.append(executor.submit(_suite_case, case, data_dir, workdir).result())
+                best = min(runs, key=lambda run: run['seconds'])
+                megabytes = manifest['bytes'] / 1e6
+                if case == 'filter_states':
+                    megabytes = os.path.getsize(os.path.join(workdir, 'normalized.csv')) / 1e6
+                rows_in = manifest['rows'] if case != 'filter_states' else _csv_rows(os.path.join(workdir, 'normalized.csv'))
+                result = {
+                    'scale': scale, 'case': case, 'files': len(manifest['files']), 'megabytes': megabytes,
+                    'rows_in': rows_in, 'rows_out': best['rows_out'], 'seconds': best['seconds'],
+                    'rows_per_s': rows_in / best['seconds'] if best['seconds'] else None,
+                    'mb_per_s': megabytes / best['seconds'] if best['seconds'] else None,
+                    'peak_rss_mb': max(run['peak_rss_mb'] or 0 for run in runs) or None,
+                    'base_rss_mb': best['base_rss_mb'],
+                }
+                report['results'].append(result)
+                print(f"{scale:<8} {case:<20} {result['files']:>6} {megabytes:>9.1f} {rows_in:>11} "
+                      f"{result['rows_out']:>11} {result['seconds']:>9.3f} {result['rows_per_s'] or 0:>11,.0f} "
+                      f"{result['mb_per_s'] or 0:>8.1f} {result['peak_rss_mb'] or 0:>8.0f}")
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    path = os.path.join(args.results_dir, f"{report['created'].replace(':', '')}-{report['commit'][:10]}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {path}")
+
+    previous = args.compare or _previous_results(args.results_dir, report, path)
+    if previous:
+        with open(previous) as f:
+            compare_results(json.load(f), report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the CSV normalize pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    expand_parser = subparsers.add_parser("expand", help="Phone explode throughput.")
+    expand_parser.add_argument("--rows", type=int, default=1_000_000, help="Number of synthetic rows.")
+    expand_parser.add_argument("--repeat", type=int, default=3, help="Runs per function; the best is reported.")
+    expand_parser.set_defaults(func=bench_expand)
+
+    normalizers_parser = subparsers.add_parser("normalizers", help="Scalar against Series phone/zip normalizers.")
+    normalizers_parser.add_argument("--rows", type=int, default=1_000_000, help="Number of synthetic values.")
+    normalizers_parser.add_argument("--repeat", type=int, default=3, help="Runs per function; the best is reported.")
+    normalizers_parser.set_defaults(func=bench_normalizers)
+
+    formats_parser = subparsers.add_parser("formats", help="CSV against Parquet/Arrow intermediates.")
+    formats_parser.add_argument("--rows", type=int, default=1_000_000, help="Number of synthetic rows.")
+    formats_parser.set_defaults(func=bench_formats)
+
+    schema_parser = subparsers.add_parser("schema", help="Normalized frame memory, text against compact columns.")
+    schema_parser.add_argument("--rows", type=int, default=1_000_000, help="Number of synthetic rows.")
+    schema_parser.set_defaults(func=bench_schema)
+
+    sniff_parser = subparsers.add_parser("sniff", help="Rows recovered from mixed encodings and dialects.")
+    sniff_parser.add_argument("--rows", type=int, default=20_000, help="Rows per synthetic file.")
+    sniff_parser.set_defaults(func=bench_sniff)
+
+    partition_parser = subparsers.add_parser("partition", help="One large CSV split into parallel byte ranges.")
+    partition_parser.add_argument("--rows", type=int, default=2_000_000, help="Number of synthetic rows.")
+    partition_parser.add_argument("--range-mb", type=int, default=8, help="Target size of each byte range.")
+    partition_parser.add_argument("--workers", type=lambda value: [int(n) for n in value.split(',')], default=[1, 2, 4, 8],
+                                  help="Comma-separated worker counts; 1 normalizes the file whole.")
+    partition_parser.set_defaults(func=bench_partition)
+
+    resolve_parser = subparsers.add_parser("resolve", help="Blocked entity resolution against all-pairs comparison.")
+    resolve_parser.add_argument("--entities", type=int, default=200_000, help="Number of synthetic businesses.")
+    resolve_parser.add_argument("--window", type=int, default=resolve.WINDOW, help="Rows compared inside a block.")
+    resolve_parser.set_defaults(func=bench_resolve)
+
+    download_parser = subparsers.add_parser("download", help="Serial against concurrent downloads from a local server.")
+    download_parser.add_argument("--links", type=int, default=40, help="Number of links to fetch.")
+    download_parser.add_argument("--delay", type=float, default=0.5, help="Seconds each /slow response takes.")
+    download_parser.add_argument("--concurrency", type=int, default=16, help="Concurrent requests.")
+    download_parser.set_defaults(func=bench_download)
+
+    serve_parser = subparsers.add_parser("serve", help="split.py --serve against one process per file.")
+    serve_parser.add_argument("--files", type=int, default=50, help="Number of synthetic input files.")
+    serve_parser.add_argument("--rows", type=int, default=1000, help="Rows per input file.")
+    serve_parser.add_argument("--batch", type=int, default=10, help="Requests written before reading responses.")
+    serve_parser.set_defaults(func=bench_serve)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Download-then-normalize against the streaming pipeline.")
+    pipeline_parser.add_argument("--scale", choices=sorted(synth.SCALES), default="small", help="Generated data to serve.")
+    pipeline_parser.add_argument("--seed", type=int, default=0, help="Seed of the generated data.")
+    pipeline_parser.add_argument("--data-dir", default=os.path.join(REPO_DIR, '.bench_data'),
+                                 help="Where generated directories are kept between runs.")
+    pipeline_parser.add_argument("--mbps", type=float, default=20, help="Megabits per second served per connection.")
+    pipeline_parser.add_argument("--concurrency", type=int, default=4, help="Concurrent downloads.")
+    pipeline_parser.add_argument("--batch-mb", type=float, default=pipeline.BATCH_BYTES / (1024 * 1024),
+                                 help="Megabytes of records per pipeline batch.")
+    pipeline_parser.add_argument("--normalizers", type=int, default=1, help="Pipeline normalizer threads.")
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    suite_parser = subparsers.add_parser("suite", help="End-to-end timings on generated scrape directories, saved as JSON.")
+    suite_parser.add_argument("--scales", type=lambda value: value.split(','), default=['small'],
+                              help=f"Comma-separated scales: {', '.join(synth.SCALES)}.")
+    suite_parser.add_argument("--cases", type=lambda value: value.split(','), default=SUITE_CASES,
+                              help=f"Comma-separated cases, in order: {', '.join(SUITE_CASES)}.")
+    suite_parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the fastest is reported.")
+    suite_parser.add_argument("--seed", type=int, default=0, help="Seed of the generated data.")
+    suite_parser.add_argument("--data-dir", default=os.path.join(REPO_DIR, '.bench_data'),
+                              help="Where generated directories are kept between runs.")
+    suite_parser.add_argument("--results-dir", default=os.path.join(REPO_DIR, '.bench_results'),
+                              help="Where result JSON files are written.")
+    suite_parser.add_argument("--compare", default=None,
+                              help="Result file to compare with (default: the latest other one in --results-dir).")
+    suite_parser.set_defaults(func=bench_suite)
+
+    args = parser.parse_args()
+    args.func(args)
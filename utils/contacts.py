@@ -0,0 +1,186 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.schema import NORMALIZED_COLUMNS, PHONE_DIGITS, export_frame
+
+FIELDS = [col for col in NORMALIZED_COLUMNS if col != 'phone']
+
+# A new non-empty value replaces the stored one; a blank never erases it
+_UPSERT = (
+    f"INSERT INTO contacts (phone, {', '.join(FIELDS)}, first_run, last_run) "
+    f"VALUES (?, {', '.join('?' for _ in FIELDS)}, ?, ?) "
+    f"ON CONFLICT(phone) DO UPDATE SET "
+    + ', '.join(f"{col} = CASE WHEN excluded.{col} != '' THEN excluded.{col} ELSE contacts.{col} END" for col in FIELDS)
+    + ", last_run = excluded.last_run"
+)
+
+
+def phone_key(phone) -> Optional[int]:
+    """Integer key for a phone number in any common format, or None if it is not a 10-digit number."""
+    digits = ''.join(ch for ch in str(phone) if ch.isdigit())
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return int(digits) if len(digits) == PHONE_DIGITS else None
+
+
+class ContactIndex:
+    """
+    SQLite store of contacts keyed on the 10-digit phone number, kept across
+    scrape runs. Each upsert batch belongs to a run; a contact remembers the
+    run it first appeared in and the last run that saw it, so the contacts
+    new since any run can be exported.
+    """
+
+    def __init__(self, path: str):
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        self.db.executescript(f'''
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started REAL NOT NULL,
+                source TEXT,
+                rows INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS contacts (
+                phone INTEGER PRIMARY KEY,
+                {', '.join(f"{col} TEXT NOT NULL DEFAULT ''" for col in FIELDS)},
+                first_run INTEGER NOT NULL,
+                last_run INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS contacts_first_run ON contacts (first_run);
+            CREATE INDEX IF NOT EXISTS contacts_state ON contacts (state);
+        ''')
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def start_run(self, source: str = None) -> int:
+        cursor = self.db.execute('INSERT INTO runs (started, source) VALUES (?, ?)', (time.time(), source))
+        self.db.commit()
+        return cursor.lastrowid
+
+    def upsert(self, df: pd.DataFrame, run_id: int) -> int:
+        """
+        Insert or update a normalized frame (compact or text) in one
+        transaction. Rows without a 10-digit phone are ignored. Returns the
+        number of rows written.
+        """
+        if not len(df):
+            return 0
+        text = export_frame(df[NORMALIZED_COLUMNS])
+        phones = pd.to_numeric(text['phone'], errors='coerce')
+        valid = (text['phone'].str.len() == PHONE_DIGITS).to_numpy() & phones.notna().to_numpy()
+
+        rows = zip(
+            phones[valid].astype(np.int64).tolist(),
+            *(text.loc[valid, col].tolist() for col in FIELDS),
+        )
+        with self.db:
+            self.db.executemany(_UPSERT, ((*row, run_id, run_id) for row in rows))
+            self.db.execute('UPDATE runs SET rows = rows + ? WHERE id = ?', (int(valid.sum()), run_id))
+        return int(valid.sum())
+
+    def upsert_csv(self, path: str, run_id: int, chunksize: int = 100_000) -> int:
+        """Upsert a normalized CSV file chunk by chunk."""
+        rows = 0
+        for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize):
+            rows += self.upsert(chunk, run_id)
+        return rows
+
+    def lookup(self, phone) -> Optional[Dict]:
+        """The stored contact for a phone number, or None."""
+        key = phone_key(phone)
+        if key is None:
+            return None
+        row = self.db.execute(
+            f"SELECT {', '.join(FIELDS)}, first_run, last_run FROM contacts WHERE phone = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'phone': str(key).zfill(PHONE_DIGITS), **dict(zip(FIELDS + ['first_run', 'last_run'], row))}
+
+    def __len__(self) -> int:
+        return self.db.execute('SELECT COUNT(*) FROM contacts').fetchone()[0]
+
+    def state_counts(self) -> Dict[str, int]:
+        return dict(self.db.execute('SELECT state, COUNT(*) FROM contacts GROUP BY state ORDER BY state').fetchall())
+
+    def runs(self) -> Iterable[tuple]:
+        return self.db.execute('SELECT id, started, source, rows FROM runs ORDER BY id').fetchall()
+
+    def export_new(self, output_file: str, since_run: int = 0) -> int:
+        """Write the contacts first seen after run since_run as a normalized CSV. Returns the row count."""
+        cursor = self.db.execute(
+            f"SELECT {', '.join(NORMALIZED_COLUMNS)} FROM contacts WHERE first_run > ? ORDER BY first_run, phone",
+            (since_run,),
+        )
+        phone_position = NORMALIZED_COLUMNS.index('phone')
+        rows = 0
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(NORMALIZED_COLUMNS)
+            for row in cursor:
+                row = list(row)
+                row[phone_position] = str(row[phone_position]).zfill(PHONE_DIGITS)
+                writer.writerow(row)
+                rows += 1
+        return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query and update the phone-keyed contact index.")
+    parser.add_argument("index", help="Path to the SQLite contact index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    upsert_parser = subparsers.add_parser("upsert", help="Add normalized CSV files to the index as one run.")
+    upsert_parser.add_argument("files", nargs="+", help="Normalized CSV files.")
+
+    lookup_parser = subparsers.add_parser("lookup", help="Look up phone numbers.")
+    lookup_parser.add_argument("phones", nargs="+", help="Phone numbers in any format.")
+
+    subparsers.add_parser("counts", help="Contacts per state.")
+    subparsers.add_parser("runs", help="List the runs recorded in the index.")
+
+    export_parser = subparsers.add_parser("export-new", help="Export contacts first seen after a run.")
+    export_parser.add_argument("output_file", help="Path to the output CSV file.")
+    export_parser.add_argument("--since", type=int, default=0, help="Run id; contacts first seen after it are exported.")
+
+    args = parser.parse_args()
+    index = ContactIndex(args.index)
+
+    try:
+        if args.command == "upsert":
+            run_id = index.start_run(','.join(args.files))
+            rows = sum(index.upsert_csv(path, run_id) for path in args.files)
+            print(f"Run {run_id}: upserted {rows} rows, {len(index)} contacts in the index")
+        elif args.command == "lookup":
+            for phone in args.phones:
+                contact = index.lookup(phone)
+                print(f"{phone}: {contact if contact is not None else 'not found'}")
+        elif args.command == "counts":
+            for state, count in index.state_counts().items():
+                print(f"{state or '(none)'}: {count}")
+        elif args.command == "runs":
+            for run_id, started, source, rows in index.runs():
+                print(f"{run_id}\t{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started))}\t{rows}\t{source or ''}")
+        else:
+            rows = index.export_new(args.output_file, args.since)
+            print(f"Exported {rows} contacts first seen after run {args.since} to {args.output_file}")
+    finally:
+        index.close()
@@ -0,0 +1,139 @@
+import argparse
+import os
+import sys
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.tableio import read_header, read_text_csv
+
+# Rows per chunk; memory is bounded by this, not by the file size
+CHUNKSIZE = 100_000
+
+# Column lists removed by rm.py and main.py
+DROP_PRESETS = {
+    'rm': ["Other ZIP Code"],
+    'main': [
+        "Award Title", "Agency", "Branch", "Phase", "Program",
+        "Agency Tracking Number", "Contract", "Proposal Award Date",
+        "Contract End Date", "Solicitation Number", "Solicitation Year",
+        "Solicitation Close Date", "Proposal Receipt Date", "Date of Notification",
+        "Topic Code", "Award Year", "Award Amount", "Duns", "HUBZone Owned",
+        "Socially and Economically Disadvantaged", "Women Owned", "Number Employees",
+        "Company Website", "Address1", "Address2", "City", "Abstract",
+        "Contact Name", "Contact Title",
+        "PI Name", "PI Title",
+        "RI Name", "RI POC Name", "RI POC Phone",
+    ],
+}
+
+
+def _require_column(file_name: str, column: str):
+    if column not in read_header(file_name):
+        raise KeyError(f"The column '{column}' does not exist in {file_name}.")
+
+def _has_value(values: pd.Series) -> pd.Series:
+    return values.notna() & (values != "")
+
+def count_non_empty(file_name: str, column: str = "Phone", chunksize: int = CHUNKSIZE) -> int:
+    """Number of rows with a value in column, reading only that column."""
+    _require_column(file_name, column)
+    return sum(
+        int(_has_value(chunk[column]).sum())
+        for chunk in read_text_csv(file_name, usecols=lambda col: col == column, chunksize=chunksize)
+    )
+
+def unique_values(file_name: str, column: str = "State", chunksize: int = CHUNKSIZE) -> List[str]:
+    """Distinct non-empty values of column in order of first appearance, reading only that column."""
+    _require_column(file_name, column)
+    seen = {}
+    for chunk in read_text_csv(file_name, usecols=lambda col: col == column, chunksize=chunksize):
+        for value in chunk[column].dropna().unique():
+            seen.setdefault(value, None)
+    return list(seen)
+
+def drop_columns(file_name: str, output_file, columns: Iterable[str], chunksize: int = CHUNKSIZE) -> dict:
+    """
+    Copy file_name to output_file (a path or open text stream) without the
+    given columns, chunk by chunk. Returns the kept columns, the row count
+    and the first rows written, for a preview.
+    """
+    columns = set(columns)
+    kept = [col for col in read_header(file_name) if col not in columns]
+    return _copy_chunks(read_text_csv(file_name, usecols=lambda col: col not in columns, chunksize=chunksize),
+                        output_file, kept)
+
+def filter_non_empty(file_name: str, output_file, column: str = "Phone", chunksize: int = CHUNKSIZE) -> dict:
+    """Copy the rows with a value in column to output_file (a path or open text stream), chunk by chunk."""
+    _require_column(file_name, column)
+    chunks = (chunk[_has_value(chunk[column])] for chunk in read_text_csv(file_name, chunksize=chunksize))
+    return _copy_chunks(chunks, output_file, read_header(file_name))
+
+def _copy_chunks(chunks, output_file, columns: List[str]) -> dict:
+    stream = open(output_file, 'w', newline='') if isinstance(output_file, str) else output_file
+    rows = 0
+    preview: Optional[pd.DataFrame] = None
+    try:
+        pd.DataFrame(columns=columns).to_csv(stream, index=False)
+        for chunk in chunks:
+            chunk.to_csv(stream, header=False, index=False)
+            rows += len(chunk)
+            if preview is None or len(preview) < 5:
+                preview = chunk.head(5) if preview is None else pd.concat([preview, chunk.head(5 - len(preview))])
+    finally:
+        if stream is not output_file:
+            stream.close()
+    return {'columns': columns, 'rows': rows, 'preview': preview if preview is not None else pd.DataFrame(columns=columns)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming CSV tools; memory stays bounded by --chunksize rows.")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="Rows read at a time.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    count_parser = subparsers.add_parser("count", help="Count rows with a value in a column.")
+    count_parser.add_argument("file", help="Path to the input CSV file.")
+    count_parser.add_argument("--column", default="Phone", help="Column to check (default: Phone).")
+
+    unique_parser = subparsers.add_parser("unique", help="Print the distinct values of a column.")
+    unique_parser.add_argument("file", help="Path to the input CSV file.")
+    unique_parser.add_argument("--column", default="State", help="Column to list (default: State).")
+
+    drop_parser = subparsers.add_parser("drop", help="Copy a CSV file without some columns.")
+    drop_parser.add_argument("file", help="Path to the input CSV file.")
+    drop_parser.add_argument("output", help="Path to the output CSV file ('-' for stdout).")
+    drop_parser.add_argument("--columns", nargs="+", default=[], help="Columns to remove.")
+    drop_parser.add_argument("--preset", choices=sorted(DROP_PRESETS), help="Remove the column list of rm.py or main.py.")
+
+    filter_parser = subparsers.add_parser("filter-phone", help="Copy the rows with a value in a column.")
+    filter_parser.add_argument("file", help="Path to the input CSV file.")
+    filter_parser.add_argument("output", nargs="?", default="-", help="Path to the output CSV file (default: stdout).")
+    filter_parser.add_argument("--column", default="Phone", help="Column to check (default: Phone).")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "count":
+            count = count_non_empty(args.file, args.column, args.chunksize)
+            print(f"Number of rows with a value in the '{args.column}' column: {count}")
+        elif args.command == "unique":
+            for value in unique_values(args.file, args.column, args.chunksize):
+                print(value)
+        else:
+            output = sys.stdout if args.output == "-" else args.output
+            if args.command == "drop":
+                columns = args.columns + DROP_PRESETS.get(args.preset, [])
+                result = drop_columns(args.file, output, columns, args.chunksize)
+            else:
+                result = filter_non_empty(args.file, output, args.column, args.chunksize)
+            if output is not sys.stdout:
+                print(f"Wrote {result['rows']} rows, {len(result['columns'])} columns to {args.output}")
+    except FileNotFoundError:
+        print(f"Error: The file '{args.file}' does not exist.")
+        sys.exit(1)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+        sys.exit(1)
@@ -0,0 +1,251 @@
+import argparse
+import csv
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Columns making up the dedup key for each --keys choice
+KEY_COLUMNS = {
+    'phone': ['phone'],
+    'phone+email': ['phone', 'email'],
+}
+
+POLICIES = ('first', 'complete')
+
+
+class HashSet:
+    """
+    Set of 64-bit hashes kept as a few sorted NumPy runs (8 bytes per key).
+    New hashes form a new run; runs are merged once there are too many, so
+    adding a chunk never re-sorts the whole set.
+    """
+
+    def __init__(self, max_runs: int = 8):
+        self.runs: List[np.ndarray] = []
+        self.max_runs = max_runs
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self.runs)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(run.nbytes for run in self.runs)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            positions = np.searchsorted(run, hashes)
+            positions[positions == len(run)] = 0
+            found |= run[positions] == hashes
+        return found
+
+    def add(self, hashes: np.ndarray):
+        """Add hashes that are not already in the set."""
+        if len(hashes):
+            self.runs.append(np.sort(hashes))
+        if len(self.runs) > self.max_runs:
+            self.runs = [np.sort(np.concatenate(self.runs))]
+
+    def array(self) -> np.ndarray:
+        return np.concatenate(self.runs) if self.runs else np.array([], dtype=np.uint64)
+
+
+def key_hashes(df: pd.DataFrame, keys: Sequence[str]) -> np.ndarray:
+    """64-bit hash per row of the normalized key columns (emails compared case-insensitively)."""
+    key_df = pd.DataFrame({
+        col: df[col].fillna('').astype(str).str.strip().str.lower() if col == 'email' else df[col].fillna('').astype(str)
+        for col in keys
+    })
+    return pd.util.hash_pandas_object(key_df, index=False).to_numpy(dtype=np.uint64)
+
+def completeness(df: pd.DataFrame) -> np.ndarray:
+    """Number of non-empty fields per row."""
+    return (df.fillna('').astype(str).apply(lambda col: col.str.strip()) != '').sum(axis=1).to_numpy()
+
+def keep_mask(df: pd.DataFrame, hashes: np.ndarray, policy: str) -> np.ndarray:
+    """
+    Boolean mask of the rows to keep within one in-memory frame: the first row
+    per key, or with policy 'complete' the row with the most non-empty fields
+    (the first of those on ties).
+    """
+    if policy == 'first':
+        return ~pd.Series(hashes).duplicated(keep='first').to_numpy()
+
+    order = np.lexsort((np.arange(len(df)), -completeness(df), hashes))
+    first_of_key = np.ones(len(order), dtype=bool)
+    first_of_key[1:] = hashes[order][1:] != hashes[order][:-1]
+    mask = np.zeros(len(df), dtype=bool)
+    mask[order[first_of_key]] = True
+    return mask
+
+
+def _read_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    # Keep every value as the exact text written, blanks included
+    return pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize)
+
+def _append(df: pd.DataFrame, path: str, header: bool = False):
+    df.to_csv(path, mode='a', header=header, index=False)
+
+
+def dedup_file(input_file: str, output_file: str, keys: Sequence[str] = ('phone',), policy: str = 'first',
+               memory_budget: int = 512 * 1024 * 1024, chunksize: int = 100_000, partitions: int = 16) -> Dict[str, int]:
+    """
+    Remove duplicate contacts from a normalized CSV in bounded memory.
+
+    With policy 'first', rows stream straight to the output while the hash
+    set stays within memory_budget. With 'complete', rows are buffered up to
+    the same budget. Past the budget, the remaining rows are spilled to disk
+    buckets partitioned by hash and each bucket is deduplicated on its own,
+    then the buckets are merged back in input order. Returns row counts.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy: {policy}")
+
+    workdir = tempfile.mkdtemp(prefix='dedup_', dir=os.path.dirname(os.path.abspath(output_file)) or None)
+    tmp_output = os.path.join(workdir, 'output.csv')
+    stats = {'rows_in': 0, 'rows_out': 0, 'duplicates': 0, 'partitions': 0}
+
+    try:
+        seen = HashSet()
+        buffered: List[pd.DataFrame] = []
+        buffered_bytes = 0
+        header_written = False
+        columns = None
+        spilling = False
+        seq = 0
+
+        for chunk in _read_chunks(input_file, chunksize):
+            columns = list(chunk.columns)
+            hashes = key_hashes(chunk, keys)
+            chunk_seq = np.arange(seq, seq + len(chunk))
+            seq += len(chunk)
+            stats['rows_in'] += len(chunk)
+
+            if not spilling and policy == 'first':
+                keep = keep_mask(chunk, hashes, 'first') & ~seen.contains(hashes)
+                seen.add(hashes[keep])
+                _append(chunk[keep], tmp_output, header=not header_written)
+                header_written = True
+                stats['rows_out'] += int(keep.sum())
+                if seen.nbytes > memory_budget:
+                    spilling = True
+                    _spill_seen(seen.array(), workdir, partitions)
+                    seen = HashSet()
+                continue
+
+            if not spilling:
+                buffered.append(chunk.assign(_hash=hashes, _seq=chunk_seq))
+                buffered_bytes += int(buffered[-1].memory_usage(deep=True).sum())
+                if buffered_bytes <= memory_budget:
+                    continue
+                spilling = True
+                pending = pd.concat(buffered, ignore_index=True)
+                buffered = []
+            else:
+                pending = chunk.assign(_hash=hashes, _seq=chunk_seq)
+
+            _spill_rows(pending, workdir, partitions)
+
+        if columns is None:
+            shutil.copyfile(input_file, output_file)
+            return stats
+
+        if not header_written:
+            pd.DataFrame(columns=columns).to_csv(tmp_output, index=False)
+
+        if buffered:
+            frame = pd.concat(buffered, ignore_index=True)
+            keep = keep_mask(frame[columns], frame['_hash'].to_numpy(dtype=np.uint64), policy)
+            _append(frame.loc[keep, columns], tmp_output)
+            stats['rows_out'] += int(keep.sum())
+
+        if spilling:
+            stats['partitions'] = partitions
+            stats['rows_out'] += _dedup_partitions(workdir, partitions, columns, policy, tmp_output)
+
+        stats['duplicates'] = stats['rows_in'] - stats['rows_out']
+        os.replace(tmp_output, output_file)
+        return stats
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _partition_path(workdir: str, part: int, kind: str) -> str:
+    return os.path.join(workdir, f'{kind}_{part:03d}')
+
+def _spill_seen(hashes: np.ndarray, workdir: str, partitions: int):
+    """Write the hashes already emitted, split by partition."""
+    parts = hashes % np.uint64(partitions)
+    for part in range(partitions):
+        np.save(_partition_path(workdir, part, 'seen') + '.npy', hashes[parts == part])
+
+def _spill_rows(df: pd.DataFrame, workdir: str, partitions: int):
+    """Append rows, with their hash and input position, to their partition's bucket."""
+    parts = df['_hash'].to_numpy(dtype=np.uint64) % np.uint64(partitions)
+    for part in np.unique(parts):
+        bucket = _partition_path(workdir, int(part), 'rows') + '.csv'
+        _append(df[parts == part], bucket, header=not os.path.exists(bucket))
+
+def _dedup_partitions(workdir: str, partitions: int, columns: List[str], policy: str, output_file: str) -> int:
+    """Deduplicate each bucket in memory, then merge the survivors back by input position."""
+    results = []
+    for part in range(partitions):
+        bucket = _partition_path(workdir, part, 'rows') + '.csv'
+        if not os.path.exists(bucket):
+            continue
+
+        df = pd.read_csv(bucket, dtype=str, keep_default_na=False)
+        hashes = df['_hash'].astype(np.uint64).to_numpy()
+        keep = keep_mask(df[columns], hashes, policy)
+
+        seen_path = _partition_path(workdir, part, 'seen') + '.npy'
+        if os.path.exists(seen_path):
+            seen = HashSet()
+            seen.add(np.load(seen_path))
+            keep &= ~seen.contains(hashes)
+
+        kept = df[keep].assign(_seq=df.loc[keep, '_seq'].astype(np.int64)).sort_values('_seq')
+        result = _partition_path(workdir, part, 'kept') + '.csv'
+        kept[['_seq'] + columns].to_csv(result, header=False, index=False)
+        results.append(result)
+        os.remove(bucket)
+
+    files = [open(path, newline='') for path in results]
+    try:
+        readers = [((int(row[0]), row[1:]) for row in csv.reader(f)) for f in files]
+        rows = 0
+        with open(output_file, 'a', newline='') as out:
+            writer = csv.writer(out, lineterminator='\n')
+            for _, row in heapq.merge(*readers, key=lambda item: item[0]):
+                writer.writerow(row)
+                rows += 1
+        return rows
+    finally:
+        for f in files:
+            f.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove duplicate contacts from a normalized CSV file.")
+    parser.add_argument("input_file", help="Path to the normalized CSV file.")
+    parser.add_argument("output_file", help="Path to the deduplicated CSV file (may equal input_file).")
+    parser.add_argument("--keys", choices=sorted(KEY_COLUMNS), default="phone", help="Columns identifying a contact.")
+    parser.add_argument("--policy", choices=POLICIES, default="first",
+                        help="Keep the first row per key, or the most complete one.")
+    parser.add_argument("--memory-mb", type=int, default=512, help="Memory budget before spilling to disk buckets.")
+
+    args = parser.parse_args()
+
+    try:
+        stats = dedup_file(args.input_file, args.output_file, KEY_COLUMNS[args.keys], args.policy,
+                           memory_budget=args.memory_mb * 1024 * 1024)
+    except Exception as e:
+        print(f"Error deduplicating file: {str(e)}")
+        sys.exit(1)
+
+    print(f"Removed {stats['duplicates']} duplicate rows ({stats['rows_in']} in, {stats['rows_out']} out)")
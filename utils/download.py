@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import posixpath
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.fetchcache import FetchCache
+from utils.probe import PROBE_BYTES, probe_bytes
+
+# Statuses worth retrying; other 4xx responses fail immediately
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def file_name_for(url: str) -> str:
+    """Local file name for a link: the URL path's base name with spaces and %20 turned into '-'."""
+    try:
+        name = posixpath.basename(urlsplit(url).path)
+    except ValueError:
+        name = ''
+    name = name or f'download_{int(time.time() * 1000)}.csv'
+    return name.replace(' ', '-').replace('%20', '-')
+
+
+async def _fetch(session, url: str, path: str, retries: int, backoff: float, chunk_size: int,
+                 cache: Optional[FetchCache] = None, probe: bool = False, sink=None, confirm: bool = True) -> Dict:
+    """
+    Stream one URL to path, retrying connection errors and retryable statuses.
+    With a cache, the request is conditional; a 304, or a body whose hash
+    matches the last one processed, leaves path untouched and is reported as
+    unchanged. A new body's validators are stored with path as its artifact
+    when confirm is set, and are otherwise left in the result (sha256, etag,
+    last_modified) for the caller to store once it has processed the file.
+    With probe, the download is abandoned as soon as its first bytes show
+    the file has no contacts, and it is reported as skipped.
+    With a sink, every block is also awaited into sink.feed as it arrives,
+    and sink.restart() is called before each attempt's body.
+    """
+    result = {'url': url, 'path': path, 'ok': False, 'unchanged': False, 'skipped': False, 'status': None,
+              'bytes': 0, 'attempts': 0, 'error': None}
+    headers = cache.conditional_headers(url) if cache is not None else {}
+    # Unique per request, in case two links map to the same file name
+    part_path = f'{path}.{os.getpid()}-{id(result)}.part'
+
+    for attempt in range(retries + 1):
+        result['attempts'] = attempt + 1
+        try:
+            async with session.get(url, headers=headers) as response:
+                result['status'] = response.status
+                if response.status == 304 and headers:
+                    cache.count('not_modified')
+                    result.update(ok=True, unchanged=True, error=None)
+                    return result
+                if response.status != 200:
+                    result['error'] = f'HTTP {response.status}'
+                    if response.status not in RETRY_STATUSES:
+                        return result
+                else:
+                    if sink is not None:
+                        sink.restart()
+                    written = 0
+                    digest = hashlib.sha256()
+                    head = b'' if probe else None
+                    with open(part_path, 'wb') as f:
+                        async for block in response.content.iter_chunked(chunk_size):
+                            f.write(block)
+                            digest.update(block)
+                            written += len(block)
+                            if head is not None:
+                                head += block
+                                if len(head) >= PROBE_BYTES:
+                                    if _skip(result, head[:PROBE_BYTES], False, written, response.content_length):
+                                        return result
+                                    head = None
+                            if sink is not None:
+                                await sink.feed(block)
+                    if head is not None and _skip(result, head, True, written, written):
+                        return result
+                    result.update(ok=True, bytes=written, error=None)
+
+                    if cache is None:
+                        os.replace(part_path, path)
+                        return result
+
+                    result.update(sha256=digest.hexdigest(), etag=response.headers.get('ETag'),
+                                  last_modified=response.headers.get('Last-Modified'))
+                    entry = cache.get(url)
+                    if entry is not None and entry['sha256'] == result['sha256']:
+                        cache.count('same_hash')
+                        result['unchanged'] = True
+                        # Refresh the validators; the server may have rotated them
+                        cache.store(url, result['sha256'], result['etag'], result['last_modified'], written,
+                                    entry['artifact'])
+                    else:
+                        cache.count('misses')
+                        os.replace(part_path, path)
+                        if confirm:
+                            cache.store(url, result['sha256'], result['etag'], result['last_modified'], written, path)
+                    return result
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            result['error'] = f'{type(e).__name__}: {e}' if str(e) else type(e).__name__
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+        if attempt < retries:
+            await asyncio.sleep(backoff * (2 ** attempt))
+
+    return result
+
+
+def _skip(result: Dict, head: bytes, complete: bool, written: int, total: Optional[int]) -> bool:
+    """Probe the start of a body; mark result skipped when the file has no contacts."""
+    probe = probe_bytes(head, complete=complete)
+    if probe['relevant']:
+        return False
+    result.update(ok=True, skipped=True, bytes=written, error=None, reason=probe['reason'],
+                  bytes_saved=max(total - written, 0) if total is not None else None)
+    return True
+
+
+async def download_all(urls: Iterable[str], dest_dir: str, concurrency: int = 16, per_host: int = 4,
+                       retries: int = 3, backoff: float = 0.5, timeout: float = 60, connect_timeout: float = 10,
+                       chunk_size: int = 64 * 1024, on_result: Optional[Callable[[Dict], None]] = None,
+                       cache: Optional[FetchCache] = None, probe: bool = False,
+                       confirm: bool = True,
+                       sink_factory: Optional[Callable[[str, str], object]] = None) -> List[Dict]:
+    """
+    Download urls into dest_dir concurrently, streaming each body to disk.
+    Connections are pooled per host, with at most concurrency requests in
+    flight overall and per_host per host. Failed requests are retried with
+    exponential backoff, as are connections that send nothing for timeout
+    seconds; a body that keeps arriving is never cut off. With a FetchCache,
+    links that have not changed since they were last processed are not
+    written again; without confirm, new downloads are only recorded once the
+    caller stores them (see _fetch). With probe the download of a file
+    without contacts stops after its first bytes. With sink_factory, each
+    download's body is also streamed into sink_factory(url, path), whose
+    finish(result) is awaited once the download ends. on_result is called as
+    each download finishes; the returned results are in the order of urls.
+    """
+    if aiohttp is None:
+        raise ImportError("aiohttp is required for downloading (pip install aiohttp)")
+
+    os.makedirs(dest_dir, exist_ok=True)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host)
+    # No limit on a whole request, so large dumps can finish; only a stalled
+    # connection (timeout seconds without data) is given up on and retried
+    client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        async def run(url):
+            path = os.path.join(dest_dir, file_name_for(url))
+            sink = sink_factory(url, path) if sink_factory is not None else None
+            result = await _fetch(session, url, path, retries, backoff, chunk_size,
+                                  cache=cache, probe=probe, sink=sink, confirm=confirm)
+            if sink is not None:
+                await sink.finish(result)
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        return await asyncio.gather(*(run(url) for url in urls))
+
+
+def read_links(path: str) -> List[str]:
+    """Read one link per line, skipping blanks and repeats."""
+    stream = sys.stdin if path == '-' else open(path)
+    try:
+        links = [line.strip() for line in stream if line.strip()]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return list(dict.fromkeys(links))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download CSV links concurrently.")
+    parser.add_argument("links_file", help="File with one link per line ('-' for stdin).")
+    parser.add_argument("dest_dir", help="Directory the files are saved in.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight.")
+    parser.add_argument("--per-host", type=int, default=4, help="Maximum requests in flight per host.")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per link after the first attempt.")
+    parser.add_argument("--timeout", type=float, default=60,
+                        help="Seconds a connection may go without receiving data before the request is retried.")
+    parser.add_argument("--cache", help="Directory of the conditional-fetch cache (disabled if omitted).")
+    parser.add_argument("--defer-confirm", action="store_true",
+                        help="Do not record new downloads in the cache; the caller confirms each one with "
+                             "fetchcache.py --confirm once it has processed the file.")
+    parser.add_argument("--probe", action="store_true",
+                        help="Stop downloading files whose first bytes show no contact columns.")
+
+    args = parser.parse_args()
+
+    # One JSON line per finished download, so callers can start on it right away
+    def report(result):
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+    cache = FetchCache(args.cache) if args.cache else None
+    try:
+        results = asyncio.run(download_all(
+            read_links(args.links_file), args.dest_dir, concurrency=args.concurrency, per_host=args.per_host,
+            retries=args.retries, timeout=args.timeout, on_result=report, cache=cache,
+            probe=args.probe, confirm=not args.defer_confirm,
+        ))
+        failed = sum(not result['ok'] for result in results)
+        unchanged = sum(result['unchanged'] for result in results)
+        skipped = [result for result in results if result['skipped']]
+        print(f"Downloaded {len(results) - failed - unchanged - len(skipped)} of {len(results)} links, "
+              f"{unchanged} unchanged, {len(skipped)} skipped without contacts", file=sys.stderr)
+        if skipped:
+            saved = sum(result['bytes_saved'] or 0 for result in skipped)
+            print(f"Skipped files: {saved} bytes not downloaded", file=sys.stderr)
+        if cache is not None:
+            print(f"Fetch cache: {json.dumps(cache.stats())}", file=sys.stderr)
+    finally:
+        if cache is not None:
+            cache.close()
@@ -0,0 +1,68 @@
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def explode_phones(
+    df: pd.DataFrame,
+    phone_columns: List[str],
+    sep: Optional[str] = None,
+    normalize: Optional[Callable[[pd.Series], pd.Series]] = None,
+    dedupe: bool = False,
+) -> pd.DataFrame:
+    """
+    Melt the phone columns of df into one row per phone number.
+
+    Returns a frame with columns 'row' (positional index into df), 'source'
+    (index into phone_columns, -1 when the row has no phone) and 'phone'.
+    Every source row appears at least once, in original order; rows without
+    a usable phone get a single entry with an empty phone.
+    """
+    parts = []
+    for position, col in enumerate(phone_columns):
+        values = df[col]
+        present = values.notna().to_numpy()
+        parts.append(pd.DataFrame({
+            'row': np.flatnonzero(present),
+            'source': position,
+            'phone': values[present].astype(str).str.strip().to_numpy(dtype=object),
+        }))
+
+    long_df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+        {'row': np.array([], dtype=np.int64), 'source': 0, 'phone': np.array([], dtype=object)}
+    )
+
+    # Split comma-separated values, keeping their order within the cell
+    if sep is not None and len(long_df):
+        long_df['phone'] = long_df['phone'].str.split(sep)
+        long_df = long_df.explode('phone', ignore_index=True)
+        long_df['phone'] = long_df['phone'].astype(object)
+
+    long_df = long_df[~long_df['phone'].isin(['', 'nan'])]
+
+    if normalize is not None and len(long_df):
+        long_df = long_df.assign(phone=normalize(long_df['phone']).to_numpy(dtype=object))
+        long_df = long_df[long_df['phone'] != '']
+
+    # Row-major order: by source row, then phone column, then position in cell
+    long_df = long_df.iloc[np.argsort(long_df['row'].to_numpy(), kind='stable')]
+
+    if dedupe:
+        long_df = long_df.drop_duplicates(subset=['row', 'phone'], keep='first')
+
+    has_phone = np.zeros(len(df), dtype=bool)
+    has_phone[long_df['row'].to_numpy()] = True
+    missing = np.flatnonzero(~has_phone)
+
+    rows = np.concatenate([long_df['row'].to_numpy(dtype=np.int64), missing])
+    sources = np.concatenate([long_df['source'].to_numpy(dtype=np.int64), np.full(len(missing), -1)])
+    phones = np.concatenate([long_df['phone'].to_numpy(dtype=object), np.full(len(missing), '', dtype=object)])
+
+    order = np.argsort(rows, kind='stable')
+    return pd.DataFrame({'row': rows[order], 'source': sources[order], 'phone': phones[order]})
+
+
+def find_phone_columns(df: pd.DataFrame) -> List[str]:
+    """Return every column whose name mentions 'phone'."""
+    return [col for col in df.columns if 'phone' in str(col).lower()]
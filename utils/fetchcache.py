@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize a URL for cache lookups: lower-case scheme and host, no default
+    port, no fragment, query parameters sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+class FetchCache:
+    """
+    SQLite-backed record of what each URL returned last time it was processed:
+    ETag, Last-Modified, content length and SHA-256, plus the artifact the
+    body became (the downloaded file, or whatever a caller turned it into).
+    An entry only counts while its artifact exists, so a link whose output
+    was deleted is downloaded again rather than reported unchanged.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'fetch.sqlite'))
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_length INTEGER,
+                sha256 TEXT,
+                artifact TEXT,
+                fetched_at REAL
+            )
+        ''')
+        self.db.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """The entry for a URL, or None when there is none or its artifact is gone."""
+        row = self.db.execute(
+            'SELECT etag, last_modified, content_length, sha256, artifact FROM entries WHERE url = ?',
+            (canonical_url(url),),
+        ).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(('etag', 'last_modified', 'content_length', 'sha256', 'artifact'), row))
+        if not entry['artifact'] or not os.path.exists(entry['artifact']):
+            return None
+        return entry
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a URL whose artifact is still there."""
+        entry = self.get(url)
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, sha256: str, etag: Optional[str], last_modified: Optional[str],
+              content_length: Optional[int], artifact: str):
+        """Record a 200 response once its body has been turned into artifact."""
+        self.db.execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (canonical_url(url), etag, last_modified, content_length, sha256, os.path.abspath(artifact), time.time()),
+        )
+        self.db.commit()
+
+    def count(self, name: str, amount: int = 1):
+        self.db.execute(
+            'INSERT INTO stats VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount),
+        )
+        self.db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Lifetime hit/miss counters plus the number of recorded links."""
+        stats = dict(self.db.execute('SELECT name, value FROM stats').fetchall())
+        stats['entries'] = self.db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        return stats
+
+
+def confirm(cache: FetchCache, stream) -> int:
+    """
+    Store the download results read from stream, one JSON line each, as
+    processed: each carries the url, sha256, etag, last_modified and bytes of
+    download.py's result plus the artifact it became. Returns the count.
+    """
+    confirmed = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        result = json.loads(line)
+        cache.store(result['url'], result['sha256'], result.get('etag'), result.get('last_modified'),
+                    result.get('bytes'), result['artifact'])
+        confirmed += 1
+    return confirmed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or update the conditional-fetch cache.")
+    parser.add_argument("cache_dir", help="Directory of the conditional-fetch cache.")
+    parser.add_argument("--confirm", metavar="FILE",
+                        help="Record the download results in FILE ('-' for stdin, one JSON line each, with an "
+                             "'artifact' path) as processed, committing each line as it is read.")
+
+    args = parser.parse_args()
+
+    cache = FetchCache(args.cache_dir)
+    try:
+        if args.confirm:
+            stream = sys.stdin if args.confirm == '-' else open(args.confirm)
+            try:
+                print(f"Confirmed {confirm(cache, stream)} downloads", file=sys.stderr)
+            finally:
+                if stream is not sys.stdin:
+                    stream.close()
+        else:
+            print(json.dumps(cache.stats()))
+    finally:
+        cache.close()
@@ -1,29 +1,38 @@
+import argparse
 import pandas as pd
+import numpy as np
 import os
+import shutil
 import sys
+import tempfile
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List
-import re
 
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def get_column_mapping_regex() -> Dict[str, str]:
-    """Define regex-based mapping from column patterns to standardized names."""
-    return {
-        r'(?i)(full\s*name|contact\s*name|labeler\s*name|legal\s*contact\s*name|tc\s*name|pi\s*name|ri\s*poc\s*name)': ['first_name', 'last_name'],
-        r'(?i)(first\s*name)': 'first_name',
-        r'(?i)(last\s*name)': 'last_name',
-        r'(?i)(company\s*name|business\s*name)': 'business_name',
-        r'(?i)(mobile\s*phone|cell\s*phone|smartphone|cellular|phone|contact\s*phone|business\s*phone|company\s*phone|legal\s*phone|invoice\s*phone|tc\s*phone|pi\s*phone|ri\s*poc\s*phone)': 'phone',
-        r'(?i)(state|business\s*state|legal\s*state|invoice\s*state|tc\s*state|mailing\s*state|company\s*state)': 'state',
-        r'(?i)(zip|zipcode|postal\s*code|business\s*zip|legal\s*zip|invoice\s*zip|tc\s*zip|mailing\s*zip)': 'zip',
-        r'(?i)(email|email\s*address|contact\s*email|pi\s*email)': 'email'
-    }
+from utils.contacts import ContactIndex
+from utils.dedup import KEY_COLUMNS, POLICIES, dedup_file
+from utils.explode import explode_phones, find_phone_columns
+from utils.normalize import clean_phone_series, clean_zip_series
+from utils.tableio import (
+    TABLE_EXTENSIONS, contact_column_filter, iter_table_chunks, read_contact_table, read_table, table_format,
+    write_table,
+)
+from utils.states import DEFAULT_STATES, filter_state_rows, parse_states
+from utils.schema import NORMALIZED_COLUMNS, compact_frame, concat_frames, export_frame
+from utils.incremental import NormalizeCache
+from utils.instrument import RunReport, StageRecorder, profiled
+from utils.partition import can_partition, partition_csv, read_csv_range
+from utils.sniff import describe, sniff_file
+from utils.probe import PROBE_BYTES, probe_file
+from utils.resolve import ENTITY_NAMES, print_stats, resolve_file
+from utils.mapping import (
+    cached_headers, column_mapping_version, get_column_mapping_regex, load_header_cache, merge_header_cache,
+    resolve_header, save_header_cache,
+)
 
-def match_column_with_regex(column: str, column_mapping: Dict[str, str]) -> str:
-    """Match a column name to its standardized field using regex."""
-    for pattern, target in column_mapping.items():
-        if re.match(pattern, column):
-            return target
-    return None
 
 def split_full_name(df: pd.DataFrame, full_name_col: str) -> pd.DataFrame:
     """Split full name into first and last name."""
@@ -44,36 +53,13 @@ def expand_phone_numbers(df: pd.DataFrame) -> pd.DataFrame:
     if 'phone' not in df.columns:
         return df
     
-    # Create list to store expanded rows
-    expanded_rows = []
+    # Split multiple phone numbers in the same field, keep the valid ones
+    # and drop repeats within each source row
+    exploded = explode_phones(df, ['phone'], sep=',', normalize=clean_phone_series, dedupe=True)
     
-    for _, row in df.iterrows():
-        phones = []
-        base_data = row.drop('phone').to_dict()
-        
-        # Split multiple phone numbers if they exist in the same field
-        potential_phones = str(row['phone']).split(',')
-        
-        # Process each potential phone number
-        for phone in potential_phones:
-            if is_valid_phone(phone):
-                cleaned_phone = clean_phone(phone)
-                if cleaned_phone and cleaned_phone not in phones:
-                    phones.append(cleaned_phone)
-        
-        # If no valid phones found, create one row with empty phone
-        if not phones:
-            base_data['phone'] = ''
-            expanded_rows.append(base_data)
-        else:
-            # Create a new row for each unique phone number
-            for phone in phones:
-                new_row = base_data.copy()
-                new_row['phone'] = phone
-                expanded_rows.append(new_row)
-    
-    # Create new DataFrame with expanded rows
-    result_df = pd.DataFrame(expanded_rows)
+    # Create new DataFrame with one row per unique phone number
+    result_df = df.drop(columns=['phone']).take(exploded['row'].to_numpy()).reset_index(drop=True)
+    result_df['phone'] = exploded['phone'].to_numpy()
     
     return result_df
 
@@ -82,53 +68,289 @@ def expand_phone_rows(df):
     Convert phone number columns into separate rows while preserving other data.
     """
     # Find all phone-related columns
-    phone_columns = [col for col in df.columns if 'phone' in col.lower()]
+    phone_columns = find_phone_columns(df)
     
     if not phone_columns:
         return df
-        
-    # Create a list to store our new rows
-    expanded_rows = []
     
-    # Iterate through each original row
-    for _, row in df.iterrows():
-        has_phone = False
-        
-        # For each phone column, create a new row if there's a valid number
-        for phone_col in phone_columns:
-            phone = str(row[phone_col]).strip()
-            
-            # Skip empty or invalid phones
-            if phone == '' or phone == 'nan' or pd.isna(phone):
-                continue
-                
-            # Create a new row with all original data
-            new_row = row.copy()
-            
-            # Clear all phone columns
-            for pc in phone_columns:
-                new_row[pc] = ''
-                
-            # Set the current phone number in its original column
-            new_row[phone_col] = phone
-            
-            expanded_rows.append(new_row)
-            has_phone = True
-        
-        # If no valid phones were found, preserve the original row
-        if not has_phone:
-            expanded_rows.append(row)
+    exploded = explode_phones(df, phone_columns)
+    source = exploded['source'].to_numpy()
     
-    # Convert back to DataFrame
-    result_df = pd.DataFrame(expanded_rows)
+    # Repeat each original row once per phone number
+    result_df = df.take(exploded['row'].to_numpy())
     
-    # Preserve original column order
-    result_df = result_df[df.columns]
+    # Rows with a phone keep only the current number in its original column;
+    # rows without one are preserved as they were
+    for position, phone_col in enumerate(phone_columns):
+        current = np.where(source == position, exploded['phone'].to_numpy(), '')
+        result_df[phone_col] = np.where(source >= 0, current, result_df[phone_col].to_numpy(dtype=object))
     
     return result_df
 
-def process_directory(input_dir: str, output_file: str):
-    """Process all CSV files in a directory and combine them into one normalized CSV."""
+def leading_phone_columns(df: pd.DataFrame, column_mapping: Dict[str, str]) -> List[str]:
+    """The phone-mapped columns normalize_frame takes numbers from: those non-empty in the first row."""
+    return [
+        col for col, target in zip(df.columns, resolve_header(df.columns, column_mapping))
+        if target == 'phone' and str(df[col].iloc[0]).strip() != ''
+    ]
+
+def normalize_frame(df: pd.DataFrame, column_mapping: Dict[str, str], phone_columns: List[str] = None) -> pd.DataFrame:
+    """
+    Map the columns of one expanded source frame onto the normalized schema.
+    phone_columns overrides leading_phone_columns, for a frame that is part of
+    a larger file whose first row decides.
+    """
+    if phone_columns is None:
+        phone_columns = leading_phone_columns(df, column_mapping)
+    
+    # Collect the mapped columns, later source columns replacing earlier ones
+    columns = {}
+    for col, target in zip(df.columns, resolve_header(df.columns, column_mapping)):
+        if target:
+            if isinstance(target, list):
+                df = split_full_name(df, col)
+                for i, target_col in enumerate(target):
+                    columns[target_col] = df.get(target_col, '')
+            else:
+                if target == 'phone' and col in phone_columns:
+                    columns['phone'] = clean_phone_series(df[col])
+                elif target != 'phone':
+                    columns[target] = df[col]
+    
+    # Build the frame in one step; with nothing mapped it has no rows
+    return pd.DataFrame(columns, index=df.index if columns else None, columns=NORMALIZED_COLUMNS)
+
+def prepare_frame(df: pd.DataFrame, column_mapping: Dict[str, str], states=None, recorder: StageRecorder = None,
+                  phone_columns: List[str] = None):
+    """
+    Expand, normalize, clean and state-filter one source frame, either a whole
+    file or one chunk of it. Returns the frame, in the compact schema of
+    utils/schema.py, and a dict of removed-row counts. Each step is timed on recorder when one is given; phone_columns is passed
+    on to normalize_frame.
+    """
+    recorder = recorder or StageRecorder()
+    
+    # First expand the phone rows while keeping original column structure
+    with recorder.stage('expand_phone_rows', rows_in=len(df)) as record:
+        df = expand_phone_rows(df)
+        record['rows_out'] = len(df)
+    
+    with recorder.stage('normalize_columns', rows_in=len(df)) as record:
+        df = normalize_frame(df, column_mapping, phone_columns)
+        record['rows_out'] = len(df)
+    
+    with recorder.stage('finalize', rows_in=len(df)) as record:
+        df, removed_phones = finalize_frame(df)
+        record['rows_out'] = len(df)
+    
+    with recorder.stage('filter_states', rows_in=len(df)) as record:
+        df, removed_states = filter_state_rows(df, states)
+        record['rows_out'] = len(df)
+    
+    with recorder.stage('compact', rows_in=len(df)) as record:
+        df = compact_frame(df)
+        record['rows_out'] = len(df)
+    return df, {'removed_phones': removed_phones, 'removed_states': removed_states}
+
+def normalize_file(input_path: str, column_mapping: Dict[str, str], engine: str = None, states=None,
+                   recorder: StageRecorder = None):
+    """Read one file and prepare it. Returns the frame and its removed-row counts."""
+    recorder = recorder or StageRecorder()
+    
+    # Read only the contact columns (CSV as text, Parquet/Arrow as stored)
+    with recorder.stage('read', bytes_read=os.path.getsize(input_path)) as record:
+        df = read_contact_table(input_path, column_mapping, engine=engine)
+        record['rows_out'] = len(df)
+    
+    return prepare_frame(df, column_mapping, states, recorder)
+
+def _normalize_file_safe(input_path: str, column_mapping: Dict[str, str], engine: str = None, states=None,
+                         profile_dir: str = None, trace_memory: bool = False):
+    """
+    Pool entry point: return (frame, stats, None, new headers, stages) or
+    (None, None, error message, new headers, stages), where new headers are
+    the header mappings this call resolved so the parent process can cache
+    them and stages are the timing records of each step.
+    """
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    
+    known_headers = set(cached_headers(column_mapping))
+    recorder = StageRecorder()
+    try:
+        with profiled(profile_dir, os.path.basename(input_path)):
+            df, stats = normalize_file(input_path, column_mapping, engine, states, recorder)
+        error = None
+    except Exception as e:
+        df, stats, error = None, None, str(e)
+    new_headers = {
+        header: targets for header, targets in cached_headers(column_mapping).items()
+        if header not in known_headers
+    }
+    return df, stats, error, new_headers, recorder.stages
+
+def _normalize_range_safe(input_path: str, start: int, end: int, header: bytes, column_mapping: Dict[str, str],
+                          states=None, trace_memory: bool = False, phone_columns: List[str] = None):
+    """
+    Pool entry point for one byte range of a large CSV, parsed under the
+    file's header, taking phone numbers from the file's phone_columns.
+    Returns the same tuple as _normalize_file_safe.
+    """
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    
+    known_headers = set(cached_headers(column_mapping))
+    recorder = StageRecorder()
+    try:
+        with recorder.stage('read', bytes_read=end - start) as record:
+            df = read_csv_range(input_path, start, end, header, contact_column_filter(column_mapping))
+            record['rows_out'] = len(df)
+        df, stats = prepare_frame(df, column_mapping, states, recorder, phone_columns)
+        error = None
+    except Exception as e:
+        df, stats, error = None, None, str(e)
+    new_headers = {
+        header: targets for header, targets in cached_headers(column_mapping).items()
+        if header not in known_headers
+    }
+    return df, stats, error, new_headers, recorder.stages
+
+def _file_phone_columns(input_path: str, header: bytes, first_range, column_mapping: Dict[str, str]) -> List[str]:
+    """The phone columns normalizing the whole file would use, decided from its first record."""
+    start, end = first_range
+    head = read_csv_range(input_path, start, end, header, contact_column_filter(column_mapping), nrows=1)
+    return leading_phone_columns(expand_phone_rows(head), column_mapping)
+
+def _combine_ranges(results):
+    """Join the results of a file's byte ranges, in range order, into one file result."""
+    errors = [error for _, _, error, _, _ in results if error is not None]
+    new_headers = {}
+    stages = []
+    for _, _, _, headers, range_stages in results:
+        new_headers.update(headers)
+        stages.extend(range_stages)
+    if errors:
+        return None, None, errors[0], new_headers, stages
+    
+    df = pd.concat([df for df, _, _, _, _ in results], ignore_index=True)
+    stats = {key: sum(result[1][key] for result in results) for key in results[0][1]}
+    return df, stats, None, new_headers, stages
+
+def _processing_message(input_path: str) -> str:
+    """Progress line for a file, noting a sniffed encoding or dialect other than plain UTF-8 CSV."""
+    filename = os.path.basename(input_path)
+    if table_format(input_path) == 'csv':
+        note = describe(sniff_file(input_path))
+        if note:
+            return f"Processing {filename} ({note})..."
+    return f"Processing {filename}..."
+
+def iter_normalized_files(input_dir: str, csv_files: List[str], column_mapping: Dict[str, str], workers: int = 1,
+                          engine: str = None, states=None, cache: NormalizeCache = None, full: bool = False,
+                          report: RunReport = None, split_bytes: int = None):
+    """
+    Yield (filename, frame, stats, error message) for each file in the order
+    given, normalizing files in a process pool when workers > 1.
+    With split_bytes, CSV files larger than that are cut into byte ranges of
+    about that size on record boundaries, and the ranges are normalized in
+    the pool in parallel and joined back in row order.
+    With a cache, unchanged files are served from it (unless full is set) and
+    newly normalized files are stored in it. With a report, each file's stage
+    timings are added to it.
+    """
+    report = report or RunReport('normalize')
+    cached = {}
+    if cache is not None and not full:
+        for filename in csv_files:
+            hit = cache.lookup(os.path.join(input_dir, filename))
+            if hit is not None:
+                cached[filename] = hit
+    
+    def finish(filename, df, stats, error, stages):
+        report.add_file(filename, stages, error=error)
+        if cache is not None and error is None:
+            cache.store(os.path.join(input_dir, filename), df, stats)
+        return filename, df, stats, error
+    
+    def from_cache(filename):
+        print(f"Using cached {filename}...")
+        report.add_file(filename, [], cached=True)
+        return filename, cached[filename][0], cached[filename][1], None
+    
+    options = (engine, states, report.profile_dir, report.trace_memory)
+    if workers <= 1:
+        for filename in csv_files:
+            if filename in cached:
+                yield from_cache(filename)
+                continue
+            print(_processing_message(os.path.join(input_dir, filename)))
+            df, stats, error, _, stages = _normalize_file_safe(os.path.join(input_dir, filename), column_mapping, *options)
+            yield finish(filename, df, stats, error, stages)
+        return
+    
+    def submit(executor, input_path):
+        if split_bytes and table_format(input_path) == 'csv' and os.path.getsize(input_path) > split_bytes \
+                and can_partition(input_path):
+            header, ranges = partition_csv(input_path, split_bytes)
+            if not ranges:
+                return executor.submit(_normalize_file_safe, input_path, column_mapping, *options)
+            phone_columns = _file_phone_columns(input_path, header, ranges[0], column_mapping)
+            return [
+                executor.submit(_normalize_range_safe, input_path, start, end, header, column_mapping, states,
+                                report.trace_memory, phone_columns)
+                for start, end in ranges
+            ]
+        return executor.submit(_normalize_file_safe, input_path, column_mapping, *options)
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            filename: submit(executor, os.path.join(input_dir, filename))
+            for filename in csv_files if filename not in cached
+        }
+        # Collect in directory order so the merge is stable
+        for filename in csv_files:
+            if filename in cached:
+                yield from_cache(filename)
+                continue
+            print(_processing_message(os.path.join(input_dir, filename)))
+            future = futures[filename]
+            if isinstance(future, list):
+                df, stats, error, new_headers, stages = _combine_ranges([part.result() for part in future])
+            else:
+                df, stats, error, new_headers, stages = future.result()
+            merge_header_cache(new_headers, column_mapping)
+            yield finish(filename, df, stats, error, stages)
+
+def process_directory(input_dir: str, output_file: str, workers: int = 1, chunksize: int = None,
+                      mapping_cache: str = None, engine: str = None, states=DEFAULT_STATES,
+                      cache_dir: str = None, full: bool = False, dedupe: str = None, dedupe_policy: str = 'first',
+                      dedupe_memory_mb: int = 512, probe: bool = True, report_path: str = None,
+                      profile_dir: str = None, profile_top: int = 5, trace_memory: bool = False,
+                      split_mb: int = None, index_path: str = None, resolve: str = None):
+    """
+    Process all CSV, Parquet and Arrow IPC files in a directory and combine them
+    into one normalized file, written in the format given by output_file's extension.
+    Only rows in the given states are kept (all rows when states is None).
+    When mapping_cache is given, resolved header mappings are loaded from and
+    saved back to that file so repeated headers skip regex matching across runs.
+    When cache_dir is given, each file's normalized output is cached there and
+    only new or changed files are normalized again (all of them with full).
+    Streaming mode (chunksize) does not use the cache.
+    When dedupe names a key ('phone' or 'phone+email'), duplicate contacts are
+    removed from the CSV output afterwards in bounded memory.
+    With probe, CSV files whose first bytes show no usable phone column are
+    skipped without being parsed.
+    When report_path is given, per-file and per-stage timings, row and byte
+    counts and peak memory are written there as JSON; with profile_dir, the
+    cProfile stats of the profile_top slowest files are kept there.
+    With trace_memory, stage peaks are also measured with tracemalloc.
+    With split_mb and workers > 1, CSV files over split_mb MB are normalized
+    as parallel byte ranges rather than by a single worker.
+    When index_path is given, every normalized batch is also upserted into
+    that contact index as one new run.
+    When resolve names an entity kind ('contact' or 'business'), rows of the
+    CSV output describing the same entity get a shared cluster_id column.
+    """
     if not os.path.exists(input_dir):
         print(f"Error: Input directory '{input_dir}' does not exist.")
         sys.exit(1)
@@ -137,72 +359,161 @@ def process_directory(input_dir: str, output_file: str):
         print(f"Error: '{input_dir}' is not a directory.")
         sys.exit(1)
     
-    all_dfs = []
-    csv_files = [f for f in os.listdir(input_dir) if f.endswith('.csv')]
+    csv_files = [f for f in os.listdir(input_dir) if f.lower().endswith(TABLE_EXTENSIONS)]
     
     if not csv_files:
         print(f"No CSV files found in {input_dir}")
         sys.exit(1)
         
     column_mapping = get_column_mapping_regex()
+    if mapping_cache:
+        load_header_cache(mapping_cache, column_mapping)
+    
+    if probe:
+        csv_files = skip_irrelevant_files(input_dir, csv_files, column_mapping)
+        if not csv_files:
+            print(f"No files with contacts found in {input_dir}")
+            sys.exit(1)
     
+    report = RunReport('format', profile_dir=profile_dir, profile_top=profile_top, trace_memory=trace_memory)
+    if trace_memory:
+        tracemalloc.start()
+    
+    index, run_id = None, None
+    if index_path:
+        index = ContactIndex(index_path)
+        run_id = index.start_run(os.path.abspath(input_dir))
+    
+    cache = None
+    if cache_dir and not chunksize:
+        states_key = ','.join(sorted(states)) if states is not None else 'none'
+        cache = NormalizeCache(cache_dir, f'{column_mapping_version(column_mapping)}:{states_key}')
+        cache.load()
+    
+    try:
+        _process_files(input_dir, csv_files, output_file, column_mapping, workers, chunksize, engine, states,
+                       cache, full, report, split_mb * 1024 * 1024 if split_mb else None, index, run_id)
+    finally:
+        if index is not None:
+            print(f"Indexed run {run_id}: {len(index)} contacts in {index_path}")
+            index.close()
+        if report_path:
+            report.write(report_path)
+            print(f"Run report saved to {report_path}")
+        else:
+            report.keep_hottest_profiles()
+        if mapping_cache:
+            save_header_cache(mapping_cache, column_mapping)
+        if cache is not None:
+            cache.prune(os.path.join(input_dir, f) for f in csv_files)
+            cache.save()
+            print(f"Reused {cache.hits} cached files, normalized {len(csv_files) - cache.hits}")
+    
+    if dedupe:
+        if table_format(output_file) != 'csv':
+            print("Error: --dedupe works on CSV output only.")
+            sys.exit(1)
+        
+        stats = dedup_file(output_file, output_file, KEY_COLUMNS[dedupe], dedupe_policy,
+                           memory_budget=dedupe_memory_mb * 1024 * 1024)
+        print(f"Removed {stats['duplicates']} duplicate rows by {dedupe} (keep {dedupe_policy})")
+        print(f"Final number of rows after deduplication: {stats['rows_out']}")
+    
+    if resolve:
+        if table_format(output_file) != 'csv':
+            print("Error: --resolve works on CSV output only.")
+            sys.exit(1)
+        
+        print_stats(resolve_file(output_file, output_file, resolve))
+
+def skip_irrelevant_files(input_dir: str, csv_files: List[str], column_mapping: Dict[str, str]) -> List[str]:
+    """Drop the CSV files that cannot contain contacts, judged from their first bytes only."""
+    kept = []
+    skipped = 0
+    saved = 0
     for filename in csv_files:
-        input_path = os.path.join(input_dir, filename)
-        print(f"Processing {filename}...")
+        path = os.path.join(input_dir, filename)
+        if table_format(path) != 'csv':
+            kept.append(filename)
+            continue
         
-        try:
-            # Read CSV
-            df = pd.read_csv(input_path)
-            
-            # First expand the phone rows while keeping original column structure
-            df = expand_phone_rows(df)
-            
-            # Create normalized DataFrame
-            normalized_df = pd.DataFrame(columns=[
-                'first_name', 'last_name', 'business_name', 'phone',
-                'state', 'zip', 'email'
-            ])
-            
-            # Process each column
-            for col in df.columns:
-                target = match_column_with_regex(col, column_mapping)
-                if target:
-                    if isinstance(target, list):
-                        df = split_full_name(df, col)
-                        for i, target_col in enumerate(target):
-                            normalized_df[target_col] = df.get(target_col, '')
-                    else:
-                        if target == 'phone' and str(df[col].iloc[0]).strip() != '':
-                            normalized_df['phone'] = df[col].apply(clean_phone)
-                        elif target != 'phone':
-                            normalized_df[target] = df[col]
-            
-            all_dfs.append(normalized_df)
+        result = probe_file(path, column_mapping)
+        if result['relevant']:
+            kept.append(filename)
+        else:
+            print(f"Skipping {filename}: {result['reason']}")
+            skipped += 1
+            saved += max(os.path.getsize(path) - PROBE_BYTES, 0)
+    
+    if skipped:
+        print(f"Skipped {skipped} files without contacts, {saved} bytes not parsed")
+    return kept
+
+def _print_removed(removed: Dict[str, int], states):
+    print(f"Removed {removed['removed_phones']} rows without valid phone numbers")
+    if states is not None:
+        print(f"Removed {removed['removed_states']} rows outside the selected states")
+
+def _process_files(input_dir: str, csv_files: List[str], output_file: str, column_mapping: Dict[str, str],
+                   workers: int, chunksize: int, engine: str = None, states=None,
+                   cache: NormalizeCache = None, full: bool = False, report: RunReport = None,
+                   split_bytes: int = None, index: ContactIndex = None, run_id: int = None):
+    """
+    Normalize csv_files and write the combined output, serially, in a pool or
+    streamed. With an index, every normalized frame is upserted as run_id.
+    """
+    report = report or RunReport('format')
+    all_dfs = []
+    removed = {'removed_phones': 0, 'removed_states': 0}
+    
+    if chunksize:
+        if table_format(output_file) != 'csv':
+            print("Error: --chunksize streams CSV output only.")
+            sys.exit(1)
         
+        try:
+            processed, total_rows, removed = stream_directory(
+                input_dir, csv_files, output_file, column_mapping, chunksize, states, report, index, run_id
+            )
         except Exception as e:
-            print(f"Error processing {filename}: {str(e)}")
+            print(f"Error saving output file: {str(e)}")
+            sys.exit(1)
+        
+        if not processed:
+            print("No data was processed successfully.")
+            sys.exit(1)
+        
+        _print_removed(removed, states)
+        print(f"Normalized data saved to {output_file}")
+        print(f"Final number of rows: {total_rows}")
+        return
+    
+    for filename, normalized_df, stats, error in iter_normalized_files(
+        input_dir, csv_files, column_mapping, workers, engine, states, cache, full, report, split_bytes
+    ):
+        if error is not None:
+            print(f"Error processing {filename}: {error}")
             continue
+        
+        all_dfs.append(normalized_df)
+        if index is not None:
+            with report.run.stage('index', rows_in=len(normalized_df)):
+                index.upsert(normalized_df, run_id)
+        for key in removed:
+            removed[key] += stats[key]
     
     if all_dfs:
-        final_df = pd.concat(all_dfs, ignore_index=True)
-        final_df = final_df.fillna('')
-        
-        # Clean zip codes
-        final_df['zip'] = final_df['zip'].apply(clean_zip)
-        
-        # Remove rows without valid phone numbers
-        initial_rows = len(final_df)
-        final_df = final_df[final_df['phone'].str.len() >= 10]
-        removed_rows = initial_rows - len(final_df)
-        print(f"Removed {removed_rows} rows without valid phone numbers")
+        with report.run.stage('concat', rows_in=sum(len(df) for df in all_dfs)) as record:
+            final_df = concat_frames(all_dfs)
+            record['rows_out'] = len(final_df)
+        _print_removed(removed, states)
         
-        # Create output directory if needed
-        output_dir = os.path.dirname(output_file)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        _ensure_output_dir(output_file)
             
         try:
-            final_df.to_csv(output_file, index=False)
+            with report.run.stage('write', rows_in=len(final_df)) as record:
+                write_table(export_frame(final_df), output_file)
+                record['bytes_written'] = os.path.getsize(output_file)
             print(f"Normalized data saved to {output_file}")
             print(f"Final number of rows: {len(final_df)}")
         except Exception as e:
@@ -211,100 +522,178 @@ def process_directory(input_dir: str, output_file: str):
     else:
         print("No data was processed successfully.")
         sys.exit(1)
-def is_valid_phone(phone_str: str) -> bool:
+
+def finalize_frame(df: pd.DataFrame):
     """
-    Validate phone number format.
-    Valid formats: 10 digits (standard US number) or 11 digits starting with 1
+    Fill blanks, clean zip codes and drop rows without a valid phone number.
+    Returns the cleaned frame and the number of rows removed.
     """
-    digits = re.sub(r'\D', '', str(phone_str))
-    if len(digits) == 10:
-        return True
-    if len(digits) == 11 and digits.startswith('1'):
-        return True
-    return False
-
-def clean_phone(phone) -> str:
-    """Clean and validate phone numbers."""
-    if pd.isna(phone):
-        return ''
+    # Clean zip codes
+    df['zip'] = clean_zip_series(df['zip'])
     
-    # Convert to string and remove non-digits
-    digits = re.sub(r'\D', '', str(phone))
+    df = df.fillna('')
+    
+    # Remove rows without valid phone numbers
+    initial_rows = len(df)
+    df = df[df['phone'].str.len() >= 10]
+    return df, initial_rows - len(df)
+
+def _ensure_output_dir(output_file: str):
+    """Create the output directory if needed."""
+    output_dir = os.path.dirname(output_file)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+def stream_directory(input_dir: str, csv_files: List[str], output_file: str, column_mapping: Dict[str, str],
+                     chunksize: int, states=None, report: RunReport = None, index: ContactIndex = None,
+                     run_id: int = None):
+    """
+    Normalize files chunk by chunk and append the results to output_file, so
+    memory is bounded by the chunk size rather than the total input.
+    Each file is spooled to a temporary file first and only appended once it
+    has been read completely, so a file that fails midway adds no rows; the
+    same goes for upserts into index, recorded as run_id.
+    Returns whether any file was written, the row count and removed-row counts.
+    """
+    report = report or RunReport('format')
+    total_rows = 0
+    removed = {'removed_phones': 0, 'removed_states': 0}
+    output = None
     
-    # If it's 11 digits starting with 1, remove the 1
-    if len(digits) == 11 and digits.startswith('1'):
-        digits = digits[1:]
+    try:
+        for filename in csv_files:
+            input_path = os.path.join(input_dir, filename)
+            print(_processing_message(input_path))
+            
+            file_rows = 0
+            file_removed = dict.fromkeys(removed, 0)
+            recorder = StageRecorder()
+            with tempfile.TemporaryFile(mode='w+', newline='') as spool:
+                phone_columns = None
+                try:
+                    chunks = iter_table_chunks(input_path, usecols=contact_column_filter(column_mapping), chunksize=chunksize)
+                    while True:
+                        with recorder.stage('read') as record:
+                            chunk = next(chunks, None)
+                            record['rows_out'] = len(chunk) if chunk is not None else 0
+                        if chunk is None:
+                            break
+                        # Decided once from the file's first record, as whole-file mode does
+                        if phone_columns is None and len(chunk):
+                            phone_columns = leading_phone_columns(expand_phone_rows(chunk.head(1)), column_mapping)
+                        normalized_df, stats = prepare_frame(chunk, column_mapping, states, recorder, phone_columns)
+                        with recorder.stage('spool', rows_in=len(normalized_df)):
+                            export_frame(normalized_df).to_csv(spool, header=False, index=False)
+                        file_rows += len(normalized_df)
+                        for key in file_removed:
+                            file_removed[key] += stats[key]
+                except Exception as e:
+                    print(f"Error processing {filename}: {str(e)}")
+                    report.add_file(filename, recorder.stages, error=str(e))
+                    continue
+                
+                if output is None:
+                    _ensure_output_dir(output_file)
+                    output = open(output_file, 'w', newline='')
+                    pd.DataFrame(columns=NORMALIZED_COLUMNS).to_csv(output, index=False)
+                
+                with recorder.stage('write', rows_in=file_rows) as record:
+                    start = output.tell()
+                    spool.seek(0)
+                    shutil.copyfileobj(spool, output)
+                    record['bytes_written'] = output.tell() - start
+                
+                # Index the file only once all of it was read, like the output
+                if index is not None:
+                    with recorder.stage('index', rows_in=file_rows):
+                        spool.seek(0)
+                        for spooled in pd.read_csv(spool, header=None, names=NORMALIZED_COLUMNS, dtype=str,
+                                                   keep_default_na=False, chunksize=chunksize):
+                            index.upsert(spooled, run_id)
+            
+            recorder.stages[0]['bytes_read'] = os.path.getsize(input_path)
+            report.add_file(filename, recorder.stages)
+            
+            total_rows += file_rows
+            for key in removed:
+                removed[key] += file_removed[key]
+    finally:
+        if output is not None:
+            output.close()
     
-    # Return only if it's exactly 10 digits
-    return digits if len(digits) == 10 else ''
+    return output is not None, total_rows, removed
 
-def filter_states(file_name, output_file):
+def filter_states(file_name, output_file, states=DEFAULT_STATES):
+    """Keep only rows of a normalized file whose 'state' is in states, writing them to output_file."""
     try:
-        # Load the CSV file into a DataFrame
-        df = pd.read_csv(file_name)
+        # Load the file, all columns as text
+        df = read_table(file_name)
 
         # Ensure the 'State' column exists
         if "state" not in df.columns:
             print(f"Error: The column 'state' does not exist in {file_name}.")
             return
 
-        # Dictionary mapping long state names to short codes
-        state_mapping = {
-            "Florida": "FL", "Georgia": "GA", "South Carolina": "SC", "North Carolina": "NC",
-            "Virginia": "VA", "Maryland": "MD", "Tennessee": "TN", "Kentucky": "KY", "Ohio": "OH",
-            "Michigan": "MI", "Indiana": "IN", "Illinois": "IL", "Missouri": "MO", "Louisiana": "LA",
-            "Texas": "TX", "Oklahoma": "OK", "Kansas": "KS", "Colorado": "CO", "Utah": "UT", "Nevada": "NV"
-        }
-
-        # List of short state codes to include
-        states_to_include = list(state_mapping.values())
-
-        # Map long names to short names in the 'State' column
-        df['state'] = df['state'].apply(lambda x: state_mapping.get(x, x))  # Map long names to short names
-        
-        # Filter the DataFrame to include only the states in the list (both long and short names)
-        filtered_df = df[df['state'].isin(states_to_include)]
-
-        # Print the filtered rows
-        print("Filtered rows with the selected states:")
-        print(filtered_df)
+        # Map long names to short codes and keep the selected states
+        filtered_df, removed = filter_state_rows(df, states)
+        print(f"Removed {removed} rows outside the selected states")
 
         # Save the filtered data to the output file
-        filtered_df.to_csv(output_file, index=False)
-        print(f"\nFiltered data has been saved to '{output_file}'.")
+        write_table(filtered_df, output_file)
+        print(f"Filtered data has been saved to '{output_file}'.")
 
     except FileNotFoundError:
         print(f"Error: The file '{file_name}' does not exist.")
     except Exception as e:
         print(f"An error occurred: {e}")
 
-
-
-def clean_zip(zip_code) -> str:
-    """Clean zip codes."""
-    if pd.isna(zip_code):
-        return ''
-    
-    # Convert to string and remove decimal point and trailing zeros
-    zip_str = str(zip_code).split('.')[0]
-    
-    # Remove non-digits
-    digits = re.sub(r'\D', '', zip_str)
-    
-    # If it's too long (phone-like) or not a valid zip, clear it
-    if len(digits) >= 10:
-        return ''
-        
-    # Return first 5 digits if we have them, otherwise an empty string
-    return digits[:5] if digits else ''
-
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python format.py <input_directory> <output_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Normalize a directory of scraped CSV files into one contact CSV.")
+    parser.add_argument("input_directory", help="Directory containing the CSV files.")
+    parser.add_argument("output_file", help="Path to the normalized output file (.csv, .parquet or .arrow).")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used to normalize files in parallel.")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream each file in chunks of this many rows, bounding memory by chunk size (ignores --workers).")
+    parser.add_argument("--engine", choices=["c", "pyarrow"], default="c",
+                        help="CSV parser; pyarrow is used when installed and the read allows it.")
+    parser.add_argument("--states", type=parse_states, default="default",
+                        help="States to keep: 'default', 'all', 'none' or a comma-separated list of names or codes.")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directory caching each file's normalized output (default: <input_directory>/.normalize_cache).")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the per-file cache.")
+    parser.add_argument("--full", action="store_true", help="Re-normalize every file, ignoring cached results.")
+    parser.add_argument("--dedupe", choices=sorted(KEY_COLUMNS), default=None,
+                        help="Remove duplicate contacts by this key after writing the output.")
+    parser.add_argument("--dedupe-policy", choices=POLICIES, default="first",
+                        help="Keep the first row per key, or the most complete one.")
+    parser.add_argument("--dedupe-memory-mb", type=int, default=512,
+                        help="Memory budget for deduplication before spilling to disk buckets.")
+    parser.add_argument("--resolve", choices=sorted(ENTITY_NAMES), default=None,
+                        help="Add a cluster_id column grouping rows that describe the same contact or business.")
+    parser.add_argument("--mapping-cache", default=".column_mapping_cache.json",
+                        help="File caching resolved header mappings between runs (empty string disables it).")
+    parser.add_argument("--no-probe", action="store_true",
+                        help="Parse every CSV file, even those whose header has no phone column.")
+    parser.add_argument("--split-mb", type=int, default=None,
+                        help="With --workers > 1, normalize CSV files larger than this many MB as parallel byte ranges.")
+    parser.add_argument("--index", default=None,
+                        help="SQLite contact index (keyed on phone) that this run's contacts are upserted into.")
+    parser.add_argument("--report", default=None,
+                        help="Write a JSON run report with per-file and per-stage timings, row counts and memory.")
+    parser.add_argument("--profile", default=None, metavar="DIR",
+                        help="Save cProfile stats (<file>.prof) for the slowest files in this directory.")
+    parser.add_argument("--profile-top", type=int, default=5, help="Number of file profiles kept with --profile.")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also measure each stage's peak allocations with tracemalloc (slower).")
+    
+    args = parser.parse_args()
     
-    input_directory = sys.argv[1]
-    output_file = sys.argv[2]
+    cache_dir = None if args.no_cache else (args.cache_dir or os.path.join(args.input_directory, '.normalize_cache'))
     
-    process_directory(input_directory, output_file)
-    filter_states('out.csv', 'out.csv')
+    process_directory(args.input_directory, args.output_file, workers=args.workers, chunksize=args.chunksize,
+                      mapping_cache=args.mapping_cache, engine=args.engine, states=args.states,
+                      cache_dir=cache_dir, full=args.full, dedupe=args.dedupe, dedupe_policy=args.dedupe_policy,
+                      dedupe_memory_mb=args.dedupe_memory_mb, probe=not args.no_probe,
+                      report_path=args.report, profile_dir=args.profile, profile_top=args.profile_top,
+                      trace_memory=args.trace_memory, split_mb=args.split_mb,
+                      index_path=args.index, resolve=args.resolve)
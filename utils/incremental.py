@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+# Bump when the cached frame layout or the normalize steps change
+CACHE_FORMAT = 2
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's contents, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class NormalizeCache:
+    """
+    Per-file cache of normalized output, keyed on each source file's path,
+    size, mtime and content hash plus a settings key (mapping version and
+    any option that changes the output). A file whose size and mtime are
+    unchanged is a hit without being read; one whose mtime changed is hashed
+    and still a hit if its contents are the same.
+    """
+
+    def __init__(self, cache_dir: str, settings_key: str):
+        self.cache_dir = cache_dir
+        self.settings_key = f'{CACHE_FORMAT}:{settings_key}'
+        self.entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.cache_dir, MANIFEST_NAME)
+
+    def load(self):
+        """Read the manifest; a missing or unreadable manifest starts empty."""
+        try:
+            with open(self.manifest_path) as f:
+                self.entries = json.load(f).get('files', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'format': CACHE_FORMAT, 'files': self.entries}, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _frame_path(self, input_path: str) -> str:
+        name = hashlib.sha1(os.path.abspath(input_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{name}.pkl')
+
+    def lookup(self, input_path: str) -> Optional[Tuple[pd.DataFrame, dict]]:
+        """Return the cached (frame, stats) for an unchanged file, or None."""
+        entry = self.entries.get(os.path.abspath(input_path))
+        stat = os.stat(input_path)
+        if entry is None or entry['settings'] != self.settings_key or entry['size'] != stat.st_size:
+            self.misses += 1
+            return None
+
+        if entry['mtime_ns'] != stat.st_mtime_ns:
+            if file_hash(input_path) != entry['sha256']:
+                self.misses += 1
+                return None
+            entry['mtime_ns'] = stat.st_mtime_ns
+
+        try:
+            df = pd.read_pickle(self._frame_path(input_path))
+        except Exception:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return df, entry['stats']
+
+    def store(self, input_path: str, df: pd.DataFrame, stats: dict):
+        """Cache the normalized frame for input_path."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        stat = os.stat(input_path)
+        df.to_pickle(self._frame_path(input_path))
+        self.entries[os.path.abspath(input_path)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_hash(input_path),
+            'settings': self.settings_key,
+            'stats': stats,
+        }
+
+    def prune(self, input_paths: Iterable[str]):
+        """Drop entries, and their cached frames, for files no longer present."""
+        keep = {os.path.abspath(path) for path in input_paths}
+        for path in [path for path in self.entries if path not in keep]:
+            try:
+                os.remove(self._frame_path(path))
+            except OSError:
+                pass
+            del self.entries[path]
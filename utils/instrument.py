@@ -0,0 +1,160 @@
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Stage fields summed when a stage runs more than once for a file (e.g. per chunk)
+_SUMMED = ('seconds', 'rows_in', 'rows_out', 'bytes_read', 'bytes_written')
+_PEAKS = ('process_peak_rss_mb', 'traced_peak_mb')
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """
+    High-water mark of this process's resident memory in MB, or with children
+    that of its largest finished child process (e.g. pool workers).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageRecorder:
+    """
+    Records wall time, row and byte counts and memory for each stage of
+    processing one file. Stages fill in their counts on the record they are
+    given; counts left as None are omitted. process_peak_rss_mb is the
+    process's high-water mark when the stage ended, which includes every
+    earlier stage. traced_peak_mb, recorded only while tracemalloc is
+    running, is the stage's own peak: the most it allocated above what was
+    allocated when it began.
+    """
+
+    def __init__(self):
+        self.stages: List[Dict] = []
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = None, bytes_read: int = None):
+        record = {'stage': name, 'rows_in': rows_in, 'rows_out': None, 'bytes_read': bytes_read, 'bytes_written': None}
+        traced_start = None
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            traced_start = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            record['process_peak_rss_mb'] = peak_rss_mb()
+            if traced_start is not None and tracemalloc.is_tracing():
+                record['traced_peak_mb'] = max(tracemalloc.get_traced_memory()[1] - traced_start, 0) / (1024 * 1024)
+            self.stages.append({key: value for key, value in record.items() if value is not None})
+
+
+def merge_stages(stages: List[Dict]) -> List[Dict]:
+    """Combine repeated stages into one entry each, in first-seen order."""
+    merged: Dict[str, Dict] = {}
+    for record in stages:
+        total = merged.setdefault(record['stage'], {'stage': record['stage']})
+        for key in _SUMMED:
+            if key in record:
+                total[key] = total.get(key, 0) + record[key]
+        for key in _PEAKS:
+            if key in record:
+                total[key] = max(total.get(key, 0), record[key])
+    for total in merged.values():
+        for key in ('seconds',) + _PEAKS:
+            if key in total:
+                total[key] = round(total[key], 4)
+    return list(merged.values())
+
+
+@contextmanager
+def profiled(profile_dir: Optional[str], name: str):
+    """Run the body under cProfile and dump its stats to profile_dir/name.prof (no-op without profile_dir)."""
+    if not profile_dir:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(profile_dir, f'{name}.prof'))
+
+
+class RunReport:
+    """
+    Collects per-file stage records and run-level stages for one command and
+    writes them as a JSON report. With a profile directory, only the profiles
+    of the profile_top slowest files are kept. trace_memory asks the workers
+    to run tracemalloc so stages also report traced peaks.
+    """
+
+    def __init__(self, command: str, profile_dir: str = None, profile_top: int = 5, trace_memory: bool = False):
+        self.command = command
+        self.profile_dir = profile_dir
+        self.profile_top = profile_top
+        self.trace_memory = trace_memory
+        self.started = time.time()
+        self.files: Dict[str, Dict] = {}
+        self.run = StageRecorder()
+
+    def add_file(self, filename: str, stages: List[Dict], cached: bool = False, error: str = None):
+        stages = merge_stages(stages)
+        entry = {'file': filename, 'cached': cached, 'seconds': round(sum(s.get('seconds', 0) for s in stages), 4),
+                 'stages': stages}
+        if error is not None:
+            entry['error'] = error
+        self.files[filename] = entry
+
+    def stage_totals(self) -> List[Dict]:
+        """Each stage summed over all files, slowest first."""
+        totals = merge_stages([stage for entry in self.files.values() for stage in entry['stages']])
+        return sorted(totals, key=lambda stage: -stage.get('seconds', 0))
+
+    def keep_hottest_profiles(self):
+        """
+        Delete the profiles this run wrote for all but its slowest files.
+        Other files in the profile directory are left alone.
+        """
+        if not self.profile_dir or not os.path.isdir(self.profile_dir):
+            return
+        ranked = sorted(self.files.values(), key=lambda entry: -entry['seconds'])
+        for entry in ranked[self.profile_top:]:
+            path = os.path.join(self.profile_dir, f"{entry['file']}.prof")
+            if os.path.exists(path):
+                os.remove(path)
+
+    def to_dict(self) -> Dict:
+        return {
+            'command': self.command,
+            'started': self.started,
+            'seconds': round(time.time() - self.started, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'children_peak_rss_mb': peak_rss_mb(children=True),
+            'stages': self.stage_totals(),
+            'run_stages': merge_stages(self.run.stages),
+            'files': list(self.files.values()),
+        }
+
+    def write(self, path: str):
+        self.keep_hottest_profiles()
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
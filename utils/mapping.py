@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Tuple
+
+
+def get_column_mapping_regex() -> Dict[str, str]:
+    """Define regex-based mapping from column patterns to standardized names."""
+    return {
+        r'(?i)(full\s*name|contact\s*name|labeler\s*name|legal\s*contact\s*name|tc\s*name|pi\s*name|ri\s*poc\s*name)': ['first_name', 'last_name'],
+        r'(?i)(first\s*name)': 'first_name',
+        r'(?i)(last\s*name)': 'last_name',
+        r'(?i)(company\s*name|business\s*name)': 'business_name',
+        r'(?i)(mobile\s*phone|cell\s*phone|smartphone|cellular|phone|contact\s*phone|business\s*phone|company\s*phone|legal\s*phone|invoice\s*phone|tc\s*phone|pi\s*phone|ri\s*poc\s*phone)': 'phone',
+        r'(?i)(state|business\s*state|legal\s*state|invoice\s*state|tc\s*state|mailing\s*state|company\s*state)': 'state',
+        r'(?i)(zip|zipcode|postal\s*code|business\s*zip|legal\s*zip|invoice\s*zip|tc\s*zip|mailing\s*zip)': 'zip',
+        r'(?i)(email|email\s*address|contact\s*email|pi\s*email)': 'email'
+    }
+
+# Compiled matchers keyed on the mapping table's contents
+_compiled_mappings: Dict[Tuple, Tuple[re.Pattern, list]] = {}
+
+# Header tuple -> resolved targets, per mapping version
+_header_cache: Dict[str, Dict[Tuple[str, ...], list]] = {}
+
+
+def _mapping_key(column_mapping: Dict[str, str]) -> Tuple:
+    return tuple((pattern, str(target)) for pattern, target in column_mapping.items())
+
+def column_mapping_version(column_mapping: Dict[str, str]) -> str:
+    """Short hash of the mapping table, used to invalidate cached header mappings."""
+    return hashlib.sha1(repr(_mapping_key(column_mapping)).encode('utf-8')).hexdigest()[:16]
+
+def compile_column_mapping(column_mapping: Dict[str, str]) -> Tuple[re.Pattern, list]:
+    """
+    Combine every pattern into one regex with a named group per pattern.
+    Alternatives are tried left to right, so the first matching pattern wins
+    exactly as it does when the patterns are matched one by one.
+    """
+    key = _mapping_key(column_mapping)
+    compiled = _compiled_mappings.get(key)
+    if compiled is None:
+        alternatives = []
+        for i, pattern in enumerate(column_mapping):
+            # Leading inline flags must be scoped once patterns are combined
+            flags = re.match(r'\(\?([aiLmsux]+)\)', pattern)
+            if flags:
+                pattern = f'(?{flags.group(1)}:{pattern[flags.end():]})'
+            alternatives.append(f'(?P<m{i}>{pattern})')
+        compiled = (re.compile('|'.join(alternatives)), list(column_mapping.values()))
+        _compiled_mappings[key] = compiled
+    return compiled
+
+def match_column_with_regex(column: str, column_mapping: Dict[str, str]) -> str:
+    """Match a column name to its standardized field using regex."""
+    pattern, targets = compile_column_mapping(column_mapping)
+    match = pattern.match(column)
+    if match:
+        # Each named group wraps a whole pattern, so it is the last to close
+        return targets[int(match.lastgroup[1:])]
+    return None
+
+def resolve_header(columns: List[str], column_mapping: Dict[str, str]) -> list:
+    """Resolve every column of a header at once, reusing earlier results for the same header."""
+    cache = cached_headers(column_mapping)
+    header = tuple(str(col) for col in columns)
+    targets = cache.get(header)
+    if targets is None:
+        targets = [match_column_with_regex(col, column_mapping) for col in header]
+        cache[header] = targets
+    return targets
+
+def load_header_cache(path: str, column_mapping: Dict[str, str]) -> int:
+    """
+    Load header mappings saved by an earlier run. Entries written for a
+    different mapping table are ignored. Returns the number of headers loaded.
+    """
+    version = column_mapping_version(column_mapping)
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return 0
+
+    if saved.get('version') != version:
+        return 0
+
+    cache = _header_cache.setdefault(version, {})
+    for entry in saved.get('headers', []):
+        cache[tuple(entry['columns'])] = entry['targets']
+    return len(saved.get('headers', []))
+
+def save_header_cache(path: str, column_mapping: Dict[str, str]):
+    """Write the header mappings for the current mapping table to path."""
+    version = column_mapping_version(column_mapping)
+    headers = [
+        {'columns': list(header), 'targets': targets}
+        for header, targets in _header_cache.get(version, {}).items()
+    ]
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': version, 'headers': headers}, f)
+    os.replace(tmp_path, path)
+
+def cached_headers(column_mapping: Dict[str, str]) -> Dict[Tuple[str, ...], list]:
+    """Return the in-memory header mappings for the current mapping table."""
+    return _header_cache.setdefault(column_mapping_version(column_mapping), {})
+
+def merge_header_cache(entries: Dict[Tuple[str, ...], list], column_mapping: Dict[str, str]):
+    """Add header mappings resolved elsewhere, e.g. in a worker process."""
+    cached_headers(column_mapping).update(entries)
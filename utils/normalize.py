@@ -0,0 +1,110 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+def is_valid_phone(phone_str: str) -> bool:
+    """
+    Validate phone number format.
+    Valid formats: 10 digits (standard US number) or 11 digits starting with 1
+    """
+    digits = re.sub(r'\D', '', re.sub(r'\.0+$', '', str(phone_str).strip()))
+    if len(digits) == 10:
+        return True
+    if len(digits) == 11 and digits.startswith('1'):
+        return True
+    return False
+
+def clean_phone(phone) -> str:
+    """Clean and validate phone numbers."""
+    if pd.isna(phone):
+        return ''
+    
+    # Convert to string, drop a '.0' left by float formatting and remove non-digits
+    digits = re.sub(r'\D', '', re.sub(r'\.0+$', '', str(phone).strip()))
+    
+    # If it's 11 digits starting with 1, remove the 1
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    
+    # Return only if it's exactly 10 digits
+    return digits if len(digits) == 10 else ''
+
+def _is_number_series(values: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+
+def clean_phone_series(phones: pd.Series) -> pd.Series:
+    """
+    Vectorized clean_phone for a whole column.
+    Integer and float columns are validated arithmetically, so a float such as
+    2125551234.0 is read as its number rather than as the digits of '2125551234.0'.
+    """
+    if _is_number_series(phones):
+        values = phones.to_numpy(dtype='float64', na_value=np.nan)
+        whole = np.isfinite(values) & (values == np.floor(values))
+        
+        # 11 digits starting with 1 lose the 1; the rest must be 10 digits
+        eleven = whole & (values >= 1e10) & (values < 2e10)
+        valid = eleven | (whole & (values >= 1e9) & (values < 1e10))
+        digits = np.where(eleven, values - 1e10, values)[valid].astype(np.int64)
+        
+        result = np.full(len(values), '', dtype=object)
+        result[valid] = np.char.zfill(digits.astype(str), 10)
+        return pd.Series(result, index=phones.index, dtype=object)
+    
+    # Text such as '2125551234.0' is a float written out; drop the '.0' first
+    digits = phones.astype(str).str.strip().str.replace(r'\.0+$', '', regex=True).str.replace(r'\D', '', regex=True)
+    
+    # If it's 11 digits starting with 1, remove the 1
+    digits = digits.where(~((digits.str.len() == 11) & digits.str.startswith('1')), digits.str[1:])
+    
+    # Keep only exactly 10 digits
+    digits = digits.where((digits.str.len() == 10) & phones.notna(), '')
+    return digits.astype(object)
+
+def is_valid_phone_series(phones: pd.Series) -> pd.Series:
+    """Vectorized is_valid_phone for a whole column."""
+    return clean_phone_series(phones) != ''
+
+def clean_zip(zip_code) -> str:
+    """Clean zip codes."""
+    if pd.isna(zip_code):
+        return ''
+    
+    # Convert to string and remove decimal point and trailing zeros
+    zip_str = str(zip_code).split('.')[0]
+    
+    # Remove non-digits
+    digits = re.sub(r'\D', '', zip_str)
+    
+    # If it's too long (phone-like) or not a valid zip, clear it
+    if len(digits) >= 10:
+        return ''
+        
+    # Return first 5 digits if we have them, otherwise an empty string
+    return digits[:5] if digits else ''
+
+def clean_zip_series(zips: pd.Series) -> pd.Series:
+    """
+    Vectorized clean_zip for a whole column.
+    Integer and float columns keep the integer part arithmetically instead of
+    formatting each value as a string first.
+    """
+    if _is_number_series(zips):
+        values = zips.to_numpy(dtype='float64', na_value=np.nan)
+        whole = np.trunc(np.abs(values))
+        
+        # Ten or more digits looks like a phone number, not a zip
+        keep = np.isfinite(values) & (whole < 1e9)
+        
+        result = np.full(len(values), '', dtype=object)
+        result[keep] = pd.Series(whole[keep].astype(np.int64)).astype(str).str[:5].to_numpy(dtype=object)
+        return pd.Series(result, index=zips.index, dtype=object)
+    
+    # Drop everything from the first decimal point, then non-digits
+    digits = zips.astype(str).str.replace(r'\.[\s\S]*', '', regex=True).str.replace(r'\D', '', regex=True)
+    
+    # If it's too long (phone-like) or not a valid zip, clear it
+    digits = digits.where((digits.str.len() < 10) & zips.notna(), '')
+    return digits.str[:5].astype(object)
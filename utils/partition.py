@@ -0,0 +1,130 @@
+import io
+import os
+import re
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from utils.sniff import read_options, sniff_file
+
+# Bytes scanned at a time when counting quotes or looking for a record end
+BLOCK_SIZE = 1 << 20
+
+_QUOTE_OR_NEWLINE = re.compile(rb'["\n]')
+
+
+def _record_end(f: BinaryIO, start: int, in_quotes: bool) -> int:
+    """
+    Offset just past the first newline at or after start that is outside
+    quotes, or the end of the file. in_quotes is the quote state at start.
+    Escaped quotes ("") toggle the state twice, so they need no special case.
+    """
+    f.seek(start)
+    offset = start
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            return offset
+        for match in _QUOTE_OR_NEWLINE.finditer(block):
+            if match.group() == b'"':
+                in_quotes = not in_quotes
+            elif not in_quotes:
+                return offset + match.end()
+        offset += len(block)
+
+def _count_quotes(f: BinaryIO, start: int, end: int) -> int:
+    f.seek(start)
+    count = 0
+    remaining = end - start
+    while remaining > 0:
+        block = f.read(min(BLOCK_SIZE, remaining))
+        if not block:
+            break
+        count += block.count(b'"')
+        remaining -= len(block)
+    return count
+
+def first_record_end(data: bytes) -> int:
+    """Offset just past the first newline in data that is outside quotes, or 0 if there is none yet."""
+    in_quotes = False
+    for match in _QUOTE_OR_NEWLINE.finditer(data):
+        if match.group() == b'"':
+            in_quotes = not in_quotes
+        elif not in_quotes:
+            return match.end()
+    return 0
+
+def last_record_end(data: bytes) -> int:
+    """
+    Offset just past the last newline in data that is outside quotes, for
+    data starting outside quotes, or 0 if there is none yet.
+    """
+    end = data.rfind(b'\n')
+    if end < 0:
+        return 0
+    quotes = data.count(b'"', 0, end)
+    while quotes % 2 == 1:
+        previous = data.rfind(b'\n', 0, end)
+        if previous < 0:
+            return 0
+        quotes -= data.count(b'"', previous, end)
+        end = previous
+    return end + 1
+
+def is_partitionable(dialect: Dict) -> bool:
+    """
+    Whether byte ranges of a file in this dialect can be parsed on their own:
+    an ASCII-compatible encoding, double-quote quoting and the header on the
+    first line.
+    """
+    return (dialect['encoding'] in ('utf-8', 'utf-8-sig', 'cp1252') and dialect['quotechar'] == '"'
+            and not dialect['header_row'])
+
+def can_partition(path: str) -> bool:
+    """is_partitionable for the dialect sniffed from a file."""
+    return is_partitionable(sniff_file(path))
+
+def partition_csv(path: str, range_bytes: int) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Split a CSV into byte ranges of roughly range_bytes that each start and
+    end on a record boundary, so newlines inside quoted fields never split a
+    record. Returns the header line's bytes and the (start, end) ranges of the
+    data after it, in file order.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header_end = _record_end(f, 0, False)
+        f.seek(0)
+        header = f.read(header_end)
+
+        ranges = []
+        start = header_end
+        while start < size:
+            target = start + range_bytes
+            if target >= size:
+                ranges.append((start, size))
+                break
+            # Every range starts outside quotes, so the parity of the quotes
+            # before target tells whether target is inside a quoted field
+            in_quotes = _count_quotes(f, start, target) % 2 == 1
+            end = _record_end(f, target, in_quotes)
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+def read_csv_range(path: str, start: int, end: int, header: bytes,
+                   usecols: Optional[Callable[[str], bool]] = None, **kwargs) -> pd.DataFrame:
+    """
+    Read the records in [start, end) of a CSV, parsed under its header line,
+    with every column as text and the sniffed dialect like read_text_csv.
+    Extra keyword arguments go to pd.read_csv.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    options = read_options(sniff_file(path))
+    if usecols is not None:
+        columns = list(pd.read_csv(io.BytesIO(header), nrows=0, **options).columns)
+        kwargs['usecols'] = [i for i, col in enumerate(columns) if usecols(col)]
+    return pd.read_csv(io.BytesIO(header + data), dtype=str, **options, **kwargs)
@@ -0,0 +1,527 @@
+import argparse
+import asyncio
+import io
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import split
+from utils.contacts import ContactIndex
+from utils.download import download_all, read_links
+from utils.explode import find_phone_columns
+from utils.fetchcache import FetchCache
+from utils.format import expand_phone_rows, leading_phone_columns, prepare_frame
+from utils.instrument import RunReport, StageRecorder
+from utils.mapping import get_column_mapping_regex
+from utils.partition import first_record_end, is_partitionable, last_record_end
+from utils.schema import NORMALIZED_COLUMNS, export_frame
+from utils.sniff import SNIFF_BYTES, read_options, sniff_bytes
+from utils.states import DEFAULT_STATES, parse_states
+from utils.tableio import contact_column_filter, table_format
+
+# Bytes of whole records parsed at a time
+BATCH_BYTES = 4 * 1024 * 1024
+
+# Batches waiting between stages; a full queue pauses the stage feeding it
+QUEUE_BATCHES = 8
+
+# Block size when replaying a file the server reported unchanged
+READ_BLOCK = 1024 * 1024
+
+# Rows read back at a time when a finished file's spool is indexed
+INDEX_CHUNK_ROWS = 100_000
+
+# pd.read_csv options that only concern the header
+_HEADER_OPTIONS = ('encoding', 'encoding_errors', 'sep', 'quotechar', 'skiprows')
+
+
+def _usecols(header: bytes, options: Dict, wanted: Callable[[str], bool]) -> List[int]:
+    """Positions of the columns named in a header line that wanted keeps."""
+    header_options = {key: value for key, value in options.items() if key in _HEADER_OPTIONS}
+    columns = list(pd.read_csv(io.BytesIO(header), nrows=0, **header_options).columns)
+    return [i for i, col in enumerate(columns) if wanted(col)]
+
+def keyword_column_filter(keywords: List[str]) -> Callable[[str], bool]:
+    """usecols predicate keeping the columns whose name contains one of keywords, ignoring case."""
+    keywords = [keyword.lower() for keyword in keywords]
+
+    def wanted(col: str) -> bool:
+        return any(keyword in str(col).lower() for keyword in keywords)
+
+    return wanted
+
+def mentions_terms(data: bytes, encoding: str, terms: List[str]) -> bool:
+    """Whether the text of data contains any of terms, ignoring case."""
+    text = data.decode(encoding, errors='replace').lower()
+    return any(term.lower() in text for term in terms)
+
+def scrape_filter_frame(df: pd.DataFrame, column_keywords: List[str]) -> pd.DataFrame:
+    """
+    What index.ts processCsvContent and split.py do to a downloaded file,
+    for one parsed batch: keep the columns named by column_keywords, reduce
+    phone columns to their digits, keep rows where one has at least 10, then
+    expand them into one row per phone in a single 'Phone' column.
+    """
+    df = df[[col for col in df.columns if keyword_column_filter(column_keywords)(col)]]
+    phone_columns = find_phone_columns(df)
+    if not phone_columns:
+        return df.iloc[:0].assign(Phone='')
+
+    digits = {col: df[col].fillna('').astype(str).str.replace(r'\D', '', regex=True) for col in phone_columns}
+    valid = np.logical_or.reduce([(values.str.len() >= 10).to_numpy() for values in digits.values()])
+    return split.expand_phone_rows(df.assign(**digits)[valid].reset_index(drop=True))
+
+
+class FileBatcher:
+    """
+    Download sink for one file: buffers the body until its dialect is
+    sniffed, then cuts it on record boundaries into batches of about
+    batch_bytes, each parsed under the file's header line, and awaits them
+    onto the parse queue. Files whose dialect cannot be cut into ranges
+    (UTF-16, title rows above the header, unusual quoting) are sent as one
+    batch once complete.
+    """
+
+    def __init__(self, pipeline: 'Pipeline', file_id: int, url: str, path: str):
+        self.pipeline = pipeline
+        self.file_id = file_id
+        self.url = url
+        self.path = path
+        self.buffer = bytearray()
+        self.dialect = None
+        self.header = None
+        self.usecols = None
+        self.phone_columns = None
+        self.batches = 0
+        # Body bytes already sent on; a retried download skips past them
+        self.sent = 0
+        self.position = 0
+        self.received = 0
+
+    def restart(self):
+        """Start a new attempt at the body, resuming after the bytes already sent."""
+        self.buffer.clear()
+        self.position = 0
+
+    async def feed(self, block: bytes):
+        self.received += len(block)
+        skip = self.sent - self.position
+        self.position += len(block)
+        if skip >= len(block):
+            return
+        self.buffer += block[max(skip, 0):]
+
+        if self.dialect is None and len(self.buffer) >= SNIFF_BYTES:
+            self._sniff(complete=False)
+        if self.dialect is not None and is_partitionable(self.dialect) and len(self.buffer) >= self.pipeline.batch_bytes:
+            await self._send_records(final=False)
+
+    def _sniff(self, complete: bool):
+        self.dialect = sniff_bytes(bytes(self.buffer[:SNIFF_BYTES]), complete=complete)
+
+    async def _send_records(self, final: bool):
+        options = read_options(self.dialect)
+        if self.header is None:
+            header_end = first_record_end(bytes(self.buffer))
+            if not header_end:
+                if not final:
+                    return
+                header_end = len(self.buffer)
+            self.header = bytes(self.buffer[:header_end])
+            del self.buffer[:header_end]
+            self.sent = header_end
+            self.usecols = _usecols(self.header, options, self.pipeline.wanted_column)
+
+        end = len(self.buffer) if final else last_record_end(bytes(self.buffer))
+        if not end:
+            return
+        data = bytes(self.buffer[:end])
+        del self.buffer[:end]
+        self.sent += len(data)
+
+        if self.batches == 0:
+            self.phone_columns = self.pipeline.file_phone_columns(self.header + data, options, self.usecols)
+        await self.pipeline.parse_queue.put(
+            ('batch', self.file_id, self.batches, self.header, data, options, self.usecols, self.phone_columns)
+        )
+        self.batches += 1
+
+    async def finish(self, result: Dict):
+        """Send the rest of the body and the file's end marker."""
+        error = None
+        # Not modified since the last run: normalize the copy on disk
+        if result['ok'] and result['unchanged'] and not self.received and not os.path.exists(self.path):
+            error = 'unchanged since the last download, but its local copy is gone'
+        elif result['ok'] and result['unchanged'] and not self.received:
+            with open(self.path, 'rb') as f:
+                while True:
+                    block = await asyncio.to_thread(f.read, READ_BLOCK)
+                    if not block:
+                        break
+                    await self.feed(block)
+
+        if result['ok'] and not result['skipped'] and (self.buffer or self.header is None) and self.received:
+            if self.dialect is None:
+                self._sniff(complete=True)
+            if is_partitionable(self.dialect):
+                await self._send_records(final=True)
+            else:
+                options = read_options(self.dialect)
+                data = bytes(self.buffer)
+                self.buffer.clear()
+                usecols = _usecols(data, options, self.pipeline.wanted_column)
+                await self.pipeline.parse_queue.put(
+                    ('batch', self.file_id, 0, b'', data, options, usecols, self.pipeline.scrape_phone_columns)
+                )
+                self.batches = 1
+        await self.pipeline.parse_queue.put(('done', self.file_id, self.batches, result, error))
+
+
+class Pipeline:
+    """
+    Download, parse, normalize and write as overlapping stages. Downloads run
+    on the event loop and stream into FileBatchers; normalizer threads parse
+    and prepare batches; one writer thread spools each file's batches in
+    order and, once the file has downloaded and normalized without error,
+    appends them to the output CSV (and the contact index). Stages are joined
+    by bounded queues, so a slow stage pauses the ones before it instead of
+    buffering without limit: a full parse queue stops reading from the
+    sockets.
+
+    With forbidden_terms, files mentioning any of them add no rows. With
+    column_keywords, each batch first goes through index.ts's column and
+    phone filters and split.py's phone explode (scrape_filter_frame), so the
+    output matches what index.ts and format.py produce for the same links.
+    """
+
+    def __init__(self, output_file: str, column_mapping: Dict[str, str], states=DEFAULT_STATES,
+                 index_path: str = None, batch_bytes: int = BATCH_BYTES, queue_batches: int = QUEUE_BATCHES,
+                 normalizers: int = 1, report: RunReport = None, forbidden_terms: List[str] = None,
+                 column_keywords: List[str] = None):
+        self.output_file = output_file
+        self.column_mapping = column_mapping
+        self.states = states
+        self.index_path = index_path
+        self.batch_bytes = batch_bytes
+        self.queue_batches = queue_batches
+        self.normalizers = normalizers
+        self.report = report or RunReport('pipeline')
+        self.forbidden_terms = forbidden_terms
+        self.column_keywords = column_keywords
+        if column_keywords:
+            self.wanted_column = keyword_column_filter(column_keywords)
+            # split.py leaves one phone column, which every row has filled
+            self.scrape_phone_columns = ['Phone']
+        else:
+            self.wanted_column = contact_column_filter(column_mapping)
+            self.scrape_phone_columns = None
+        self.files: Dict[int, Dict] = {}
+        self.rows = 0
+        self.removed = {'removed_phones': 0, 'removed_states': 0}
+        self.busy = {'normalize': 0.0, 'write': 0.0}
+        self.first_rows = None
+        self.written = False
+        self.started = None
+        self.errors: List[BaseException] = []
+        self.run_id = None
+
+    def sink(self, url: str, path: str) -> FileBatcher:
+        file_id = len(self.files)
+        self.files[file_id] = {'name': os.path.basename(path), 'url': url, 'next': 0, 'pending': {},
+                               'batches': None, 'result': None, 'rows': 0, 'removed': dict.fromkeys(self.removed, 0),
+                               'spool': None, 'stages': [], 'errors': [], 'rejected': None, 'committed': False}
+        return FileBatcher(self, file_id, url, path)
+
+    def file_phone_columns(self, data: bytes, options: Dict, usecols: List[int]) -> Optional[List[str]]:
+        """The phone columns of a file, picked by its first record as when it is normalized whole."""
+        if self.scrape_phone_columns is not None:
+            return self.scrape_phone_columns
+        head = pd.read_csv(io.BytesIO(data), nrows=1, dtype=str, usecols=usecols, **options)
+        return leading_phone_columns(expand_phone_rows(head), self.column_mapping)
+
+    def _normalize_loop(self):
+        while True:
+            item = asyncio.run_coroutine_threadsafe(self.parse_queue.get(), self.loop).result()
+            if item is None:
+                return
+            if item[0] == 'done':
+                self.write_queue.put(item)
+                continue
+
+            _, file_id, seq, header, data, options, usecols, phone_columns = item
+            recorder = StageRecorder()
+            start = time.perf_counter()
+            df, stats, error, rejected = None, None, None, None
+            try:
+                if self.forbidden_terms and mentions_terms(header + data, options['encoding'], self.forbidden_terms):
+                    rejected = 'mentions forbidden terms'
+                else:
+                    with recorder.stage('read', bytes_read=len(header) + len(data)) as record:
+                        df = pd.read_csv(io.BytesIO(header + data), dtype=str, usecols=usecols, **options)
+                        record['rows_out'] = len(df)
+                    if self.column_keywords:
+                        with recorder.stage('scrape_filters', rows_in=len(df)) as record:
+                            df = scrape_filter_frame(df, self.column_keywords)
+                            record['rows_out'] = len(df)
+                    df, stats = prepare_frame(df, self.column_mapping, self.states, recorder, phone_columns)
+            except Exception as e:
+                df, stats, error = None, None, str(e)
+            self.busy['normalize'] += time.perf_counter() - start
+            self.write_queue.put(('rows', file_id, seq, df, stats, recorder.stages, error, rejected))
+
+    def _write_loop(self):
+        index = None
+        output = None
+        try:
+            if self.index_path:
+                index = ContactIndex(self.index_path)
+                self.run_id = index.start_run(f'pipeline:{self.output_file}')
+            while True:
+                item = self.write_queue.get()
+                if item is None:
+                    return
+                entry = self.files[item[1]]
+                if item[0] == 'done':
+                    entry['batches'], entry['result'] = item[2], item[3]
+                    if item[4] is not None:
+                        entry['errors'].append(item[4])
+                else:
+                    entry['pending'][item[2]] = item
+                # Spool the file's batches in order as they become available
+                while entry['next'] in entry['pending']:
+                    _, _, _, df, stats, stages, error, rejected = entry['pending'].pop(entry['next'])
+                    entry['next'] += 1
+                    entry['stages'].extend(stages)
+                    if error is not None:
+                        entry['errors'].append(error)
+                    elif rejected is not None:
+                        entry['rejected'] = entry['rejected'] or rejected
+                    elif not entry['errors'] and not entry['rejected']:
+                        self._spool(df, stats, entry)
+                if entry['batches'] is not None and entry['next'] == entry['batches']:
+                    output = self._finish_file(entry, output, index)
+        except BaseException as e:
+            self.errors.append(e)
+            # Keep draining, so the normalizers never block on a dead writer
+            while self.write_queue.get() is not None:
+                pass
+        finally:
+            for entry in self.files.values():
+                if entry['spool'] is not None:
+                    entry['spool'].close()
+            if output is not None:
+                output.close()
+            if index is not None:
+                index.close()
+
+    def _open_output(self):
+        output_dir = os.path.dirname(self.output_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        output = open(self.output_file, 'w', newline='')
+        pd.DataFrame(columns=NORMALIZED_COLUMNS).to_csv(output, index=False)
+        self.written = True
+        return output
+
+    def _spool(self, df: pd.DataFrame, stats: Dict, entry: Dict):
+        """Hold a batch's rows until its file is known to be complete."""
+        recorder = StageRecorder()
+        start = time.perf_counter()
+        with recorder.stage('spool', rows_in=len(df)):
+            if entry['spool'] is None:
+                entry['spool'] = tempfile.TemporaryFile(mode='w+', newline='')
+            export_frame(df).to_csv(entry['spool'], header=False, index=False)
+        self.busy['write'] += time.perf_counter() - start
+        entry['stages'].extend(recorder.stages)
+        entry['rows'] += len(df)
+        for key in entry['removed']:
+            entry['removed'][key] += stats[key]
+
+    def _commit(self, entry: Dict, output, index: Optional[ContactIndex]):
+        """Append a finished file's spooled rows to the output and the index."""
+        recorder = StageRecorder()
+        start = time.perf_counter()
+        spool = entry['spool']
+        if spool is not None:
+            with recorder.stage('write', rows_in=entry['rows']) as record:
+                position = output.tell()
+                spool.seek(0)
+                shutil.copyfileobj(spool, output)
+                output.flush()
+                record['bytes_written'] = output.tell() - position
+            if index is not None and entry['rows']:
+                with recorder.stage('index', rows_in=entry['rows']):
+                    spool.seek(0)
+                    for spooled in pd.read_csv(spool, header=None, names=NORMALIZED_COLUMNS, dtype=str,
+                                               keep_default_na=False, chunksize=INDEX_CHUNK_ROWS):
+                        index.upsert(spooled, self.run_id)
+        self.busy['write'] += time.perf_counter() - start
+        entry['stages'].extend(recorder.stages)
+        entry['committed'] = True
+
+        if entry['rows'] and self.first_rows is None:
+            self.first_rows = time.perf_counter() - self.started
+            print(f"First rows written after {self.first_rows:.2f}s")
+        self.rows += entry['rows']
+        for key in self.removed:
+            self.removed[key] += entry['removed'][key]
+
+    def _finish_file(self, entry: Dict, output, index: Optional[ContactIndex]):
+        """Commit or drop a file whose batches have all been spooled. Returns the output stream."""
+        result = entry['result']
+        error = None
+        if not result['ok']:
+            error = result['error']
+            print(f"Failed to download CSV: {entry['url']} ({error})")
+        elif result['skipped']:
+            print(f"No contact columns ({result.get('reason')}), skipping: {entry['url']}")
+        elif entry['errors']:
+            error = entry['errors'][0]
+            print(f"Error processing {entry['name']}: {error}")
+        elif entry['rejected']:
+            print(f"Skipping CSV as it {entry['rejected']}: {entry['name']}")
+        else:
+            output = output or self._open_output()
+            self._commit(entry, output, index)
+            print(f"Processed {entry['name']}: {entry['rows']} rows")
+        if entry['spool'] is not None:
+            entry['spool'].close()
+            entry['spool'] = None
+        self.report.add_file(entry['name'], entry['stages'], error=error)
+        entry['stages'] = []
+        return output
+
+    async def run(self, urls: List[str], dest_dir: str, cache: FetchCache = None, **download_options) -> List[Dict]:
+        """
+        Download urls into dest_dir while normalizing them into the output
+        file. Returns the download results. With a cache, a new download is
+        only recorded in it once its file has been written to the output.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.parse_queue = asyncio.Queue(maxsize=self.queue_batches)
+        self.write_queue = queue.Queue(maxsize=self.queue_batches)
+        self.started = time.perf_counter()
+
+        normalizers = [threading.Thread(target=self._normalize_loop, daemon=True) for _ in range(self.normalizers)]
+        writer = threading.Thread(target=self._write_loop, daemon=True)
+        for thread in normalizers + [writer]:
+            thread.start()
+
+        try:
+            with self.report.run.stage('download') as record:
+                results = await download_all(urls, dest_dir, sink_factory=self.sink, cache=cache, confirm=False,
+                                             **download_options)
+                record['bytes_read'] = sum(result['bytes'] for result in results)
+            self.download_seconds = time.perf_counter() - self.started
+        finally:
+            for _ in normalizers:
+                await self.parse_queue.put(None)
+            for thread in normalizers:
+                await asyncio.to_thread(thread.join)
+            await asyncio.to_thread(self.write_queue.put, None)
+            await asyncio.to_thread(writer.join)
+        self.seconds = time.perf_counter() - self.started
+
+        if self.errors:
+            raise self.errors[0]
+        if cache is not None:
+            for entry in self.files.values():
+                result = entry['result']
+                if entry['committed'] and result.get('sha256') and not result['unchanged']:
+                    cache.store(entry['url'], result['sha256'], result['etag'], result['last_modified'],
+                                result['bytes'], result['path'])
+        return results
+
+
+def _comma_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Download CSV links and normalize them into one contact CSV while they download.")
+    parser.add_argument("links_file", help="File with one link per line ('-' for stdin).")
+    parser.add_argument("dest_dir", help="Directory the downloaded files are saved in.")
+    parser.add_argument("output_file", help="Path to the normalized CSV output.")
+    parser.add_argument("--states", type=parse_states, default="default",
+                        help="States to keep: 'default', 'all', 'none' or a comma-separated list of names or codes.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight.")
+    parser.add_argument("--per-host", type=int, default=4, help="Maximum requests in flight per host.")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per link after the first attempt.")
+    parser.add_argument("--timeout", type=float, default=60,
+                        help="Seconds a connection may go without receiving data before the request is retried.")
+    parser.add_argument("--cache", help="Directory of the conditional-fetch cache (disabled if omitted).")
+    parser.add_argument("--no-probe", action="store_true",
+                        help="Download every file in full, even those whose header has no phone column.")
+    parser.add_argument("--index", default=None,
+                        help="SQLite contact index (keyed on phone) that this run's contacts are upserted into.")
+    parser.add_argument("--batch-mb", type=float, default=BATCH_BYTES / (1024 * 1024),
+                        help="Megabytes of whole records parsed at a time.")
+    parser.add_argument("--queue-batches", type=int, default=QUEUE_BATCHES,
+                        help="Batches held between stages before the earlier stage waits.")
+    parser.add_argument("--normalizers", type=int, default=1, help="Threads parsing and normalizing batches.")
+    parser.add_argument("--forbidden-terms", type=_comma_list, default=None,
+                        help="Comma-separated terms; files mentioning any of them (ignoring case) add no rows.")
+    parser.add_argument("--column-keywords", type=_comma_list, default=None,
+                        help="Comma-separated keywords; apply index.ts's column and phone filters, keeping columns "
+                             "whose name contains one, and split.py's phone explode before normalizing.")
+    parser.add_argument("--report", default=None,
+                        help="Write a JSON run report with per-file and per-stage timings, row counts and memory.")
+
+    args = parser.parse_args()
+
+    if table_format(args.output_file) != 'csv':
+        print("Error: the pipeline streams CSV output only.")
+        sys.exit(1)
+
+    column_mapping = get_column_mapping_regex()
+    report = RunReport('pipeline')
+    pipeline = Pipeline(args.output_file, column_mapping, args.states, args.index,
+                        batch_bytes=int(args.batch_mb * 1024 * 1024), queue_batches=args.queue_batches,
+                        normalizers=args.normalizers, report=report, forbidden_terms=args.forbidden_terms,
+                        column_keywords=args.column_keywords)
+    cache = FetchCache(args.cache) if args.cache else None
+    try:
+        results = asyncio.run(pipeline.run(
+            read_links(args.links_file), args.dest_dir, concurrency=args.concurrency, per_host=args.per_host,
+            retries=args.retries, timeout=args.timeout, cache=cache, probe=not args.no_probe,
+        ))
+    except Exception as e:
+        print(f"Error running pipeline: {str(e)}")
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+        if args.report:
+            report.write(args.report)
+            print(f"Run report saved to {args.report}")
+
+    failed = sum(not result['ok'] for result in results)
+    skipped = sum(result['skipped'] for result in results)
+    print(f"Downloaded {len(results) - failed - skipped} of {len(results)} links "
+          f"({sum(result['bytes'] for result in results) / 1e6:.1f} MB), {skipped} skipped without contacts")
+    print(f"Download {pipeline.download_seconds:.2f}s, normalize {pipeline.busy['normalize']:.2f}s busy, "
+          f"write {pipeline.busy['write']:.2f}s busy, total {pipeline.seconds:.2f}s")
+    if pipeline.index_path:
+        print(f"Indexed run {pipeline.run_id} in {pipeline.index_path}")
+
+    if not pipeline.written:
+        print("No data was processed successfully.")
+        sys.exit(1)
+
+    print(f"Removed {pipeline.removed['removed_phones']} rows without valid phone numbers")
+    if args.states is not None:
+        print(f"Removed {pipeline.removed['removed_states']} rows outside the selected states")
+    print(f"Normalized data saved to {args.output_file}")
+    print(f"Final number of rows: {pipeline.rows}")
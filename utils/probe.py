@@ -0,0 +1,94 @@
+import argparse
+import io
+import os
+import sys
+from typing import Dict, List
+
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mapping import get_column_mapping_regex, resolve_header
+from utils.normalize import is_valid_phone_series
+from utils.sniff import sniff_bytes
+
+# Bytes read from the start of a file: the header plus a few dozen rows
+PROBE_BYTES = 16 * 1024
+
+
+def _sample_frame(data: bytes, complete: bool) -> pd.DataFrame:
+    """
+    Parse a prefix of a CSV in its sniffed encoding and dialect, dropping the
+    last line unless the prefix is the whole file.
+    """
+    dialect = sniff_bytes(data, complete)
+    text = data.decode(dialect['encoding'], errors='replace')
+    if not complete:
+        cut = text.rfind('\n')
+        # A header longer than the probe still tells us the first columns
+        text = text[:cut] if cut > 0 else text
+    return pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False, on_bad_lines='skip',
+                       sep=dialect['delimiter'], quotechar=dialect['quotechar'], skiprows=dialect['header_row'])
+
+def probe_bytes(data: bytes, column_mapping: Dict[str, str] = None, complete: bool = False,
+                min_valid: float = 0.1) -> Dict:
+    """
+    Decide from the first bytes of a CSV whether it can yield contacts.
+    A file is relevant when a column maps to 'phone' and, if the sample has
+    any values in those columns, at least min_valid of them are phone numbers.
+    Returns {'relevant', 'reason', 'phone_columns', 'mapped_columns'}.
+    """
+    column_mapping = column_mapping or get_column_mapping_regex()
+    result = {'relevant': False, 'reason': None, 'phone_columns': [], 'mapped_columns': []}
+
+    try:
+        sample = _sample_frame(data, complete)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeError) as e:
+        result['reason'] = f'unparseable: {type(e).__name__}'
+        return result
+
+    targets = resolve_header(list(sample.columns), column_mapping)
+    result['mapped_columns'] = [str(col) for col, target in zip(sample.columns, targets) if target is not None]
+    phone_columns: List[str] = [str(col) for col, target in zip(sample.columns, targets) if target == 'phone']
+    result['phone_columns'] = phone_columns
+    if not phone_columns:
+        result['reason'] = 'no phone column'
+        return result
+
+    values = pd.concat([sample.iloc[:, i] for i, target in enumerate(targets) if target == 'phone'],
+                       ignore_index=True)
+    values = values[values.str.strip() != ''].str.split(',').explode().str.replace(r'\.0$', '', regex=True)
+    if len(values) and is_valid_phone_series(values).mean() < min_valid:
+        result['reason'] = 'sampled phone values are not phone numbers'
+        return result
+
+    result['relevant'] = True
+    return result
+
+def probe_file(path: str, column_mapping: Dict[str, str] = None, size: int = PROBE_BYTES) -> Dict:
+    """Probe the first size bytes of a CSV file; see probe_bytes."""
+    with open(path, 'rb') as f:
+        data = f.read(size + 1)
+    return probe_bytes(data[:size], column_mapping, complete=len(data) <= size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report which CSV files can contain contacts, reading only their first bytes.")
+    parser.add_argument("files", nargs='+', help="CSV files to probe.")
+    parser.add_argument("--bytes", type=int, default=PROBE_BYTES, help="Bytes read from each file.")
+
+    args = parser.parse_args()
+
+    skipped = 0
+    saved = 0
+    for path in args.files:
+        result = probe_file(path, size=args.bytes)
+        if result['relevant']:
+            print(f"{path}: contacts ({', '.join(result['phone_columns'])})")
+        else:
+            skipped += 1
+            saved += max(os.path.getsize(path) - args.bytes, 0)
+            print(f"{path}: skipped, {result['reason']}")
+
+    print(f"Skipped {skipped} of {len(args.files)} files, {saved} bytes not parsed")
@@ -0,0 +1,322 @@
+import argparse
+import os
+import sys
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.csvtool import CHUNKSIZE
+
+# Columns read to resolve entities; the rest are only copied to the output
+KEY_FIELDS = ['first_name', 'last_name', 'business_name', 'phone', 'zip', 'email']
+
+# Name used for each entity kind, in order of preference
+ENTITY_NAMES = {
+    'contact': ['person', 'business'],
+    'business': ['business', 'person'],
+}
+
+# Words that do not tell two names apart: legal suffixes, articles and titles
+STOP_WORDS = [
+    'inc', 'incorporated', 'llc', 'pllc', 'llp', 'lp', 'ltd', 'limited', 'corp', 'corporation',
+    'co', 'company', 'pc', 'pa', 'plc', 'the', 'of', 'and',
+    'mr', 'mrs', 'ms', 'miss', 'dr', 'jr', 'sr', 'ii', 'iii', 'iv', 'md', 'dds', 'dmd', 'esq',
+]
+
+# Mailbox providers shared by unrelated people; their domains are not a block
+FREE_MAIL_DOMAINS = {
+    'gmail.com', 'googlemail.com', 'yahoo.com', 'ymail.com', 'hotmail.com', 'outlook.com', 'live.com',
+    'msn.com', 'aol.com', 'icloud.com', 'me.com', 'mac.com', 'comcast.net', 'att.net', 'sbcglobal.net',
+    'verizon.net', 'bellsouth.net', 'cox.net', 'charter.net', 'protonmail.com', 'mail.com', 'gmx.com',
+}
+
+# Blocks larger than this are compared as a sorted neighbourhood of this width
+WINDOW = 50
+
+# Characters of a canonical name used for similarity
+MAX_NAME_CHARS = 64
+
+# Candidate pairs scored at a time
+PAIR_BATCH = 1_000_000
+
+# Trigram similarity needed to link two records sharing each kind of block
+THRESHOLDS = {
+    'phone': 0.4,
+    'zip_name': 0.7,
+    'email_domain': 0.7,
+}
+
+_STOP_WORDS = r'\b(?:' + '|'.join(STOP_WORDS) + r')\b'
+
+
+def canonical_names(names: pd.Series) -> pd.Series:
+    """
+    Lower-case names with punctuation, legal suffixes and titles removed, so
+    'CRESCENT HEALTHCARE INC' and 'Crescent Healthcare, Inc.' both become
+    'crescent healthcare'.
+    """
+    return (names.fillna('').astype(str).str.lower()
+            .str.replace('&', ' and ', regex=False)
+            .str.replace(r"[.']", '', regex=True)
+            .str.replace(r'[^a-z0-9]+', ' ', regex=True)
+            .str.replace(_STOP_WORDS, ' ', regex=True)
+            .str.replace(r'\s+', ' ', regex=True)
+            .str.strip()
+            .str.slice(0, MAX_NAME_CHARS))
+
+def entity_names(df: pd.DataFrame, entity: str = 'contact') -> pd.Series:
+    """
+    Canonical name of each row: the person's first and last name or the
+    business name, whichever entity prefers and is present.
+    """
+    candidates = {
+        'person': canonical_names(df['first_name'].fillna('').astype(str) + ' ' + df['last_name'].fillna('').astype(str)),
+        'business': canonical_names(df['business_name']),
+    }
+    preferred, fallback = ENTITY_NAMES[entity]
+    names = candidates[preferred]
+    return names.where(names != '', candidates[fallback])
+
+def blocking_keys(df: pd.DataFrame, names: pd.Series) -> Dict[str, pd.Series]:
+    """
+    Blocking key of each row per block kind ('' where the row has none):
+    the phone, the zip with the first name token, and the email domain
+    unless it is a free mailbox provider.
+    """
+    phones = df['phone'].fillna('').astype(str)
+    zips = df['zip'].fillna('').astype(str)
+    tokens = names.str.replace(r' .*', '', regex=True)
+    zip_name = (zips + ' ' + tokens).where((zips != '') & (tokens != ''), '')
+    # split rather than rpartition, which has no column 2 on an empty frame
+    domains = df['email'].fillna('').astype(str).str.strip().str.lower().str.split('@').str[-1].fillna('')
+    domains = domains.where(df['email'].fillna('').astype(str).str.contains('@', regex=False) & ~domains.isin(FREE_MAIL_DOMAINS), '')
+    return {'phone': phones, 'zip_name': zip_name, 'email_domain': domains}
+
+
+def block_pairs(keys: pd.Series, names: pd.Series, window: int = WINDOW) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Candidate pairs (i < j) of rows sharing a non-empty key. Rows are sorted
+    by key and name and each row is paired with the next window - 1 rows of
+    its block, which is every pair for blocks of up to window rows.
+    """
+    codes, _ = pd.factorize(keys.where(keys != ''), use_na_sentinel=True)
+    rows = np.flatnonzero(codes >= 0)
+    if len(rows) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    order = rows[np.lexsort((names.to_numpy()[rows].astype(str), codes[rows]))]
+    block = codes[order]
+    # Position just past the end of each row's block
+    boundaries = np.flatnonzero(np.diff(block)) + 1
+    block_end = np.append(boundaries, len(order))[np.searchsorted(boundaries, np.arange(len(order)), side='right')]
+
+    left, right = [], []
+    active = np.flatnonzero(block_end - np.arange(len(order)) > 1)
+    for offset in range(1, window):
+        active = active[active + offset < block_end[active]]
+        if not len(active):
+            break
+        left.append(order[active])
+        right.append(order[active + offset])
+
+    if not left:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    i, j = np.concatenate(left), np.concatenate(right)
+    return np.minimum(i, j).astype(np.int64), np.maximum(i, j).astype(np.int64)
+
+
+def _trigram_keys(names: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Distinct character trigrams of every name, as sorted keys
+    row * gram_count + gram. Returns the keys, each row's first key
+    position and trigram count, and gram_count.
+    """
+    padded = ' ' + names.astype(str) + ' '
+    lengths = padded.str.len().to_numpy()
+    rows, grams = [], []
+    for start in range(max(int(lengths.max(initial=0)) - 2, 0)):
+        present = np.flatnonzero((lengths - start >= 3) & (lengths > 2))
+        rows.append(present)
+        grams.append(padded.iloc[present].str.slice(start, start + 3).to_numpy(dtype=object))
+
+    if not rows:
+        zeros = np.zeros(len(names), dtype=np.int64)
+        return np.empty(0, dtype=np.int64), zeros, zeros, 1
+
+    codes, uniques = pd.factorize(np.concatenate(grams))
+    gram_count = max(len(uniques), 1)
+    keys = np.sort(np.concatenate(rows).astype(np.int64) * gram_count + codes)
+    keys = keys[np.append(True, keys[1:] != keys[:-1])]
+    row_of_key = keys // gram_count
+    counts = np.bincount(row_of_key, minlength=len(names))
+    starts = np.searchsorted(row_of_key, np.arange(len(names)))
+    return keys, starts, counts, gram_count
+
+def trigram_similarity(names: pd.Series, i: np.ndarray, j: np.ndarray, batch: int = PAIR_BATCH) -> np.ndarray:
+    """
+    Jaccard similarity of the character trigram sets of names[i] and
+    names[j] for every pair, scored in batches of pairs with array
+    operations only (0 when either name is empty). Each distinct pair of
+    distinct names is scored once; equal names score 1 without lookups.
+    """
+    codes, uniques = pd.factorize(names.reset_index(drop=True))
+    ci, cj = codes[i], codes[j]
+    different = ci != cj
+    similarity = np.where(names.to_numpy()[i] != '', 1.0, 0.0)
+    if different.any():
+        width = max(len(uniques), 1)
+        unique_pairs, inverse = np.unique(ci[different].astype(np.int64) * width + cj[different], return_inverse=True)
+        scores = _pair_similarity(pd.Series(uniques), unique_pairs // width, unique_pairs % width, batch)
+        similarity[different] = scores[inverse]
+    return similarity
+
+def _pair_similarity(names: pd.Series, i: np.ndarray, j: np.ndarray, batch: int) -> np.ndarray:
+    keys, starts, counts, gram_count = _trigram_keys(names)
+    similarity = np.zeros(len(i))
+    for lo in range(0, len(i), batch):
+        bi, bj = i[lo:lo + batch], j[lo:lo + batch]
+        sizes = counts[bi]
+        pair = np.repeat(np.arange(len(bi)), sizes)
+        # Position of each of row i's trigrams among the sorted keys
+        offsets = np.arange(len(pair)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        grams = keys[np.repeat(starts[bi], sizes) + offsets] % gram_count
+        probes = np.repeat(bj, sizes) * gram_count + grams
+        found = np.searchsorted(keys, probes)
+        found[found == len(keys)] = 0
+        shared = np.bincount(pair, weights=keys[found] == probes if len(keys) else None, minlength=len(bi))
+        union = sizes + counts[bj] - shared
+        similarity[lo:lo + batch] = np.divide(shared, union, out=np.zeros(len(bi)), where=union > 0)
+    return similarity
+
+
+def cluster_ids(n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """
+    Connected components of n rows linked by the pairs (i, j), numbered from
+    0 in order of each component's first row.
+    """
+    labels = np.arange(n)
+    while len(i):
+        low = np.minimum(labels[i], labels[j])
+        updated = labels.copy()
+        np.minimum.at(updated, i, low)
+        np.minimum.at(updated, j, low)
+        # Point every row at its label's label until the labels settle
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    return np.unique(labels, return_inverse=True)[1]
+
+def resolve_frame(df: pd.DataFrame, entity: str = 'contact', window: int = WINDOW,
+                  thresholds: Dict[str, float] = None) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Cluster the rows of a normalized frame that describe the same entity.
+    Candidate pairs come only from rows sharing a block (phone, zip and first
+    name token, or email domain) and are linked when their name trigram
+    similarity reaches the block's threshold; rows sharing a phone with an
+    unnamed row, or sharing an email address, are linked outright. Returns a
+    cluster id per row and the pair counts.
+    """
+    thresholds = {**THRESHOLDS, **(thresholds or {})}
+    df = df.reset_index(drop=True)
+    names = entity_names(df, entity)
+    stats = {'rows': len(df), 'naive_pairs': len(df) * (len(df) - 1) // 2}
+
+    named = (names != '').to_numpy()
+    lefts, rights, required = [], [], []
+    for kind, keys in blocking_keys(df, names).items():
+        i, j = block_pairs(keys, names, window)
+        stats[f'{kind}_pairs'] = len(i)
+        need = np.full(len(i), thresholds[kind])
+        if kind == 'phone':
+            need[~named[i] | ~named[j]] = 0.0
+        lefts.append(i)
+        rights.append(j)
+        required.append(need)
+
+    i, j, need = np.concatenate(lefts), np.concatenate(rights), np.concatenate(required)
+    emails = df['email'].fillna('').astype(str).str.strip().str.lower()
+    emails, _ = pd.factorize(emails.where(emails != ''), use_na_sentinel=True)
+    need[(emails[i] >= 0) & (emails[i] == emails[j])] = 0.0
+
+    # A pair found by several blocks is scored once, against its lowest threshold
+    pair_keys = i * max(len(df), 1) + j
+    order = np.lexsort((need, pair_keys))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = pair_keys[order][1:] != pair_keys[order][:-1]
+    i, j, need = i[order[first]], j[order[first]], need[order[first]]
+    stats['candidate_pairs'] = len(i)
+
+    linked = trigram_similarity(names, i, j) >= need
+    stats['matched_pairs'] = int(linked.sum())
+    clusters = cluster_ids(len(df), i[linked], j[linked])
+    stats['clusters'] = int(clusters.max()) + 1 if len(clusters) else 0
+    return clusters, stats
+
+def resolve_file(input_file: str, output_file: str, entity: str = 'contact', window: int = WINDOW,
+                 chunksize: int = CHUNKSIZE) -> Dict[str, int]:
+    """
+    Add a cluster_id column to a normalized CSV. Only the key columns are
+    held in memory; the file is then copied chunk by chunk with each row's
+    cluster id. Returns the pair and cluster counts.
+    """
+    header = list(pd.read_csv(input_file, nrows=0).columns)
+    missing = [col for col in KEY_FIELDS if col not in header]
+    if missing:
+        raise KeyError(f"{input_file} is not a normalized file; missing columns: {', '.join(missing)}")
+
+    keys = pd.read_csv(input_file, dtype=str, keep_default_na=False, usecols=KEY_FIELDS)
+    clusters, stats = resolve_frame(keys, entity, window)
+    del keys
+
+    def chunks():
+        offset = 0
+        for chunk in pd.read_csv(input_file, dtype=str, keep_default_na=False, chunksize=chunksize):
+            yield chunk.assign(cluster_id=clusters[offset:offset + len(chunk)])
+            offset += len(chunk)
+
+    columns = [col for col in header if col != 'cluster_id'] + ['cluster_id']
+    tmp_output = output_file + '.tmp'
+    with open(tmp_output, 'w', newline='') as f:
+        pd.DataFrame(columns=columns).to_csv(f, index=False)
+        for chunk in chunks():
+            chunk[columns].to_csv(f, header=False, index=False)
+    os.replace(tmp_output, output_file)
+    return stats
+
+def print_stats(stats: Dict[str, int]):
+    print(f"Evaluated {stats['candidate_pairs']} candidate pairs "
+          f"(phone {stats['phone_pairs']}, zip+name {stats['zip_name_pairs']}, email domain {stats['email_domain_pairs']}) "
+          f"instead of {stats['naive_pairs']}")
+    print(f"Linked {stats['matched_pairs']} pairs: {stats['rows']} rows in {stats['clusters']} clusters")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assign a cluster id to rows of a normalized CSV that describe the same entity.")
+    parser.add_argument("input_file", help="Path to the normalized CSV file.")
+    parser.add_argument("output_file", help="Path to the output CSV file with a cluster_id column (may equal input_file).")
+    parser.add_argument("--entity", choices=sorted(ENTITY_NAMES), default="contact",
+                        help="Match people by their own name first, or by business name first.")
+    parser.add_argument("--window", type=int, default=WINDOW,
+                        help="Rows each row is compared with inside a block; larger blocks use a sorted neighbourhood.")
+
+    args = parser.parse_args()
+
+    try:
+        stats = resolve_file(args.input_file, args.output_file, args.entity, args.window)
+    except FileNotFoundError:
+        print(f"Error: The file '{args.input_file}' does not exist.")
+        sys.exit(1)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+        sys.exit(1)
+
+    print_stats(stats)
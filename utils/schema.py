@@ -0,0 +1,80 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from utils.states import ALL_STATES
+from utils.tableio import HAS_PYARROW
+
+# Every normalized column is text on export; in memory each has a compact type
+NORMALIZED_COLUMNS = [
+    'first_name', 'last_name', 'business_name', 'phone',
+    'state', 'zip', 'email'
+]
+
+TEXT_COLUMNS = ['first_name', 'last_name', 'business_name', 'email']
+CATEGORICAL_COLUMNS = ['state', 'zip']
+
+# States first, so frames filtered to states share one category set
+STATE_CATEGORIES = sorted(ALL_STATES) + ['']
+
+# Arrow-backed strings keep each column as one buffer instead of a Python object per value
+TEXT_DTYPE = pd.StringDtype('pyarrow') if HAS_PYARROW else object
+
+PHONE_DIGITS = 10
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a finalized text frame to the compact schema: phone as int64,
+    state and zip as categoricals, names and emails as Arrow strings. Zips
+    stay categorical rather than numeric, since '02134' and '2134' are both
+    valid cleaned values. A phone column that is not all 10-digit numbers is
+    left as text.
+    """
+    columns = {}
+    phones = df['phone'].astype(str)
+    if len(phones) == 0 or phones.str.fullmatch(r'\d{10}').all():
+        columns['phone'] = phones.astype(np.int64)
+    else:
+        columns['phone'] = phones.astype(TEXT_DTYPE)
+
+    states = df['state'].astype(str)
+    extra = sorted(set(states.unique()) - set(STATE_CATEGORIES))
+    columns['state'] = pd.Categorical(states, categories=STATE_CATEGORIES + extra)
+    columns['zip'] = pd.Categorical(df['zip'].astype(str))
+
+    for col in TEXT_COLUMNS:
+        columns[col] = df[col].astype(str).astype(TEXT_DTYPE)
+
+    return pd.DataFrame({col: columns[col] for col in NORMALIZED_COLUMNS}, index=df.index)
+
+def export_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a compact frame back to text columns, as written to CSV, Parquet or Arrow files."""
+    columns: Dict[str, np.ndarray] = {}
+    for col in df.columns:
+        values = df[col]
+        if col == 'phone' and pd.api.types.is_integer_dtype(values):
+            columns[col] = values.astype(str).str.zfill(PHONE_DIGITS).to_numpy(dtype=object)
+        else:
+            columns[col] = values.astype(object).to_numpy(dtype=object)
+    return pd.DataFrame(columns, index=df.index, dtype=object)
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate compact frames, keeping categorical columns categorical even
+    when the frames' category sets differ (plain concat would fall back to
+    Python objects).
+    """
+    df = pd.concat(frames, ignore_index=True)
+    for col in CATEGORICAL_COLUMNS:
+        parts = [frame[col] for frame in frames if col in frame]
+        if col in df and parts and not isinstance(df[col].dtype, pd.CategoricalDtype) \
+                and all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            df[col] = pd.Categorical(union_categoricals(parts, ignore_order=True))
+    return df
+
+def frame_memory(df: pd.DataFrame) -> Dict[str, int]:
+    """Bytes held by each column, including string contents."""
+    return {col: int(size) for col, size in df.memory_usage(deep=True, index=False).items()}
@@ -0,0 +1,196 @@
+import argparse
+import codecs
+import csv
+import hashlib
+import os
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Bytes inspected from the start of a file
+SNIFF_BYTES = 64 * 1024
+
+DELIMITERS = [',', ';', '\t', '|']
+
+# Lines examined for the delimiter and header row
+SNIFF_LINES = 50
+
+# Error handler decoding bytes that are invalid in the sniffed encoding as
+# cp1252, so a file that switches encodings midway keeps every row
+FALLBACK_ERRORS = 'cp1252fallback'
+
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Decisions keyed on a hash of the inspected prefix, and on path, size and mtime
+_dialect_cache: Dict[str, Dict] = {}
+_path_cache: Dict[Tuple[str, int, int], Dict] = {}
+
+# Byte runs decoded by the fallback handler in this process
+fallback_decodes = 0
+
+
+def _decode_fallback(error: UnicodeDecodeError):
+    global fallback_decodes
+    fallback_decodes += 1
+    return error.object[error.start:error.end].decode('cp1252', errors='replace'), error.end
+
+codecs.register_error(FALLBACK_ERRORS, _decode_fallback)
+
+
+def detect_encoding(data: bytes, complete: bool = False) -> str:
+    """
+    Encoding of a file from its first bytes: a byte order mark if there is
+    one, UTF-16 when every other byte is NUL, UTF-8 when the bytes decode as
+    UTF-8 (a character cut off at the end of the prefix is allowed) or hold
+    any valid multi-byte UTF-8 character, else cp1252.
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return encoding
+
+    sample = data[:4096]
+    if len(sample) >= 4:
+        even_nuls = sample[0::2].count(0) / len(sample[0::2])
+        odd_nuls = sample[1::2].count(0) / len(sample[1::2])
+        if odd_nuls > 0.4 and even_nuls < 0.1:
+            return 'utf-16-le'
+        if even_nuls > 0.4 and odd_nuls < 0.1:
+            return 'utf-16-be'
+
+    try:
+        data.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # Only an incomplete character at the very end of a prefix is acceptable
+        if not complete and e.reason == 'unexpected end of data':
+            return 'utf-8'
+
+    # Valid multi-byte characters mean UTF-8 with some cp1252 mixed in, which
+    # the fallback handler decodes; cp1252 text almost never forms them
+    text = data.decode('utf-8', errors='replace')
+    if any(ord(ch) > 127 and ch != '\ufffd' for ch in text):
+        return 'utf-8'
+    return 'cp1252'
+
+def _field_counts(lines: List[str], delimiter: str, quotechar: str) -> List[int]:
+    reader = csv.reader(lines, delimiter=delimiter, quotechar=quotechar)
+    try:
+        return [len(row) for row in reader if row]
+    except csv.Error:
+        return []
+
+def detect_dialect(text: str, complete: bool = False) -> Dict:
+    """
+    Delimiter, quote character and header row from decoded text. The
+    delimiter is the candidate giving the most lines with the same field
+    count; the header is the first line with at least half that many fields,
+    so title or notes lines above a table are skipped.
+    """
+    lines = text.splitlines(keepends=True)
+    if not complete and len(lines) > 1:
+        # The last line of a prefix is usually cut off
+        lines = lines[:-1]
+    lines = lines[:SNIFF_LINES]
+
+    quotechar = '"'
+    if text.count("'") > 2 * text.count('"') + 2:
+        try:
+            quotechar = csv.Sniffer().sniff(''.join(lines), delimiters=''.join(DELIMITERS)).quotechar or '"'
+        except csv.Error:
+            pass
+
+    best = (0, 0, ',')
+    for delimiter in DELIMITERS:
+        counts = _field_counts(lines, delimiter, quotechar)
+        if not counts:
+            continue
+        width, agreeing = Counter(counts).most_common(1)[0]
+        if width > 1 and (agreeing, width) > best[:2]:
+            best = (agreeing, width, delimiter)
+    agreeing, width, delimiter = best
+
+    # Title or notes lines have far fewer fields than the table below them
+    header_row = 0
+    if width > 1:
+        reader = csv.reader(lines, delimiter=delimiter, quotechar=quotechar)
+        try:
+            header_row = next((i for i, row in enumerate(reader) if len(row) >= max(2, width // 2)), 0)
+        except csv.Error:
+            header_row = 0
+
+    return {'delimiter': delimiter, 'quotechar': quotechar, 'header_row': header_row}
+
+def sniff_bytes(data: bytes, complete: bool = False) -> Dict:
+    """Encoding, delimiter, quote character and header row of a CSV from its first bytes."""
+    key = hashlib.sha1(data).hexdigest()
+    dialect = _dialect_cache.get(key)
+    if dialect is None:
+        encoding = detect_encoding(data, complete)
+        text = data.decode(encoding, errors=FALLBACK_ERRORS if encoding == 'utf-8' else 'replace')
+        dialect = {'encoding': encoding, **detect_dialect(text, complete)}
+        _dialect_cache[key] = dialect
+    return dict(dialect)
+
+def sniff_file(path: str, size: int = SNIFF_BYTES) -> Dict:
+    """sniff_bytes on the start of a file, remembered per path until the file changes."""
+    stat = os.stat(path)
+    path_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    dialect = _path_cache.get(path_key)
+    if dialect is None:
+        with open(path, 'rb') as f:
+            data = f.read(size)
+        dialect = sniff_bytes(data, complete=len(data) < size)
+        _path_cache[path_key] = dialect
+    return dict(dialect)
+
+def read_options(dialect: Dict) -> Dict:
+    """
+    pd.read_csv keyword arguments for a sniffed dialect. Bytes the encoding
+    cannot decode fall back to cp1252 and malformed lines are skipped, so one
+    bad region costs its own rows rather than the whole file.
+    """
+    options = {
+        'encoding': dialect['encoding'],
+        'encoding_errors': FALLBACK_ERRORS,
+        'sep': dialect['delimiter'],
+        'quotechar': dialect['quotechar'],
+        'on_bad_lines': 'skip',
+    }
+    if dialect['header_row']:
+        options['skiprows'] = dialect['header_row']
+    return options
+
+def is_default(dialect: Dict) -> bool:
+    """Whether a plain pd.read_csv would read the file the same way."""
+    return (dialect['encoding'] == 'utf-8' and dialect['delimiter'] == ','
+            and dialect['quotechar'] == '"' and not dialect['header_row'])
+
+def describe(dialect: Dict) -> str:
+    """Short note on how a file differs from a plain UTF-8 comma-separated CSV ('' if it does not)."""
+    notes = []
+    if dialect['encoding'] != 'utf-8':
+        notes.append(dialect['encoding'])
+    if dialect['delimiter'] != ',':
+        notes.append(f"{dialect['delimiter']!r}-delimited")
+    if dialect['quotechar'] != '"':
+        notes.append(f"quoted with {dialect['quotechar']!r}")
+    if dialect['header_row']:
+        notes.append(f"header on line {dialect['header_row'] + 1}")
+    return ', '.join(notes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the encoding and CSV dialect detected for files.")
+    parser.add_argument("files", nargs='+', help="CSV files to inspect.")
+    parser.add_argument("--bytes", type=int, default=SNIFF_BYTES, help="Bytes read from each file.")
+
+    args = parser.parse_args()
+
+    for path in args.files:
+        dialect = sniff_file(path, args.bytes)
+        print(f"{path}: {describe(dialect) or 'utf-8, comma-separated'}")
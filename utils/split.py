@@ -1,7 +1,15 @@
 import argparse
-import pandas as pd
-import pandas as pd
-import numpy as np
+import json
+import os
+import sys
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.explode import explode_phones, find_phone_columns
+from utils.instrument import RunReport, StageRecorder, merge_stages, profiled
+from utils.tableio import read_table, write_table
+
 
 def expand_phone_rows(df):
     """
@@ -10,71 +18,108 @@ def expand_phone_rows(df):
     Removes trailing '.0' from phone numbers.
     """
     # Find all phone-related columns
-    phone_columns = [col for col in df.columns if 'phone' in col.lower()]
+    phone_columns = find_phone_columns(df)
 
     if not phone_columns:
         return df
 
-    # Create a list to store our new rows
-    expanded_rows = []
-
     # Get non-phone columns
     non_phone_cols = [col for col in df.columns if col not in phone_columns]
 
-    # Create column list for output DataFrame
-    output_columns = non_phone_cols + ['Phone']
-
-    # Iterate through each original row
-    for _, row in df.iterrows():
-        has_phone = False
-        base_data = {col: row[col] for col in non_phone_cols}
-
-        # For each phone column, create a new row if there's a valid number
-        for phone_col in phone_columns:
-            phone = str(row[phone_col]).strip()
+    # One entry per phone, with '.0' left over from float parsing removed
+    exploded = explode_phones(
+        df, phone_columns,
+        normalize=lambda phones: phones.str.replace(r'\.0$', '', regex=True),
+    )
 
-            # Skip empty or invalid phones
-            if phone == '' or phone == 'nan' or pd.isna(phone) or phone is None:
-                continue
+    # Create new DataFrame with the non-phone columns followed by 'Phone'
+    result_df = df[non_phone_cols].take(exploded['row'].to_numpy()).reset_index(drop=True)
+    result_df['Phone'] = exploded['phone'].to_numpy()
 
-            # Remove trailing '.0'
-            if phone.endswith('.0'):
-                phone = phone[:-2]
+    return result_df
 
-            # Create a new row with non-phone data and current phone
-            new_row = base_data.copy()
-            new_row['Phone'] = phone
-            expanded_rows.append(new_row)
-            has_phone = True
+def split_file(input_file, output_file, recorder: StageRecorder = None):
+    """
+    Expand the phone rows of one file and return the number of rows written.
+    Input and output may be CSV, Parquet or Arrow IPC, chosen by extension.
+    Each step is timed on recorder when one is given.
+    """
+    recorder = recorder or StageRecorder()
+    
+    # Read input as text so phone numbers are not parsed as floats
+    with recorder.stage('read', bytes_read=os.path.getsize(input_file)) as record:
+        df = read_table(input_file)
+        record['rows_out'] = len(df)
+    
+    # Process the DataFrame
+    with recorder.stage('expand_phone_rows', rows_in=len(df)) as record:
+        expanded_df = expand_phone_rows(df)
+        record['rows_out'] = len(expanded_df)
+    
+    # Save to output file
+    with recorder.stage('write', rows_in=len(expanded_df)) as record:
+        write_table(expanded_df, output_file)
+        record['bytes_written'] = os.path.getsize(output_file)
+    return len(expanded_df)
 
-        # If no valid phones found, preserve the original row with empty phone
-        if not has_phone:
-            base_data['Phone'] = ''
-            expanded_rows.append(base_data)
 
-    # Create new DataFrame with the specified columns
-    result_df = pd.DataFrame(expanded_rows, columns=output_columns)
+def serve(stdin=sys.stdin, stdout=sys.stdout):
+    """
+    Handle many files in one process, keeping pandas loaded between them.
+    Reads one JSON request per line, {"input": ..., "output": ...} with an
+    optional "id", and answers each with one JSON line: {"id", "ok", "rows",
+    "stages"} on success or {"id", "ok", "error"} on failure, where stages
+    holds the timing record of each step.
+    """
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            recorder = StageRecorder()
+            rows = split_file(request["input"], request.get("output", request["input"]), recorder)
+            response = {"id": request_id, "ok": True, "rows": rows, "stages": merge_stages(recorder.stages)}
+        except Exception as e:
+            response = {"id": request_id, "ok": False, "error": str(e)}
+        
+        stdout.write(json.dumps(response) + "\n")
+        stdout.flush()
 
-    return result_df
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Expand phone number rows in a CSV file.")
-    parser.add_argument("input_file", help="Path to the input CSV file.")
-    parser.add_argument("output_file", help="Path to the output CSV file.")
+    parser.add_argument("input_file", nargs="?", help="Path to the input CSV file.")
+    parser.add_argument("output_file", nargs="?", help="Path to the output file (.csv, .parquet or .arrow).")
+    parser.add_argument("--serve", action="store_true",
+                        help="Process many files, reading JSON line requests from stdin and answering on stdout.")
+    parser.add_argument("--report", default=None, help="Write a JSON report with the timings of each step.")
+    parser.add_argument("--profile", default=None, metavar="DIR", help="Save cProfile stats for the file in this directory.")
     
     args = parser.parse_args()
     
+    if args.serve:
+        serve()
+        sys.exit(0)
+    
+    if not args.input_file or not args.output_file:
+        parser.error("input_file and output_file are required unless --serve is given")
+    
+    report = RunReport('split', profile_dir=args.profile)
+    recorder = StageRecorder()
     try:
-        # Read input CSV
-        df = pd.read_csv(args.input_file)
-        
-        # Process the DataFrame
-        expanded_df = expand_phone_rows(df)
-        
-        # Save to output file
-        expanded_df.to_csv(args.output_file, index=False)
+        with profiled(args.profile, os.path.basename(args.input_file)):
+            rows = split_file(args.input_file, args.output_file, recorder)
+        report.add_file(os.path.basename(args.input_file), recorder.stages)
         print(f"Successfully processed {args.input_file} and saved to {args.output_file}")
-        print(f"Number of rows in output: {len(expanded_df)}")
+        print(f"Number of rows in output: {rows}")
         
     except Exception as e:
+        report.add_file(os.path.basename(args.input_file), recorder.stages, error=str(e))
         print(f"Error processing file: {str(e)}")
+    
+    if args.report:
+        report.write(args.report)
@@ -0,0 +1,80 @@
+from typing import Iterable, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+# Dictionary mapping long state names to short codes
+STATE_CODES = {
+    "Alabama": "AL", "Alaska": "AK", "Arizona": "AZ", "Arkansas": "AR", "California": "CA",
+    "Colorado": "CO", "Connecticut": "CT", "Delaware": "DE", "Florida": "FL", "Georgia": "GA",
+    "Hawaii": "HI", "Idaho": "ID", "Illinois": "IL", "Indiana": "IN", "Iowa": "IA",
+    "Kansas": "KS", "Kentucky": "KY", "Louisiana": "LA", "Maine": "ME", "Maryland": "MD",
+    "Massachusetts": "MA", "Michigan": "MI", "Minnesota": "MN", "Mississippi": "MS", "Missouri": "MO",
+    "Montana": "MT", "Nebraska": "NE", "Nevada": "NV", "New Hampshire": "NH", "New Jersey": "NJ",
+    "New Mexico": "NM", "New York": "NY", "North Carolina": "NC", "North Dakota": "ND", "Ohio": "OH",
+    "Oklahoma": "OK", "Oregon": "OR", "Pennsylvania": "PA", "Rhode Island": "RI", "South Carolina": "SC",
+    "South Dakota": "SD", "Tennessee": "TN", "Texas": "TX", "Utah": "UT", "Vermont": "VT",
+    "Virginia": "VA", "Washington": "WA", "West Virginia": "WV", "Wisconsin": "WI", "Wyoming": "WY",
+}
+
+ALL_STATES = frozenset(STATE_CODES.values())
+
+# States kept by default
+DEFAULT_STATES = frozenset([
+    "FL", "GA", "SC", "NC", "VA", "MD", "TN", "KY", "OH", "MI",
+    "IN", "IL", "MO", "LA", "TX", "OK", "KS", "CO", "UT", "NV",
+])
+
+# Upper-case name or code -> code
+_STATE_LOOKUP = {name.upper(): code for name, code in STATE_CODES.items()}
+_STATE_LOOKUP.update({code: code for code in ALL_STATES})
+
+
+def parse_states(value: Optional[str]) -> Optional[Set[str]]:
+    """
+    Parse a --states argument: 'default', 'all', 'none' (no filtering) or a
+    comma-separated list of state names or codes.
+    """
+    if value is None or value.strip().lower() == 'default':
+        return set(DEFAULT_STATES)
+    if value.strip().lower() == 'all':
+        return set(ALL_STATES)
+    if value.strip().lower() in ('', 'none'):
+        return None
+
+    states = set()
+    for item in value.split(','):
+        code = _STATE_LOOKUP.get(item.strip().upper())
+        if code is None:
+            raise ValueError(f"Unknown state: {item.strip()}")
+        states.add(code)
+    return states
+
+def normalize_states(states: pd.Series) -> pd.Series:
+    """
+    Map full state names and codes, in any case and with surrounding spaces,
+    to two-letter codes. Values that are not states are left unchanged.
+    Each distinct value is looked up once.
+    """
+    codes, uniques = pd.factorize(states)
+    if not len(uniques):
+        return states
+
+    mapped = pd.Series(uniques, dtype=object).astype(str).str.strip().str.upper().map(_STATE_LOOKUP)
+    mapped = mapped.where(mapped.notna(), pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+
+    result = np.where(codes >= 0, mapped[codes], states.to_numpy(dtype=object))
+    return pd.Series(result, index=states.index, dtype=object)
+
+def filter_state_rows(df: pd.DataFrame, states: Optional[Iterable[str]]):
+    """
+    Normalize the 'state' column and keep only rows in the given states.
+    With states None, only the normalization is applied.
+    Returns the filtered frame and the number of rows removed.
+    """
+    df = df.assign(state=normalize_states(df['state']))
+    if states is None:
+        return df, 0
+
+    keep = df['state'].isin(list(states))
+    return df[keep], int((~keep).sum())
@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Dict, List, Set
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mapping import get_column_mapping_regex
+from utils.states import STATE_CODES
+
+# Header spellings per field, covering every alternative of every mapping pattern
+HEADER_SPELLINGS = {
+    'full_name': ['Full Name', 'Contact Name', 'Labeler Name', 'Legal Contact Name', 'TC Name', 'PI Name', 'RI POC Name'],
+    'first_name': ['First Name'],
+    'last_name': ['Last Name'],
+    'business_name': ['Company Name', 'Business Name'],
+    'phone': ['Mobile Phone', 'Cell Phone', 'Smartphone', 'Cellular', 'Phone', 'Contact Phone', 'Business Phone',
+              'Company Phone', 'Legal Phone', 'Invoice Phone', 'TC Phone', 'PI Phone', 'RI POC Phone'],
+    'state': ['State', 'Business State', 'Legal State', 'Invoice State', 'TC State', 'Mailing State', 'Company State'],
+    'zip': ['Zip', 'Zipcode', 'Postal Code', 'Business Zip', 'Legal Zip', 'Invoice Zip', 'TC Zip', 'Mailing Zip'],
+    'email': ['Email', 'Email Address', 'Contact Email', 'PI Email'],
+}
+
+# Columns no pattern maps, as found next to contacts in scraped exports
+NOISE_COLUMNS = ['Award Title', 'Agency', 'Address1', 'City', 'Award Amount', 'Notes']
+
+# Byte-level shape of each file, assigned to files in turn
+VARIANTS = ['utf8', 'cp1252', 'utf8_bom', 'semicolon', 'utf16', 'title_rows', 'mixed', 'tab', 'no_contacts']
+
+# File sizes of each named scale: (smallest, largest, number of files), sizes spaced geometrically
+SCALES = {
+    'small': ('1KB', '1MB', 18),
+    'medium': ('1KB', '64MB', 27),
+    'large': ('1KB', '1GB', 36),
+}
+
+# Rows generated and written at a time, so a 1 GB file never sits in memory
+CHUNK_ROWS = 50_000
+
+FIRST_NAMES = np.array(['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+                        'Elizabeth', 'José', 'María', 'Zoë', 'Renée', 'André', 'Chloé', 'Wei', 'Aisha'])
+LAST_NAMES = np.array(['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'García', 'Miller', 'Davis', 'Müller',
+                       "O'Brien", 'Nguyen', 'Søren', 'Peña', 'Lee', 'Walker', 'Hall', 'Young', 'King'])
+BUSINESS_WORDS = np.array(['Crescent', 'Healthcare', 'Blue Ridge', 'Dental', 'Family', 'Medicine', 'Sunrise',
+                           'Pediatrics', 'Law', 'Group', 'Partners', 'Auto', 'Repair', 'Plumbing', 'Realty', 'Café'])
+BUSINESS_SUFFIXES = np.array([' Inc', ' LLC', ', Inc.', ' Corp', ' & Sons', ''])
+STATE_NAMES = np.array(sorted(STATE_CODES))
+STATE_ABBREVIATIONS = np.array(sorted(STATE_CODES.values()))
+
+_SIZE = re.compile(r'(?i)^\s*(\d+(?:\.\d+)?)\s*([kmg]?)b?\s*$')
+
+
+def parse_size(value: str) -> int:
+    """Bytes for a size like '1KB', '64MB', '1GB' or '512'."""
+    match = _SIZE.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    number, unit = match.groups()
+    return int(float(number) * {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}[unit.lower()])
+
+def scale_sizes(smallest: str, largest: str, files: int) -> List[int]:
+    """File sizes from smallest to largest, spaced geometrically."""
+    return [int(size) for size in np.geomspace(parse_size(smallest), parse_size(largest), files)]
+
+
+def file_layout(index: int, rng: np.random.Generator) -> Dict:
+    """
+    Header of file number index: spellings are taken in turn so that every
+    pattern is hit once there are enough files, with one to three phone
+    columns, random capitalization and spacing, and noise columns, shuffled.
+    """
+    columns = {}
+    def spelling(field, offset=0):
+        names = HEADER_SPELLINGS[field]
+        return _respell(names[(index + offset) % len(names)], rng)
+
+    if index % 2 == 0:
+        columns[spelling('full_name', index // 2)] = 'full_name'
+    else:
+        columns[spelling('first_name')] = 'first_name'
+        columns[spelling('last_name')] = 'last_name'
+    if index % 3 != 2:
+        columns[spelling('business_name')] = 'business_name'
+    for k in range(1 + index % 3):
+        columns[spelling('phone', 3 * index + k)] = 'phone'
+    columns[spelling('state')] = 'state'
+    columns[spelling('zip')] = 'zip'
+    if index % 4 != 3:
+        columns[spelling('email', index // 4)] = 'email'
+    for name in rng.choice(NOISE_COLUMNS, size=int(rng.integers(1, 4)), replace=False):
+        columns[name] = 'noise'
+
+    order = rng.permutation(len(columns))
+    header = [list(columns)[i] for i in order]
+    return {'header': header, 'fields': [columns[name] for name in header]}
+
+def _respell(name: str, rng: np.random.Generator) -> str:
+    style = rng.integers(0, 4)
+    if style == 1:
+        return name.upper()
+    if style == 2:
+        return name.lower()
+    if style == 3:
+        return name.replace(' ', '')
+    return name
+
+def pattern_coverage(headers: List[List[str]]) -> Dict[str, Set[str]]:
+    """Headers matching each mapping pattern, in a set of file headers."""
+    coverage = {pattern: set() for pattern in get_column_mapping_regex()}
+    for header in headers:
+        for col in header:
+            for pattern in coverage:
+                if re.match(pattern, col):
+                    coverage[pattern].add(col)
+                    break
+    return coverage
+
+
+def _phones(rng: np.random.Generator, rows: int) -> np.ndarray:
+    """Phone cells in mixed formats: punctuated, +1, float-typed, too short, comma-joined or blank."""
+    area = rng.integers(201, 990, size=rows).astype(str)
+    exchange = rng.integers(200, 1000, size=rows).astype(str)
+    line = np.char.zfill(rng.integers(0, 10000, size=rows).astype(str), 4)
+    digits = np.char.add(np.char.add(area, exchange), line)
+    formats = [
+        digits,
+        np.char.add(np.char.add(np.char.add('(', area), ') '), np.char.add(np.char.add(exchange, '-'), line)),
+        np.char.add(np.char.add(np.char.add(area, '-'), exchange), np.char.add('-', line)),
+        np.char.add(np.char.add(np.char.add('+1 ', area), '.'), np.char.add(np.char.add(exchange, '.'), line)),
+        np.char.add(digits, '.0'),
+        np.char.add(np.char.add(exchange, '-'), line),
+    ]
+    choice = rng.choice(len(formats), size=rows, p=[0.35, 0.2, 0.2, 0.1, 0.1, 0.05])
+    phones = np.choose(choice, formats)
+    other = np.char.add(np.char.add(rng.integers(201, 990, size=rows).astype(str),
+                                    rng.integers(200, 1000, size=rows).astype(str)), line)
+    phones = np.where(rng.random(rows) < 0.15, np.char.add(np.char.add(phones, ', '), other), phones)
+    return np.where(rng.random(rows) < 0.1, '', phones)
+
+def _zips(rng: np.random.Generator, rows: int) -> np.ndarray:
+    """Zip cells as text, float-typed, ZIP+4, with the leading zero lost, or blank."""
+    zips = rng.integers(1000, 99951, size=rows)
+    text = np.char.zfill(zips.astype(str), 5)
+    formats = [text, np.char.add(zips.astype(str), '.0'), np.char.add(np.char.add(text, '-'),
+               np.char.zfill(rng.integers(0, 10000, size=rows).astype(str), 4)), zips.astype(str)]
+    choice = rng.choice(len(formats), size=rows, p=[0.5, 0.3, 0.1, 0.1])
+    return np.where(rng.random(rows) < 0.05, '', np.choose(choice, formats))
+
+def _states(rng: np.random.Generator, rows: int) -> np.ndarray:
+    """State cells as codes, full names, lower-case names or blank."""
+    names = rng.choice(STATE_NAMES, size=rows)
+    formats = [rng.choice(STATE_ABBREVIATIONS, size=rows), names, np.char.lower(names), np.full(rows, '')]
+    return np.choose(rng.choice(len(formats), size=rows, p=[0.6, 0.25, 0.1, 0.05]), formats)
+
+def contact_frame(fields: List[str], header: List[str], rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """rows synthetic scraped contacts under header, whose columns map to fields."""
+    first = rng.choice(FIRST_NAMES, size=rows)
+    last = rng.choice(LAST_NAMES, size=rows)
+    values = {
+        'full_name': np.char.add(np.char.add(first, ' '), last),
+        'first_name': first,
+        'last_name': last,
+        'business_name': np.char.add(np.char.add(np.char.add(rng.choice(BUSINESS_WORDS, size=rows), ' '),
+                                                 rng.choice(BUSINESS_WORDS, size=rows)),
+                                     rng.choice(BUSINESS_SUFFIXES, size=rows)),
+        'state': _states(rng, rows),
+        'zip': _zips(rng, rows),
+        'email': np.where(rng.random(rows) < 0.4, '',
+                          np.char.add(np.char.add(np.char.lower(np.char.add(np.char.add(first, '.'), last)), '@'),
+                                      rng.choice(['gmail.com', 'example.com', 'clinic.org'], size=rows))),
+    }
+    columns = {}
+    for name, field in zip(header, fields):
+        if field == 'phone':
+            columns[name] = _phones(rng, rows)
+        elif field == 'noise':
+            # Quoted commas and newlines inside fields
+            columns[name] = np.where(rng.random(rows) < 0.05, 'Phase II, "SBIR"\nrenewal',
+                                     rng.choice(['Research grant', 'N/A', '1200.50', ''], size=rows))
+        else:
+            columns[name] = values[field]
+    return pd.DataFrame(columns)
+
+
+def _encoding(variant: str) -> str:
+    return {'cp1252': 'cp1252', 'utf8_bom': 'utf-8-sig', 'utf16': 'utf-16'}.get(variant, 'utf-8')
+
+def write_file(path: str, size: int, index: int, variant: str, seed: int = 0) -> Dict:
+    """
+    Write one synthetic scraped CSV of about size bytes in the given
+    variant, chunk by chunk. Returns its manifest entry.
+    """
+    rng = np.random.default_rng([seed, index])
+    layout = file_layout(index, rng)
+    header, fields = layout['header'], layout['fields']
+    if variant == 'no_contacts':
+        keep = [i for i, field in enumerate(fields) if field != 'phone']
+        header, fields = [header[i] for i in keep], [fields[i] for i in keep]
+    sep = {'semicolon': ';', 'tab': '\t'}.get(variant, ',')
+    encoding = _encoding(variant)
+
+    rows = 0
+    written = 0
+    row_bytes = None
+    with open(path, 'wb') as f:
+        if variant == 'title_rows':
+            written += f.write(b'Contractor export\nGenerated by the agency portal\n\n')
+        # UTF-16 writes its byte order mark once, ahead of the header
+        if encoding == 'utf-16':
+            written += f.write('\ufeff'.encode('utf-16-le'))
+            encoding = 'utf-16-le'
+        while written < size or rows == 0:
+            # A first small chunk gives the bytes per row of this layout
+            chunk_rows = 64 if row_bytes is None else max(1, min(CHUNK_ROWS, int((size - written) / row_bytes) + 1))
+            df = contact_frame(fields, header, chunk_rows, rng)
+            text = df.to_csv(index=False, header=rows == 0, sep=sep, lineterminator='\n')
+            # The second half of a mixed file switches to cp1252
+            chunk_encoding = 'cp1252' if variant == 'mixed' and written >= size // 2 else encoding
+            data = text.encode(chunk_encoding)
+            written += f.write(data)
+            row_bytes = len(data) / chunk_rows
+            rows += chunk_rows
+
+    return {'file': os.path.basename(path), 'variant': variant, 'bytes': written, 'rows': rows, 'header': header}
+
+def generate_directory(output_dir: str, sizes: List[int], seed: int = 0) -> Dict:
+    """
+    Write one synthetic file per size to output_dir, cycling through the
+    variants, and a manifest.json describing them. Returns the manifest.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    for index, size in enumerate(sizes):
+        variant = VARIANTS[index % len(VARIANTS)]
+        path = os.path.join(output_dir, f'scrape_{index:03d}_{variant}.csv')
+        files.append(write_file(path, size, index, variant, seed))
+
+    coverage = pattern_coverage([entry['header'] for entry in files])
+    manifest = {
+        'seed': seed,
+        'sizes': sizes,
+        'bytes': sum(entry['bytes'] for entry in files),
+        'rows': sum(entry['rows'] for entry in files),
+        'patterns_hit': sum(1 for cols in coverage.values() if cols),
+        'patterns': len(coverage),
+        'files': files,
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def load_manifest(output_dir: str, sizes: List[int], seed: int = 0) -> Dict:
+    """The manifest of a directory generated earlier with the same sizes and seed, or None."""
+    try:
+        with open(os.path.join(output_dir, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('sizes') != sizes or manifest.get('seed') != seed:
+        return None
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a directory of synthetic scraped CSV files with varied headers and encodings.")
+    parser.add_argument("output_directory", help="Directory the files are written to.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Named set of file sizes.")
+    parser.add_argument("--sizes", default=None, help="Comma-separated file sizes instead of --scale, e.g. 1KB,10MB,1GB.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed writes the same files.")
+
+    args = parser.parse_args()
+
+    try:
+        sizes = [parse_size(size) for size in args.sizes.split(',')] if args.sizes else scale_sizes(*SCALES[args.scale])
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    manifest = generate_directory(args.output_directory, sizes, args.seed)
+    print(f"Wrote {len(manifest['files'])} files, {manifest['rows']} rows, {manifest['bytes'] / 1e6:.1f} MB "
+          f"to {args.output_directory}; {manifest['patterns_hit']}/{manifest['patterns']} mapping patterns hit")
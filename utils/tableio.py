@@ -0,0 +1,188 @@
+import os
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from utils.mapping import get_column_mapping_regex, match_column_with_regex
+from utils.sniff import is_default, read_options, sniff_file
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# File extensions the pipeline reads and writes
+CSV_EXTENSIONS = ('.csv',)
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+TABLE_EXTENSIONS = CSV_EXTENSIONS + PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+
+# Sniffed settings that decide where the header is and how it splits
+_HEADER_OPTIONS = ('encoding', 'encoding_errors', 'sep', 'quotechar', 'skiprows')
+
+
+def csv_options(path: str) -> Dict:
+    """pd.read_csv keyword arguments for the encoding and dialect sniffed from the start of a CSV file."""
+    return read_options(sniff_file(path))
+
+def read_header(path: str, **kwargs) -> List[str]:
+    """Read only the header line of a CSV file, in its sniffed encoding and dialect."""
+    options = {key: value for key, value in csv_options(path).items() if key in _HEADER_OPTIONS}
+    options.update(kwargs)
+    return list(pd.read_csv(path, nrows=0, **options).columns)
+
+def _resolve_engine(engine: Optional[str], header: List[str], kwargs: Dict) -> str:
+    """
+    Fall back to the C parser when pyarrow is unavailable or cannot handle the
+    request (chunked reads, duplicate column names).
+    """
+    if engine != 'pyarrow':
+        return engine or 'c'
+    if not HAS_PYARROW or 'chunksize' in kwargs or 'nrows' in kwargs:
+        return 'c'
+    # pandas renames repeated headers to 'name.1', which pyarrow cannot select
+    names = set(header)
+    if any(re.sub(r'\.\d+$', '', col) in names and re.search(r'\.\d+$', col) for col in header):
+        return 'c'
+    return 'pyarrow'
+
+def read_text_csv(path: str, usecols: Optional[Callable[[str], bool]] = None, engine: Optional[str] = None, **kwargs):
+    """
+    Read a CSV with every column as text, so phone and zip values are never
+    parsed as floats (no '.0' suffixes, leading zeros kept).
+    usecols is a predicate on column names; only matching columns are parsed.
+    engine may be 'c' (default) or 'pyarrow' when it is installed.
+    Encoding, delimiter, quoting and header row are sniffed from the start
+    of the file; undecodable bytes fall back to cp1252 and malformed lines
+    are skipped instead of failing the read.
+    Accepts the same extra keyword arguments as pd.read_csv, e.g. chunksize.
+    """
+    dialect = sniff_file(path)
+    options = {**read_options(dialect), **kwargs}
+    header = read_header(path, **{key: value for key, value in options.items() if key in _HEADER_OPTIONS})
+    # Only the C parser applies the decoding fallback
+    engine = _resolve_engine(engine, header, kwargs) if is_default(dialect) else 'c'
+    if engine == 'pyarrow':
+        options.pop('encoding_errors')
+
+    if usecols is not None:
+        positions = [i for i, col in enumerate(header) if usecols(col)]
+        # The pyarrow engine selects by name, the C engine by position
+        options['usecols'] = [header[i] for i in positions] if engine == 'pyarrow' else positions
+
+    try:
+        return pd.read_csv(path, dtype=str, engine=engine, **options)
+    except UnicodeDecodeError:
+        # Invalid UTF-8 past the sniffed prefix; the C parser can recover it
+        if engine != 'pyarrow':
+            raise
+        return read_text_csv(path, usecols=usecols, engine='c', **kwargs)
+
+def contact_column_filter(column_mapping: Dict[str, str] = None) -> Callable[[str], bool]:
+    """
+    Return a usecols predicate keeping the columns the normalize pipeline uses:
+    every column matched by the column mapping plus every phone column.
+    """
+    column_mapping = column_mapping or get_column_mapping_regex()
+
+    def wanted(col: str) -> bool:
+        return 'phone' in str(col).lower() or match_column_with_regex(str(col), column_mapping) is not None
+
+    return wanted
+
+def read_contact_csv(path: str, column_mapping: Dict[str, str] = None, engine: Optional[str] = None, **kwargs):
+    """Read only the contact columns of a CSV file, all as text."""
+    return read_text_csv(path, usecols=contact_column_filter(column_mapping), engine=engine, **kwargs)
+
+def read_contact_table(path: str, column_mapping: Dict[str, str] = None, engine: Optional[str] = None) -> pd.DataFrame:
+    """Read only the contact columns of a CSV, Parquet or Arrow IPC file."""
+    return read_table(path, usecols=contact_column_filter(column_mapping), engine=engine)
+
+def read_named_columns(path: str, columns: Iterable[str], engine: Optional[str] = None, **kwargs):
+    """Read only the named columns (those present in the file) as text."""
+    columns = set(columns)
+    return read_text_csv(path, usecols=lambda col: col in columns, engine=engine, **kwargs)
+
+def table_format(path: str) -> str:
+    """Return 'csv', 'parquet' or 'arrow' based on the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        return 'parquet'
+    if ext in ARROW_EXTENSIONS:
+        return 'arrow'
+    return 'csv'
+
+def _require_pyarrow(path: str):
+    if not HAS_PYARROW:
+        raise ImportError(f"pyarrow is required to read or write {path}")
+
+def _open_arrow(path: str):
+    """Open an Arrow IPC file memory-mapped, so reads do not copy it into memory."""
+    return pyarrow.ipc.open_file(pa.memory_map(path, 'r'))
+
+def read_table_header(path: str) -> List[str]:
+    """Return the column names of a CSV, Parquet or Arrow IPC file."""
+    fmt = table_format(path)
+    if fmt == 'csv':
+        return read_header(path)
+    _require_pyarrow(path)
+    if fmt == 'parquet':
+        return list(pq.read_schema(path).names)
+    return list(_open_arrow(path).schema.names)
+
+def iter_table_chunks(path: str, usecols: Optional[Callable[[str], bool]] = None, chunksize: Optional[int] = None,
+                      engine: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield a CSV, Parquet or Arrow IPC file as DataFrames of at most chunksize
+    rows (the whole file at once when chunksize is None). CSV columns are read
+    as text; columnar files keep the types they were written with.
+    """
+    fmt = table_format(path)
+    if fmt == 'csv':
+        if chunksize:
+            yield from read_text_csv(path, usecols=usecols, engine=engine, chunksize=chunksize)
+        else:
+            yield read_text_csv(path, usecols=usecols, engine=engine)
+        return
+
+    _require_pyarrow(path)
+    header = read_table_header(path)
+    columns = [col for col in header if usecols is None or usecols(col)]
+    if fmt == 'parquet':
+        if chunksize:
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield pq.read_table(path, columns=columns).to_pandas()
+        return
+
+    table = _open_arrow(path).read_all().select(columns)
+    if chunksize:
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield table.to_pandas()
+
+def read_table(path: str, usecols: Optional[Callable[[str], bool]] = None, engine: Optional[str] = None) -> pd.DataFrame:
+    """Read a CSV, Parquet or Arrow IPC file, keeping only the columns usecols accepts."""
+    return next(iter_table_chunks(path, usecols=usecols, engine=engine))
+
+def write_table(df: pd.DataFrame, path: str):
+    """Write df as CSV, Parquet or Arrow IPC depending on the file extension."""
+    fmt = table_format(path)
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+        return
+
+    _require_pyarrow(path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if fmt == 'parquet':
+        pq.write_table(table, path)
+    else:
+        with pa.OSFile(path, 'wb') as sink, pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)